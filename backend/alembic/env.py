@@ -1,5 +1,8 @@
+import os
 from logging.config import fileConfig
 
+from dotenv import load_dotenv
+
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 
@@ -9,6 +12,11 @@ from alembic import context
 # access to the values within the .ini file in use.
 config = context.config
 
+# the database of the app (DATABASE_URL of .env) takes precedence over alembic.ini
+load_dotenv()
+if os.getenv("DATABASE_URL"):
+    config.set_main_option("sqlalchemy.url", os.environ["DATABASE_URL"].replace("%", "%%"))
+
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
 if config.config_file_name is not None:
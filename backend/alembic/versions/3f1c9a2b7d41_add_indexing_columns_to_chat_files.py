@@ -0,0 +1,39 @@
+"""add indexing state and table schemas to chat_files
+
+Revision ID: 3f1c9a2b7d41
+Revises: 
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c9a2b7d41'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# New tables (indexing_jobs, chat_file_vectors) are created by create_all on startup, which never
+# alters existing tables. The statements are idempotent, so the migration also runs cleanly on
+# databases that create_all set up with the current models.
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("ALTER TABLE chat_files ADD COLUMN IF NOT EXISTS index_status VARCHAR")
+    op.execute("ALTER TABLE chat_files ADD COLUMN IF NOT EXISTS index_attempts INTEGER NOT NULL DEFAULT 0")
+    op.execute("ALTER TABLE chat_files ADD COLUMN IF NOT EXISTS index_error VARCHAR")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_chat_files_index_status ON chat_files (index_status)")
+    op.execute("ALTER TABLE chat_files ADD COLUMN IF NOT EXISTS table_schemas JSON")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE chat_files DROP COLUMN IF EXISTS table_schemas")
+    op.execute("DROP INDEX IF EXISTS ix_chat_files_index_status")
+    op.execute("ALTER TABLE chat_files DROP COLUMN IF EXISTS index_error")
+    op.execute("ALTER TABLE chat_files DROP COLUMN IF EXISTS index_attempts")
+    op.execute("ALTER TABLE chat_files DROP COLUMN IF EXISTS index_status")
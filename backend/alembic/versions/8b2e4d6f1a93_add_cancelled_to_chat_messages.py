@@ -0,0 +1,29 @@
+"""add cancelled to chat_messages
+
+Revision ID: 8b2e4d6f1a93
+Revises: 3f1c9a2b7d41
+Create Date: 2026-10-18 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2e4d6f1a93'
+down_revision: Union[str, None] = '3f1c9a2b7d41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # existing answers were not cancelled; the server default fills them in
+    op.execute("ALTER TABLE chat_messages ADD COLUMN IF NOT EXISTS cancelled BOOLEAN NOT NULL DEFAULT false")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE chat_messages DROP COLUMN IF EXISTS cancelled")
@@ -1,6 +1,8 @@
 import os
 from dotenv import load_dotenv
 from sqlmodel import Session, SQLModel, create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 from redis import Redis
 from logging_config import setup_logging
 
@@ -8,7 +10,7 @@ from logging_config import setup_logging
 import chromadb
 from llama_index.vector_stores.chroma import ChromaVectorStore
 from fastapi import Depends
-from typing import Annotated
+from typing import Annotated, Optional
 
 load_dotenv()
 
@@ -29,6 +31,13 @@ PG_COLLECTION = os.getenv("PG_COLLECTION", "llama-rag")
 DATABASE_URL = f"postgresql://{PG_USER}:{PG_PASSWORD}@{PG_HOST}:{PG_PORT}/{PG_COLLECTION}"
 engine = create_engine(DATABASE_URL)
 
+# async engine (asyncpg) of the request handlers; the sync engine stays for workers and sync dependencies
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{PG_USER}:{PG_PASSWORD}@{PG_HOST}:{PG_PORT}/{PG_COLLECTION}"
+ASYNC_DB_POOL_SIZE = int(os.getenv("ASYNC_DB_POOL_SIZE", 10))
+ASYNC_DB_MAX_OVERFLOW = int(os.getenv("ASYNC_DB_MAX_OVERFLOW", 10))
+async_engine = create_async_engine(ASYNC_DATABASE_URL, pool_size=ASYNC_DB_POOL_SIZE,
+                                   max_overflow=ASYNC_DB_MAX_OVERFLOW, pool_pre_ping=True)
+
 # ollama
 base_url = f"{os.getenv('OLLAMA_HOST', 'localhost')}:{os.getenv('OLLAMA_PORT', 11434)}"
 
@@ -36,6 +45,11 @@ base_url = f"{os.getenv('OLLAMA_HOST', 'localhost')}:{os.getenv('OLLAMA_PORT', 1
 CHROMA_HOST = os.getenv("CHROMA_HOST", "localhost")
 CHROMA_PORT = int(os.getenv("CHROMA_PORT", 8000))
 CHROMA_COLLECTION = os.getenv("CHROMA_COLLECTION_NAME", 'llama-rag')
+# 'global' keeps all vectors in CHROMA_COLLECTION, 'user' and 'chat' route them into per-user/per-chat collections
+CHROMA_SHARDING = os.getenv("CHROMA_SHARDING", "global").lower()
+if CHROMA_SHARDING not in ("global", "user", "chat"):
+    logger.error(f"Unknown CHROMA_SHARDING '{CHROMA_SHARDING}', falling back to 'global'")
+    CHROMA_SHARDING = "global"
 logger.info(f"Attempting to connect to ChromaDB at {CHROMA_HOST}:{CHROMA_PORT}")
 try:
     chroma_client = chromadb.HttpClient(host=CHROMA_HOST, port=CHROMA_PORT)
@@ -46,6 +60,63 @@ except Exception as e:
     chroma_client = None
 
 
+def configure_llama_settings():
+    """
+    Initialize the global LlamaIndex settings (LLM, embedding model, chunking) for the configured
+    ``LLM_PROVIDER``. Every process that indexes or queries documents (API and indexing workers)
+    calls this once on startup.
+    """
+    from llama_index.core.settings import Settings
+
+    provider = os.getenv('LLM_PROVIDER', 'OLLAMA')
+    # texts per embedding request; at least the largest batch of the ingestion pipeline, so each of
+    # its adaptively sized batches goes out as a single request
+    embed_batch_size = int(os.getenv('EMBED_BATCH_SIZE', os.getenv('EMBED_MAX_BATCH_SIZE', 256)))
+
+    # Initialize LLM and embedding model based on provider
+    if provider == 'IONOS':
+        from llama_index.llms.openai_like import OpenAILike
+        from llama_index.embeddings.openai import OpenAIEmbedding
+        ionos_base_url = os.getenv("IONOS_BASE_URL", "http://localhost:11434")
+        api_key = os.getenv("IONOS_API_KEY", "your_api_key_here")
+        os.environ["OPENAI_API_BASE"] = ionos_base_url
+        os.environ["OPENAI_API_KEY"] = api_key
+        headers = {
+            'Authorization': f'Bearer {api_key}',
+            'Content-Type': 'application/json',
+        }
+
+        llm = OpenAILike(
+            api_base=ionos_base_url,
+            temperature=0,
+            model='meta-llama/Llama-3.3-70B-Instruct',
+            is_chat_model=True,
+            default_headers=headers,
+            api_key=api_key,
+            context_window=128000,
+            request_timeout=420
+        )
+        embed_model = OpenAIEmbedding(
+            model_name='BAAI/bge-m3',
+            api_base=ionos_base_url,
+            api_key=api_key,
+            default_headers=headers,
+            embed_batch_size=embed_batch_size
+        )
+    else:
+        from llama_index.llms.ollama import Ollama
+        from llama_index.embeddings.ollama import OllamaEmbedding
+        llm = Ollama(model=os.getenv('OLLAMA_MODEL', 'llama3.1'), base_url=base_url, request_timeout=420)
+        embed_model = OllamaEmbedding(model_name=os.getenv('OLLAMA_EMBED_MODEL', 'mxbai-embed-large'),
+                                      base_url=base_url, embed_batch_size=embed_batch_size)
+
+    # Set global settings for LLM and embedding model
+    Settings.llm = llm
+    Settings.embed_model = embed_model
+    Settings.chunk_size = 512
+    Settings.chunk_overlap = 20
+
+
 def create_db_and_tables():
     """
     Create all database tables defined in the SQLModel metadata.
@@ -63,6 +134,20 @@ def get_db_session():
         yield session
 
 
+async def get_async_db_session():
+    """
+    Provide an async SQLModel database session on the asyncpg engine.
+
+    Queries and commits of async route handlers await the database instead of blocking the event
+    loop, so a slow commit no longer stalls the other requests and SSE streams of the process.
+    Objects stay loaded after a commit (``expire_on_commit=False``), since expired attributes
+    can not be lazy-loaded outside of an awaited call; relationships have to be loaded eagerly,
+    e.g. with ``selectinload``.
+    """
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+
 def get_redis_client():
     """
     Provide a Redis client connection.
@@ -75,23 +160,69 @@ def get_redis_client():
         redis.close()
 
 
-def get_chroma_vector():
+def chroma_collection_name(chat_id: Optional[str] = None, user_id: Optional[str] = None,
+                           sharding: str = CHROMA_SHARDING) -> str:
+    """
+    Resolve the name of the Chroma collection (shard) holding the vectors of a chat.
+
+    Args:
+        chat_id (str, optional): The chat the vectors belong to.
+        user_id (str, optional): The owner of the chat.
+        sharding (str): 'global', 'user' or 'chat'. Defaults to ``CHROMA_SHARDING``.
+
+    Returns:
+        str: ``CHROMA_COLLECTION`` in global mode or if the shard key is unknown,
+        otherwise ``<CHROMA_COLLECTION>-user-<user_id>`` or ``<CHROMA_COLLECTION>-chat-<chat_id>``.
+    """
+    if sharding == "user" and user_id:
+        return f"{CHROMA_COLLECTION}-user-{user_id}"
+    if sharding == "chat" and chat_id:
+        return f"{CHROMA_COLLECTION}-chat-{chat_id}"
+    return CHROMA_COLLECTION
+
+
+def resolve_chroma_collection(chat_id: str, db_client: Session):
+    """
+    Provide the Chroma collection holding the vectors of a chat, creating the shard if needed.
+
+    Args:
+        chat_id (str): The chat the vectors belong to.
+        db_client (Session): Database session used to look up the chat and its owner.
+
+    Note:
+        Unknown chats resolve to the global collection, so requests for missing chats never create shards.
+    """
+    if CHROMA_SHARDING == "global":
+        return chroma_client.get_or_create_collection(CHROMA_COLLECTION)
+
+    from models.chat import Chat
+
+    db_chat = db_client.get(Chat, chat_id)
+    if not db_chat:
+        return chroma_client.get_or_create_collection(CHROMA_COLLECTION)
+    return chroma_client.get_or_create_collection(chroma_collection_name(chat_id=db_chat.id, user_id=db_chat.user_id))
+
+
+def get_chroma_vector(chat_id: str, db_client: Session = Depends(get_db_session)):
     """
     Provide a ChromaVectorStore instance for vector storage operations.
-    This function is a generator that yields the vector store.
+    This function is a generator that yields the vector store of the chat's shard,
+    so it can only be used by routes with a ``chat_id`` path parameter.
     """
-    chroma_collection = chroma_client.get_or_create_collection(CHROMA_COLLECTION)
+    chroma_collection = resolve_chroma_collection(chat_id, db_client)
     chroma_vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
     yield chroma_vector_store
 
 
-def get_chroma_collection():
+def get_chroma_collection(chat_id: str, db_client: Session = Depends(get_db_session)):
     """
     Provide a Chroma collection instance.
-    This function is a generator that yields the Chroma collection.
+    This function is a generator that yields the Chroma collection of the chat's shard,
+    so it can only be used by routes with a ``chat_id`` path parameter.
     """
-    chroma_collection = chroma_client.get_or_create_collection(CHROMA_COLLECTION)
+    chroma_collection = resolve_chroma_collection(chat_id, db_client)
     yield chroma_collection
 
 
 SessionDep = Annotated[Session, Depends(get_db_session)]
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_db_session)]
@@ -9,9 +9,10 @@ from starlette.responses import (
 from routers import route
 from dependencies import (
     create_db_and_tables, 
+    configure_llama_settings,
     get_redis_client, 
-    logger, 
-    base_url
+    async_engine,
+    logger
 )
 from msal import ConfidentialClientApplication
 from dotenv import load_dotenv
@@ -19,8 +20,8 @@ from redis import Redis
 from fastapi_pagination import add_pagination
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from utils import decode_jwt
-from llama_index.core.settings import Settings
+from utils import decode_jwt, get_sql_engine_registry
+from services import get_llm_registry
 from hypercorn.asyncio import serve
 from hypercorn.config import Config
 
@@ -53,53 +54,7 @@ if not os.path.exists("uploads/avatars"):
     logger.info("Created directory uploads/avatars")
 
 # Settings global
-provider = os.getenv('LLM_PROVIDER', 'OLLAMA')
-api_key = None
-base_url = None
-llm = None
-embed_model = None
-
-# Initialize LLM and embedding model based on provider
-if provider == 'IONOS':
-    from llama_index.llms.openai_like import OpenAILike
-    from llama_index.embeddings.openai import OpenAIEmbedding
-    base_url = os.getenv("IONOS_BASE_URL", "http://localhost:11434")
-    api_key = os.getenv("IONOS_API_KEY", "your_api_key_here")
-    os.environ["OPENAI_API_BASE"] = base_url
-    os.environ["OPENAI_API_KEY"] = api_key
-    headers = {
-        'Authorization': f'Bearer {api_key}',
-        'Content-Type': 'application/json',
-    }
-    
-    llm = OpenAILike(
-        api_base=base_url,
-        temperature=0,
-        model='meta-llama/Llama-3.3-70B-Instruct',
-        is_chat_model=True,
-        default_headers=headers,
-        api_key=api_key,
-        context_window=128000,
-        request_timeout=420
-    )
-    embed_model = OpenAIEmbedding(
-        model_name='BAAI/bge-m3',
-        api_base=base_url,
-        api_key=api_key,
-        default_headers=headers,
-        embed_batch_size=10
-    )
-else:    
-    from llama_index.llms.ollama import Ollama
-    from llama_index.embeddings.ollama import OllamaEmbedding
-    llm = Ollama(model=os.getenv('OLLAMA_MODEL', 'llama3.1'), base_url=base_url, request_timeout=420)
-    embed_model = OllamaEmbedding(model_name=os.getenv('OLLAMA_EMBED_MODEL', 'mxbai-embed-large'), base_url=base_url)
-    
-# Set global settings for LLM and embedding model
-Settings.llm = llm
-Settings.embed_model = embed_model
-Settings.chunk_size = 512
-Settings.chunk_overlap = 20
+configure_llama_settings()
 
 PORT = int(os.environ.get("PORT", 4000))
 ALLOWED_GROUPS_IDS = os.getenv("ALLOWED_GROUPS_IDS").split(',')
@@ -156,6 +111,12 @@ def on_startup():
     logger.debug("Creating tables for Database")
     create_db_and_tables()
 
+@app.on_event("shutdown")
+async def on_shutdown():
+    get_sql_engine_registry().dispose_all()
+    await get_llm_registry().aclose()
+    await async_engine.dispose()
+
 @app.get("/signin")
 async def azure_signin(request: Request):
     """
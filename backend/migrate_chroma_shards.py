@@ -0,0 +1,79 @@
+import argparse
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MIGRATION_BATCH_SIZE = 500
+
+
+def move_vectors(source, target, where: dict, dry_run: bool = False) -> int:
+    """
+    Moves all vectors matching ``where`` from ``source`` to ``target`` in batches.
+
+    Every batch is upserted into the target before it is deleted from the source, so an interrupted
+    migration can simply be run again.
+
+    Returns:
+        int: The number of moved vectors.
+    """
+    moved = 0
+    offset = 0
+    while True:
+        batch = source.get(where=where, include=["embeddings", "documents", "metadatas"],
+                           limit=MIGRATION_BATCH_SIZE, offset=offset)
+        if not batch["ids"]:
+            return moved
+        moved += len(batch["ids"])
+        if dry_run:
+            offset += len(batch["ids"])
+            continue
+        target.upsert(ids=batch["ids"], embeddings=batch["embeddings"], documents=batch["documents"],
+                      metadatas=batch["metadatas"])
+        source.delete(ids=batch["ids"])
+
+
+def main():
+    """
+    Moves the vectors of every chat from the global collection into the shard selected by ``CHROMA_SHARDING``.
+
+    File chunks are matched by their ``file_id``, chat memory by its ``session_id`` (the chat id).
+    Vector ids are kept, so the ids tracked in ``chat_file_vectors`` stay valid.
+
+    Usage:
+        CHROMA_SHARDING=chat python migrate_chroma_shards.py [--dry-run]
+    """
+    parser = argparse.ArgumentParser(description="Move vectors from the global Chroma collection into shards.")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the vectors that would be moved.")
+    args = parser.parse_args()
+
+    from sqlmodel import Session, select
+    from dependencies import engine, chroma_client, chroma_collection_name, CHROMA_COLLECTION, CHROMA_SHARDING, logger
+    from models import Chat, ChatFile
+
+    if CHROMA_SHARDING == "global":
+        logger.error("CHROMA_SHARDING is 'global', nothing to migrate")
+        return
+
+    source = chroma_client.get_or_create_collection(CHROMA_COLLECTION)
+    total = 0
+    with Session(engine) as db_client:
+        for db_chat in db_client.exec(select(Chat)):
+            target_name = chroma_collection_name(chat_id=db_chat.id, user_id=db_chat.user_id)
+            target = chroma_client.get_or_create_collection(target_name) if not args.dry_run else None
+            file_ids = db_client.exec(select(ChatFile.id).where(ChatFile.chat_id == db_chat.id)).all()
+
+            moved = 0
+            for file_id in file_ids:
+                moved += move_vectors(source, target, {"file_id": {"$eq": file_id}}, dry_run=args.dry_run)
+            moved += move_vectors(source, target, {"session_id": {"$eq": db_chat.id}}, dry_run=args.dry_run)
+            total += moved
+            if moved:
+                logger.info(f"{'Would move' if args.dry_run else 'Moved'} {moved} vectors of chat {db_chat.id} "
+                            f"to '{target_name}'")
+
+    logger.info(f"{'Would move' if args.dry_run else 'Moved'} {total} vectors into '{CHROMA_SHARDING}' shards")
+
+
+if __name__ == "__main__":
+    main()
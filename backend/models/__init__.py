@@ -2,4 +2,6 @@ from models.chat_file import ChatFile
 from models.chat import Chat, FileParams
 from models.favourite import Favourite
 from models.chat_message import ChatMessage
-from models.user import User, UserCreate
\ No newline at end of file
+from models.user import User, UserCreate
+from models.indexing_job import IndexingJob
+from models.chat_file_vector import ChatFileVector
@@ -1,4 +1,4 @@
-from typing import TYPE_CHECKING, Optional, List
+from typing import TYPE_CHECKING, Optional, List, Dict
 from datetime import datetime
 from sqlmodel import SQLModel, Field, Relationship
 from sqlalchemy.dialects.postgresql import JSON
@@ -20,12 +20,17 @@ class BaseChatFile(SQLModel):
     database_name: Optional[str] = Field(default=None, nullable=True, index=True)
     database_type: Optional[str] = Field(default=None, nullable=True, index=True)
     tables: List[str] | None = Field(default=None, sa_column=Column(JSON))
+    index_status: Optional[str] = Field(default=None, nullable=True, index=True)
+    index_attempts: int = Field(default=0, nullable=False, sa_column_kwargs={"server_default": "0"})
+    index_error: Optional[str] = Field(default=None, nullable=True)
 
 class ChatFile(BaseChatFile, Base, table=True):
     __tablename__ = "chat_files"
     id: str = Field(primary_key=True, nullable=False, default=str(uuid.uuid4()))
     created_at: datetime = Field(default = datetime.now())
     updated_at: datetime = Field(default = datetime.now())
+    # table descriptions of an uploaded SQL dump, computed once when the dump is loaded
+    table_schemas: Dict[str, str] | None = Field(default=None, sa_column=Column(JSON))
     chat: "Chat" = Relationship(back_populates="files")
 
 class ChatFilePublic(BaseChatFile):
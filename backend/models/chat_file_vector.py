@@ -0,0 +1,13 @@
+from datetime import datetime
+from sqlmodel import SQLModel, Field
+from sqlalchemy.ext.declarative import declarative_base
+
+Base = declarative_base()
+
+class BaseChatFileVector(SQLModel):
+    chat_file_id: str = Field(nullable=False, index=True, foreign_key="chat_files.id", ondelete="CASCADE")
+
+class ChatFileVector(BaseChatFileVector, Base, table=True):
+    __tablename__ = "chat_file_vectors"
+    vector_id: str = Field(primary_key=True, nullable=False)
+    created_at: datetime = Field(nullable=False, default_factory=datetime.now)
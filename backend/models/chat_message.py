@@ -24,6 +24,8 @@ class ChatMessage(ChatMessageBase, Base, table=True):
     block_type: str = Field(nullable=False, index=True)
     text: str = Field(nullable=False, index=True)
     created_at: datetime = Field(nullable=False, default=datetime.now())
+    # the answer was cut off because the client disconnected while it was generated
+    cancelled: bool = Field(nullable=False, default=False, sa_column_kwargs={"server_default": "false"})
     chat_id: str = Field(nullable=False, index=True, foreign_key="chats.id")
     chat: "Chat" = Relationship(back_populates="messages")
 
@@ -0,0 +1,27 @@
+from typing import Optional
+from datetime import datetime
+from sqlmodel import SQLModel, Field
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.dialects.postgresql import JSONB
+import uuid
+
+Base = declarative_base()
+
+class BaseIndexingJob(SQLModel):
+    kind: str = Field(nullable=False, index=True)
+    chat_id: str = Field(nullable=False, index=True)
+    chat_file_id: str = Field(nullable=False, index=True, foreign_key="chat_files.id", ondelete="CASCADE")
+    payload: dict = Field(sa_type=JSONB, nullable=False, default={})
+    status: str = Field(nullable=False, index=True, default="queued")
+    attempts: int = Field(nullable=False, default=0)
+    max_attempts: int = Field(nullable=False, default=5)
+    last_error: Optional[str] = Field(default=None, nullable=True)
+
+class IndexingJob(BaseIndexingJob, Base, table=True):
+    __tablename__ = "indexing_jobs"
+    id: str = Field(primary_key=True, nullable=False, default_factory=lambda: str(uuid.uuid4()))
+    run_after: datetime = Field(nullable=False, index=True, default_factory=datetime.now)
+    locked_by: Optional[str] = Field(default=None, nullable=True)
+    locked_at: Optional[datetime] = Field(default=None, nullable=True, index=True)
+    created_at: datetime = Field(nullable=False, index=True, default_factory=datetime.now)
+    updated_at: datetime = Field(nullable=False, default_factory=datetime.now)
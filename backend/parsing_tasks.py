@@ -0,0 +1,274 @@
+import glob
+import hashlib
+import logging
+import os
+import re
+from pathlib import Path
+from typing import TYPE_CHECKING, List
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from llama_index.core.schema import Document
+
+# Tasks of the parsing pool's children (see ``services.parsing_pool``). A spawned child imports the
+# module of every task it unpickles, so this module imports neither ``services`` nor ``dependencies``,
+# which would load the whole application after the child's address space was capped. Parsing
+# libraries are imported by the tasks that need them, and the children log with ``logging``.
+logger = logging.getLogger(__name__)
+
+PARSING_MEMORY_LIMIT_MB = int(os.getenv("PARSING_MEMORY_LIMIT_MB", 2048))
+SPREADSHEET_CHUNK_MAX_CHARS = int(os.getenv("SPREADSHEET_CHUNK_MAX_CHARS", 2000))
+SPREADSHEET_CHUNK_MAX_ROWS = int(os.getenv("SPREADSHEET_CHUNK_MAX_ROWS", 50))
+
+# Parquet key-value metadata entry holding the original sheet name
+SHEET_NAME_METADATA_KEY = b"sheet_name"
+
+
+def limit_memory(memory_limit_mb: int):
+    """
+    Pool initializer: caps the address space of the child, so a pathological file raises
+    MemoryError in the child instead of exhausting the container.
+    """
+    if memory_limit_mb <= 0:
+        return
+    try:
+        import resource
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError) as e:
+        logger.warning(f"Could not limit parser memory to {memory_limit_mb} MB: {e}")
+
+
+# Documents
+
+
+def extract_pdf_page_range(path: str, start: int, stop: int) -> List[dict]:
+    """
+    Extracts the pages ``[start, stop)`` of a PDF. Pages without text are skipped.
+
+    Returns:
+        List[dict]: ``{"text", "metadata"}`` per page, turned into documents by the caller.
+    """
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    file_name = os.path.basename(path)
+    pages = []
+    for number in range(start, min(stop, len(reader.pages))):
+        text = reader.pages[number].extract_text() or ""
+        if text.strip():
+            pages.append({"text": text, "metadata": {"page_label": str(number + 1), "file_name": file_name}})
+    return pages
+
+
+def count_pdf_pages(path: str) -> int:
+    """Returns the number of pages of a PDF."""
+    from pypdf import PdfReader
+
+    return len(PdfReader(path).pages)
+
+
+def load_documents(path: str) -> List["Document"]:
+    """Loads a document with ``SimpleDirectoryReader`` (DOCX, PPTX, EPUB, ...)."""
+    from llama_index.core.readers import SimpleDirectoryReader
+
+    return SimpleDirectoryReader(input_files=[path]).load_data()
+
+
+# Spreadsheets
+
+
+def is_csv(path: str) -> bool:
+    return Path(path).suffix.lower() == ".csv"
+
+
+def is_parquet(path: str) -> bool:
+    return Path(path).suffix.lower() == ".parquet"
+
+
+def list_sheets(path: str) -> List[str]:
+    """Returns the sheet names of a workbook, or the file name for a CSV file."""
+    import pandas as pd
+
+    if is_csv(path):
+        return [Path(path).stem]
+    with pd.ExcelFile(path) as workbook:
+        return [str(name) for name in workbook.sheet_names]
+
+
+def _clean(df: "pd.DataFrame") -> "pd.DataFrame":
+    # Cells become single-line strings so every row renders as exactly one Markdown table row.
+    df = df.dropna(how="all").fillna("")
+    df.columns = [str(column).replace("\n", " ").strip() for column in df.columns]
+    return df.astype(str).apply(lambda column: column.str.replace(r"\s*\n\s*", " ", regex=True))
+
+
+def _ends_group(row: str, row_chars: int, target_chars: float, target_rows: float) -> bool:
+    # A row ends its group if its hash falls below a threshold that grows with the row's size, so
+    # groups hold about ``target_chars`` characters (``target_rows`` rows for narrow sheets) and the
+    # decision depends on nothing but the row itself.
+    digest = hashlib.blake2b(row.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2 ** 64 < max(row_chars / target_chars, 1 / target_rows)
+
+
+def read_sheet_row_groups(path: str, sheet_name: str, max_chars: int = SPREADSHEET_CHUNK_MAX_CHARS,
+                          max_rows: int = SPREADSHEET_CHUNK_MAX_ROWS) -> List[dict]:
+    """
+    Reads one sheet into a DataFrame and renders it as row-group chunks.
+
+    Group boundaries are content-defined: a group ends after a row whose content hash hits a
+    threshold, once the group holds a quarter of ``max_chars``; ``max_chars`` and ``max_rows`` only
+    force a cut when no such row came up. Inserting, deleting or editing a row therefore only
+    changes the groups around it, and the chunk ids of the rest of the sheet stay the same on
+    re-indexing (see ``assign_chunk_ids``). Every group is rendered as a Markdown table that
+    repeats the column headers and is prefixed with the sheet name, so each chunk can be
+    understood on its own. Row numbers are not part of the text, since every inserted or deleted
+    row would shift them in all following chunks. Rows are never split.
+
+    Args:
+        path (str): File system path of the CSV file, workbook or Parquet copy of a sheet.
+        sheet_name (str): The sheet to read; ignored for CSV and Parquet files.
+        max_chars (int): Approximate character budget of a chunk.
+        max_rows (int): Maximum rows per chunk.
+
+    Returns:
+        List[dict]: ``{"sheet_name", "row_start", "row_end", "text"}`` per row group, with 1-based rows.
+    """
+    import pandas as pd
+
+    if is_parquet(path):
+        df = pd.read_parquet(path, engine="pyarrow")
+    elif is_csv(path):
+        df = pd.read_csv(path)
+    else:
+        df = pd.read_excel(path, sheet_name=sheet_name)
+    df = _clean(df)
+    if df.empty:
+        return []
+
+    header_chars = sum(len(column) + 3 for column in df.columns)
+    row_chars = df.apply(lambda row: sum(len(value) + 3 for value in row), axis=1).tolist()
+    row_texts = df.apply(lambda row: "|".join(row), axis=1).tolist()
+    min_chars = header_chars + max_chars / 4
+
+    groups = []
+    start, chars = 0, header_chars
+    for i, length in enumerate(row_chars):
+        rows = i - start
+        if rows and (rows >= max_rows or chars + length > max_chars):
+            groups.append((start, i))
+            start, chars = i, header_chars
+        chars += length
+        if chars >= min_chars and _ends_group(row_texts[i], length, max_chars / 4, max_rows / 4):
+            groups.append((start, i + 1))
+            start, chars = i + 1, header_chars
+    if start < len(row_chars):
+        groups.append((start, len(row_chars)))
+
+    return [
+        {
+            "sheet_name": sheet_name,
+            "row_start": group_start + 1,
+            "row_end": group_end,
+            "text": f"Sheet: {sheet_name}\n\n{df.iloc[group_start:group_end].to_markdown(index=False)}",
+        }
+        for group_start, group_end in groups
+    ]
+
+
+# Columnar copies of spreadsheets
+
+
+def columnar_sheet_path(path: str, index: int) -> str:
+    """Returns the path of the Parquet copy of the ``index``-th sheet of the spreadsheet at ``path``."""
+    return f"{path}.sheet{index}.parquet"
+
+
+def columnar_sheet_paths(path: str) -> List[str]:
+    """Returns the paths of the existing Parquet copies of a spreadsheet's sheets in sheet order."""
+    paths = glob.glob(f"{glob.escape(path)}.sheet*.parquet")
+    indexed = [(int(match.group(1)), p) for p in paths
+               if (match := re.search(r"\.sheet(\d+)\.parquet$", p))]
+    return [p for _, p in sorted(indexed)]
+
+
+def _to_arrow_compatible(df: "pd.DataFrame") -> "pd.DataFrame":
+    # Parquet requires unique string column names and one type per column. Object columns mixing
+    # e.g. numbers and text (common in hand-edited workbooks) are stored as text.
+    import pandas as pd
+    import pyarrow as pa
+
+    columns, seen = [], {}
+    for column in df.columns:
+        name = str(column)
+        seen[name] = seen.get(name, 0) + 1
+        columns.append(name if seen[name] == 1 else f"{name}.{seen[name] - 1}")
+    df = df.copy(deep=False)
+    df.columns = columns
+    for column in df.columns[df.dtypes == object]:
+        try:
+            pa.array(df[column], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            df[column] = df[column].map(lambda value: value if pd.isna(value) else str(value))
+    return df
+
+
+def _write_sheet(df: "pd.DataFrame", sheet_name: str, target: str):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(_to_arrow_compatible(df), preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}),
+                                           SHEET_NAME_METADATA_KEY: sheet_name.encode()})
+    tmp_path = f"{target}.tmp"
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, target)
+
+
+def _convert_csv(path: str, sheet_name: str, target: str):
+    import duckdb
+
+    def quote(value: str) -> str:
+        return "'" + value.replace("'", "''") + "'"
+
+    tmp_path = f"{target}.tmp"
+    # stay well below the address space limit of the parsing pool's children, DuckDB spills beyond it
+    config = {"memory_limit": f"{PARSING_MEMORY_LIMIT_MB // 4}MB"} if PARSING_MEMORY_LIMIT_MB > 0 else {}
+    with duckdb.connect(database=":memory:", config=config) as connection:
+        connection.execute(f"COPY (SELECT * FROM read_csv_auto({quote(path)})) TO {quote(tmp_path)} "
+                           f"(FORMAT parquet, KV_METADATA {{sheet_name: {quote(sheet_name)}}})")
+    os.replace(tmp_path, target)
+
+
+def convert_spreadsheet_to_parquet(path: str) -> List[str]:
+    """
+    Converts every sheet of a CSV file or workbook into a Parquet file next to it.
+
+    The conversion runs once per upload (in the parsing pool of the indexing worker), so later reads
+    only pay for a columnar, memory-mapped load instead of a CSV or Excel parse. Sheets are converted
+    one at a time and every file is swapped in atomically; copies of sheets that no longer exist are
+    removed. CSV files are streamed through DuckDB, so even multi-GB exports convert in bounded memory.
+
+    Args:
+        path (str): File system path of the CSV file or workbook.
+
+    Returns:
+        List[str]: The written Parquet paths in sheet order.
+    """
+    import pandas as pd
+
+    written = []
+    if is_csv(path):
+        _convert_csv(path, os.path.splitext(os.path.basename(path))[0], columnar_sheet_path(path, 0))
+        written.append(columnar_sheet_path(path, 0))
+    else:
+        with pd.ExcelFile(path) as workbook:
+            for index, sheet_name in enumerate(workbook.sheet_names):
+                target = columnar_sheet_path(path, index)
+                _write_sheet(workbook.parse(sheet_name), str(sheet_name), target)
+                written.append(target)
+
+    for stale in set(columnar_sheet_paths(path)) - set(written):
+        os.remove(stale)
+    logger.info(f"Converted {len(written)} sheet(s) of {path} to Parquet")
+    return written
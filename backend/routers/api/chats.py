@@ -9,52 +9,89 @@ from fastapi import Depends, HTTPException, UploadFile, File, Form, Response
 from llama_index.core import PromptTemplate
 from llama_index.core.agent.workflow import ReActAgent
 from llama_index.core.memory import ChatMemoryBuffer
-from llama_index.llms.ollama import Ollama
 from llama_index.core.llms import MessageRole, ChatMessage as LLMChatMessage
 from llama_index.vector_stores.chroma import ChromaVectorStore
 from llama_index.core.tools import BaseTool
 from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
+from sqlalchemy.orm import selectinload
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import List
 
 from chromadb import Collection
-from typing import Optional, AsyncGenerator
+from typing import Optional, AsyncGenerator, Set
 from starlette.requests import Request
 from dependencies import (
     get_redis_client, 
     get_chroma_vector, 
     get_chroma_collection, 
     logger, 
-    base_url,
-    SessionDep
+    AsyncSessionDep,
+    async_engine,
+    REDIS_HOST,
+    REDIS_PORT,
+    CHROMA_COLLECTION,
+    CHROMA_SHARDING,
+    chroma_client
 )
 
-from models import ChatMessage
+from models import ChatMessage, IndexingJob
 from models.chat import Chat, ChatQuery
 from models.chat_file import ChatFile
 from pathlib import Path
 from fastapi_pagination import Page
-from fastapi_pagination.ext.sqlalchemy import paginate as sqlalchemy_pagination
+from fastapi_pagination.ext.sqlalchemy import apaginate
 
 from utils import decode_jwt, check_property_belongs_to_user
 from services import (
-    index_uploaded_file,
     deletes_file_index_from_collection,
+    deletes_files_index_from_collection,
     create_agent,
-    process_dump_to_persist,
+    cancel_agent_run,
+    get_llm_registry,
+    IONOS_MODEL,
+    get_admission_controller,
+    AdmissionRejected,
+    AdmissionTicket,
+    enqueue_indexing_job,
+    JOB_KIND_DOCUMENT,
+    JOB_KIND_SPREADSHEET,
+    JOB_KIND_SQL_DUMP,
+    STATUS_QUEUED,
+    STATUS_RUNNING,
+    STATUS_RETRYING,
     create_pandas_engines_tools_from_files,
+    create_duckdb_engines_tools_from_files,
     create_sql_engines_tools_from_files,
     create_search_engine_tool,
     create_url_loader_tool,
     create_query_engine_tools,
-    index_spreadsheet,
+    create_merged_query_engine_tool,
+    RETRIEVAL_MODE,
     create_text_extraction_tool_from_file,
-    create_memory
+    create_memory,
+    get_tool_cache,
+    tool_cache_key,
+    get_chat_tools_version,
+    invalidate_chat_tools,
+    remove_columnar_files,
+    remove_lexical_index,
+    progress_channel,
+    progress_snapshot_key,
+    CoalescingSSEWriter
 )
-from fastapi import BackgroundTasks
 from utils import detect_sql_dump_type, delete_database_from_postgres
 
 from fastapi.responses import StreamingResponse
 from llama_index.core.chat_engine.types import AgentChatResponse
+from starlette.types import Receive, Scope, Send
+
+INDEXING_STREAM_HEARTBEAT_SECONDS = float(os.getenv("INDEXING_STREAM_HEARTBEAT_SECONDS", 15))
+CHAT_STREAM_DISCONNECT_POLL_SECONDS = float(os.getenv("CHAT_STREAM_DISCONNECT_POLL_SECONDS", 0.5))
+
+# keeps the saves of streamed answers alive when their stream is cancelled while saving
+_pending_saves: Set[asyncio.Task] = set()
 
 BASE_UPLOAD_DIR = Path(__file__).resolve().parent.parent.parent / "uploads"
 BASE_UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
@@ -95,46 +132,81 @@ def initialize_ionos_llm(temperature: float):
     - Defaults are used if environment variables are not set.
     - The `OPENAI_API_BASE` and `OPENAI_API_KEY` are set globally in the environment to ensure
       compatibility with tools expecting OpenAI-like APIs.
+    - The instance is shared through the LLM registry and uses its pooled HTTP clients.
     """
-    from llama_index.llms.openai_like import OpenAILike
-    from dotenv import load_dotenv
-    import os
+    return get_llm_registry().get_llm('IONOS', IONOS_MODEL, temperature)
 
-    load_dotenv()  # Load environment variables from .env file
 
-    # Read base URL and API key from environment variables or fallback to defaults
-    base_url = os.getenv("IONOS_BASE_URL", "http://localhost:11434")
-    api_key = os.getenv("IONOS_API_KEY", "your_api_key_here")
+class AdmittedStreamingResponse(StreamingResponse):
+    """
+    A streaming response that releases the admission ticket of its run once the response ended.
 
-    # Set required environment variables for OpenAI-compatible API access
-    os.environ["OPENAI_API_BASE"] = base_url
-    os.environ["OPENAI_API_KEY"] = api_key
+    The stream's generator releases the ticket as well, but a generator that never started (e.g.
+    the client disconnected before the body was sent) never runs its ``finally``; the response
+    itself is always awaited by the server, so the slot can not leak.
 
-    headers = {
-        'Authorization': f'Bearer {api_key}',
-        'Content-Type': 'application/json',
-    }
+    Args:
+        ticket (AdmissionTicket): The run's ticket of the admission controller.
+    """
+    def __init__(self, content, ticket: AdmissionTicket, **kwargs):
+        super().__init__(content, **kwargs)
+        self.ticket = ticket
 
-    # Instantiate the OpenAILike LLM with specified parameters
-    llm = OpenAILike(
-        api_base=base_url,
-        temperature=temperature,
-        model='meta-llama/Llama-3.3-70B-Instruct',
-        is_chat_model=True,
-        default_headers=headers,
-        api_key=api_key,
-        context_window=128000,
-    )
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            get_admission_controller().release(self.ticket)
+
+
+async def get_chat_with_files(db_client: AsyncSession, chat_id: str) -> Optional[Chat]:
+    """
+    Loads a chat together with its files.
+
+    Relationships can not be lazy-loaded from an async session, so every handler that reads
+    ``Chat.files`` loads the chat through this function.
+
+    Args:
+        db_client (AsyncSession): The request's async database session.
+        chat_id (str): The unique identifier of the chat.
+
+    Returns:
+        Optional[Chat]: The chat with its ``files`` loaded, or None if it does not exist.
+    """
+    return await db_client.get(Chat, chat_id, options=[selectinload(Chat.files)])
+
+
+async def save_chat_turn(chat_id: str, messages: List[ChatMessage]) -> bool:
+    """
+    Saves the messages of a chat turn and bumps the chat's ``last_interacted_at``.
 
-    return llm
+    Uses its own async session, because a streamed answer ends after the request's dependencies
+    were closed.
+
+    Args:
+        chat_id (str): The unique identifier of the chat.
+        messages (List[ChatMessage]): The user's and the assistant's message.
+
+    Returns:
+        bool: True if the messages were saved, False if the chat does not exist (anymore).
+    """
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        db_chat = await session.get(Chat, chat_id)
+        if not db_chat:
+            return False
+        session.add_all(messages)
+        db_chat.last_interacted_at = datetime.now()
+        await session.commit()
+        return True
 
 async def stream_agent_response(
     agent: ReActAgent,
     user_input: str,
-    db_client: SessionDep,
     chat_id: str,
     user_message: ChatMessage,
-    chat_memory: ChatMemoryBuffer
+    chat_memory: ChatMemoryBuffer,
+    request: Optional[Request] = None,
+    admission_ticket: Optional[AdmissionTicket] = None
 ) -> AsyncGenerator[str, None]:
     """
     Asynchronously streams the response from a ReActAgent as Server-Sent Events (SSE) while saving the conversation to the database.
@@ -142,10 +214,13 @@ async def stream_agent_response(
     Args:
         agent (ReActAgent): The agent responsible for generating responses.
         user_input (str): The user's input message.
-        db_client (SessionDep): Database session dependency for ORM operations.
         chat_id (str): The unique identifier for the chat session.
         user_message (ChatMessage): The user's message object to be saved.
         chat_memory (ChatMemoryBuffer): The memory buffer containing chat history.
+        request (Request, optional): The HTTP request, polled every ``CHAT_STREAM_DISCONNECT_POLL_SECONDS``
+            to detect a disconnected client.
+        admission_ticket (AdmissionTicket, optional): The run's ticket of the admission controller. The
+            agent only starts once it is admitted; it is released when the stream ends.
 
     Yields:
         str: Server-Sent Event (SSE) formatted strings containing response chunks, status, or error messages.
@@ -154,15 +229,26 @@ async def stream_agent_response(
         None: All exceptions are handled internally and streamed as error events.
 
     Side Effects:
-        - Streams response chunks to the client as SSE.
-        - Saves both user and assistant messages to the database after streaming is complete.
+        - While the run waits for admission, streams its queue position as ``queue_position`` events.
+        - Streams response chunks to the client as SSE. Deltas are coalesced into frames by
+          ``CoalescingSSEWriter``, which also sends heartbeats while the agent calls tools.
+        - Cancels the agent workflow, including in-flight LLM and tool requests, as soon as the
+          client disconnects (closed tab, stopped request), so no GPU time is spent on an answer
+          nobody reads.
+        - Saves both user and assistant messages to the database after streaming is complete, with an
+          async session that does not block the other streams of the process (see ``save_chat_turn``).
+          The partial answer of a cancelled stream is saved with ``cancelled`` set.
         - Logs errors and warnings related to streaming and database operations.
     """
     full_response_text = ""
-    try:
-        async_generator = agent.run(user_msg=user_input, memory=chat_memory)
-
-        async for chunk in async_generator.stream_events():
+    cancelled = False
+    handler = None
+    watcher = None
+
+    async def deltas():
+        nonlocal full_response_text, handler
+        handler = agent.run(user_msg=user_input, memory=chat_memory)
+        async for chunk in handler.stream_events():
             delta = None
             if hasattr(chunk, 'delta') and chunk.delta:
                 delta = chunk.delta
@@ -171,20 +257,63 @@ async def stream_agent_response(
 
             if delta:
                 full_response_text += delta
-                # Format as Server-Sent Event (SSE)
-                yield f"data: {json.dumps({'value': delta})}\n\n"
-                await asyncio.sleep(0.1)
+                yield delta
+        if not cancelled:
+            await handler
+
+    async def watch_disconnect():
+        nonlocal cancelled
+        while not await request.is_disconnected():
+            await asyncio.sleep(CHAT_STREAM_DISCONNECT_POLL_SECONDS)
+        cancelled = True
+        logger.info(f"Client of chat {chat_id} disconnected, cancelling the agent run")
+        if handler is not None:
+            cancel_agent_run(handler)
+        if admission_ticket is not None and not admission_ticket.admitted:
+            # leave the queue right away instead of at the next position update
+            get_admission_controller().release(admission_ticket)
 
-        # Signal the end of the stream
-        yield f"data: {json.dumps({'status': 'done'})}\n\n"
+    try:
+        if request is not None:
+            watcher = asyncio.create_task(watch_disconnect())
+
+        if admission_ticket is not None:
+            async for position in get_admission_controller().wait(admission_ticket):
+                yield f"data: {json.dumps({'queue_position': position})}\n\n"
+            if cancelled:
+                return
 
+        # Deltas are coalesced into SSE frames and sent as fast as the client reads them
+        async for frame in CoalescingSSEWriter().stream(deltas()):
+            yield frame
+
+        # Signal the end of the stream
+        if not cancelled:
+            yield f"data: {json.dumps({'status': 'done'})}\n\n"
+
+    except (asyncio.CancelledError, GeneratorExit):
+        # the server stops the response once the client is gone
+        cancelled = True
+        logger.info(f"Stream of chat {chat_id} closed by client, cancelling the agent run")
+        raise
     except Exception as e:
-        logger.error(f"Error during agent streaming for chat {chat_id}: {e}", exc_info=True)
-        yield f"data: {json.dumps({'error': 'An error occurred during streaming.'})}\n\n"
-        full_response_text += "\n\n[Error during generation]"
+        if cancelled:
+            logger.info(f"Agent run of chat {chat_id} ended after cancellation: {e!r}")
+        else:
+            logger.error(f"Error during agent streaming for chat {chat_id}: {e}", exc_info=True)
+            yield f"data: {json.dumps({'error': 'An error occurred during streaming.'})}\n\n"
+            full_response_text += "\n\n[Error during generation]"
     finally:
+        if watcher is not None:
+            watcher.cancel()
+        if admission_ticket is not None:
+            get_admission_controller().release(admission_ticket)
+        if handler is not None:
+            # no-op for finished runs; stops the workflow on every other way out of the stream
+            cancel_agent_run(handler)
+
         # Save the Assistant's full message AFTER streaming is complete
-        if full_response_text:
+        if full_response_text or cancelled:
             assistant_message = ChatMessage(
                 id=str(uuid.uuid4()),
                 role=MessageRole.ASSISTANT,
@@ -193,33 +322,83 @@ async def stream_agent_response(
                 additional_kwargs={},
                 chat_id=chat_id,
                 created_at=datetime.now(),
+                cancelled=cancelled,
             )
             messages = [
                 user_message,
                 assistant_message,
             ]
             try:
-                db_chat = db_client.get(Chat, chat_id)
-                if db_chat:
-                    for chat_message in messages:
-                        db_chat.messages.append(chat_message)
-
-                    db_chat.last_interacted_at = datetime.now()
-                    db_client.commit()
-                    db_client.refresh(db_chat)
-                    logger.info(f"Assistant message saved for chat {chat_id}")
+                # shielded, so a cancelled stream still saves its partial answer
+                save = asyncio.get_running_loop().create_task(save_chat_turn(chat_id, messages))
+                _pending_saves.add(save)
+                save.add_done_callback(_pending_saves.discard)
+                if await asyncio.shield(save):
+                    if cancelled:
+                        logger.info(f"Cancelled assistant message saved for chat {chat_id} "
+                                    f"({len(full_response_text)} characters)")
+                    else:
+                        logger.info(f"Assistant message saved for chat {chat_id}")
                 else:
                     logger.error(f"Chat {chat_id} not found when trying to save assistant message.")
 
+            except asyncio.CancelledError:
+                logger.info(f"Stream of chat {chat_id} cancelled while saving, the save continues")
+                raise
             except Exception as db_error:
                 logger.error(f"Failed to save assistant message for chat {chat_id}: {db_error}", exc_info=True)
-                db_client.rollback()
         else:
             logger.warning(f"No response generated for chat {chat_id}, not saving assistant message.")
 
 
+async def stream_indexing_progress(chat_id: str, file_ids: List[str], request: Request) -> AsyncGenerator[str, None]:
+    """
+    Streams the indexing progress events of a chat's files as Server-Sent Events (SSE).
+
+    The generator subscribes to the chat's progress channel first and then replays the latest stored
+    snapshot of every file, so no event published in between is lost. While no event arrives, a
+    comment line is sent every ``INDEXING_STREAM_HEARTBEAT_SECONDS`` to keep proxies from closing
+    the connection. The Redis connection is owned by the generator because it has to outlive the
+    request's dependencies.
+
+    Args:
+        chat_id (str): The unique identifier of the chat.
+        file_ids (List[str]): The files of the chat whose latest snapshot is replayed.
+        request (Request): The HTTP request, used to stop streaming once the client disconnects.
+
+    Yields:
+        str: SSE formatted progress snapshots or heartbeat comments.
+    """
+    redis_client = AsyncRedis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True)
+    pubsub = redis_client.pubsub()
+    try:
+        await pubsub.subscribe(progress_channel(chat_id))
+        if file_ids:
+            snapshots = await redis_client.mget([progress_snapshot_key(file_id) for file_id in file_ids])
+            for snapshot in snapshots:
+                if snapshot:
+                    yield f"data: {snapshot}\n\n"
+
+        while not await request.is_disconnected():
+            message = await pubsub.get_message(ignore_subscribe_messages=True,
+                                               timeout=INDEXING_STREAM_HEARTBEAT_SECONDS)
+            if message is None:
+                yield ": ping\n\n"
+            elif message["type"] == "message":
+                yield f"data: {message['data']}\n\n"
+    except asyncio.CancelledError:
+        logger.info(f"Indexing progress stream of chat {chat_id} closed by client")
+        raise
+    except Exception as e:
+        logger.error(f"Error during indexing progress streaming for chat {chat_id}: {e}", exc_info=True)
+        yield f"data: {json.dumps({'error': 'An error occurred during streaming.'})}\n\n"
+    finally:
+        await pubsub.aclose()
+        await redis_client.aclose()
+
+
 @router.get("/", response_model=Page[Chat])
-async def get_all_chats(db_client: SessionDep = SessionDep,
+async def get_all_chats(db_client: AsyncSessionDep = AsyncSessionDep,
                         request: Request = Request,
                         redis_client: Redis = Depends(get_redis_client)):
     """
@@ -238,7 +417,7 @@ async def get_all_chats(db_client: SessionDep = SessionDep,
     **Raises**:
     - 404: If the session ID is not found in cookies or the user is not authenticated.
     """
-    query = db_client.query(Chat)
+    query = select(Chat)
     session_id = request.cookies.get("session_id")
     if not session_id:
         logger.error(f"Session id not found in cookies")
@@ -246,13 +425,13 @@ async def get_all_chats(db_client: SessionDep = SessionDep,
     token = redis_client.get(f"session:{session_id}")
     claims = decode_jwt(token)
     user_id = claims["oid"]
-    query = query.filter(Chat.user_id == user_id).order_by(Chat.last_interacted_at.desc())
-    page = sqlalchemy_pagination(query)
+    query = query.where(Chat.user_id == user_id).order_by(Chat.last_interacted_at.desc())
+    page = await apaginate(db_client, query)
     return page
 
 
 @router.get("/search")
-async def get_chats_by_title(title: str, db_client: SessionDep = SessionDep,
+async def get_chats_by_title(title: str, db_client: AsyncSessionDep = AsyncSessionDep,
                              request: Request = Request,
                              redis_client: Redis = Depends(get_redis_client)):
     """
@@ -278,14 +457,14 @@ async def get_chats_by_title(title: str, db_client: SessionDep = SessionDep,
     token = redis_client.get(f"session:{session_id}")
     claims = decode_jwt(token)
     user_id = claims["oid"]
-    chats = (db_client
-             .query(Chat).filter(Chat.title.like(f"%{title}%")).filter(Chat.user_id == user_id).all())
+    chats = (await db_client
+             .exec(select(Chat).where(Chat.title.like(f"%{title}%")).where(Chat.user_id == user_id))).all()
 
     return chats
 
 
 @router.get("/{chat_id}")
-async def get_chat(chat_id: str, db_client: SessionDep = SessionDep,
+async def get_chat(chat_id: str, db_client: AsyncSessionDep = AsyncSessionDep,
                    request: Request = Request,
                    redis_client: Redis = Depends(get_redis_client)):
     """
@@ -304,15 +483,15 @@ async def get_chat(chat_id: str, db_client: SessionDep = SessionDep,
     **Raises**:
     - 404: If the chat is not found or does not belong to the user.
     """
-    db_chat = db_client.get(Chat, chat_id)
+    db_chat = await db_client.get(Chat, chat_id, options=[selectinload(Chat.files), selectinload(Chat.favourite)])
     if not db_chat:
         logger.error(f"Chat {chat_id} not found")
         raise HTTPException(status_code=404, detail="Chat not found")
 
     belongs_to_user = check_property_belongs_to_user(request, redis_client, db_chat)
-    messages = (db_client.query(ChatMessage)
-                .filter(ChatMessage.chat_id == chat_id)
-                .order_by(ChatMessage.created_at.desc()).all())[:10]
+    messages = (await db_client.exec(select(ChatMessage)
+                                     .where(ChatMessage.chat_id == chat_id)
+                                     .order_by(ChatMessage.created_at.desc()).limit(10))).all()
 
     if not belongs_to_user:
         logger.error(f"Chat {chat_id} does not belong to user")
@@ -329,9 +508,47 @@ async def get_chat(chat_id: str, db_client: SessionDep = SessionDep,
     }
 
 
+@router.get("/{chat_id}/indexing/stream")
+async def stream_chat_indexing_progress(chat_id: str, db_client: AsyncSessionDep = AsyncSessionDep,
+                                        request: Request = Request,
+                                        redis_client: Redis = Depends(get_redis_client)):
+    """
+    Stream the live indexing progress of all files of a chat.
+
+    Every event is a JSON snapshot of one file's ingestion with its current stage, the number of parsed
+    pages, produced, embedded and upserted chunks, the throughput in chunks/sec and, once finished, its
+    final status or error. The latest snapshot of every file is sent first, so the stream can be
+    opened at any time after an upload.
+
+    - **chat_id**: The unique identifier of the chat.
+    - **db_client**: Database session dependency.
+    - **request**: HTTP request object to extract cookies.
+    - **redis_client**: Redis client dependency for session validation.
+
+    **Returns**:
+    - A `text/event-stream` response with the progress events.
+
+    **Raises**:
+    - 404: If the chat is not found or does not belong to the user.
+    """
+    db_chat = await get_chat_with_files(db_client, chat_id)
+    if not db_chat:
+        logger.error(f"Chat {chat_id} not found")
+        raise HTTPException(status_code=404, detail="Chat not found")
+
+    belongs_to_user, _ = check_property_belongs_to_user(request, redis_client, db_chat)
+    if not belongs_to_user:
+        logger.error(f"Chat {chat_id} does not belong to user")
+        raise HTTPException(status_code=404, detail="Chat not found")
+
+    file_ids = [file.id for file in db_chat.files]
+    return StreamingResponse(stream_indexing_progress(chat_id, file_ids, request),
+                             media_type="text/event-stream")
+
+
 @router.post("/{chat_id}/chat/stream")
 async def chat_stream(chat_id: str, chat: ChatQuery,
-                      db_client: SessionDep = SessionDep,
+                      db_client: AsyncSessionDep = AsyncSessionDep,
                       request: Request = Request,
                       redis_client: Redis = Depends(get_redis_client),
                       chroma_vector_store: ChromaVectorStore = Depends(get_chroma_vector)):
@@ -345,7 +562,7 @@ async def chat_stream(chat_id: str, chat: ChatQuery,
     Args:
         chat_id (str): The unique identifier of the chat session.
         chat (ChatQuery): The chat query object containing the user's input text.
-        db_client (Session): Database session dependency for interacting with the database.
+        db_client (AsyncSession): Async database session dependency for interacting with the database.
         request (Request): The HTTP request object.
         redis_client (Redis): Redis client dependency for caching and session management.
         chroma_vector_store (ChromaVectorStore): Dependency for vector-based storage and retrieval.
@@ -363,7 +580,7 @@ async def chat_stream(chat_id: str, chat: ChatQuery,
         logger.error("Missing chat parameter")
         raise HTTPException(status_code=404, detail="Body: text is required")
 
-    db_chat = db_client.get(Chat, chat_id)
+    db_chat = await get_chat_with_files(db_client, chat_id)
     if not db_chat:
         logger.error(f"Chat {chat_id} not found")
         raise HTTPException(status_code=404, detail="Chat not found")
@@ -383,9 +600,9 @@ async def chat_stream(chat_id: str, chat: ChatQuery,
         created_at=datetime.now(),
     )
 
-    old_messages = (db_client.query(ChatMessage)
-                    .filter(ChatMessage.chat_id == chat_id)
-                    .order_by(ChatMessage.created_at.desc()).all())[:25]
+    old_messages = (await db_client.exec(select(ChatMessage)
+                                         .where(ChatMessage.chat_id == chat_id)
+                                         .order_by(ChatMessage.created_at.desc()).limit(25))).all()
 
     chat_history = [
         LLMChatMessage(
@@ -396,7 +613,6 @@ async def chat_stream(chat_id: str, chat: ChatQuery,
         for message in old_messages
     ]
 
-    tools: List[BaseTool] = []
     files = db_chat.files
 
     if db_chat.model:
@@ -405,49 +621,99 @@ async def chat_stream(chat_id: str, chat: ChatQuery,
         model_from_chat = "llama3.3:70b"
         
     provider = os.getenv('LLM_PROVIDER', 'OLLAMA')
-    llm = None
-    
-    if provider == 'OLLAMA':
-        llm = Ollama(model=model_from_chat, temperature=db_chat.temperature, request_timeout=500, base_url=base_url)
-    elif provider == 'IONOS':
-        llm = initialize_ionos_llm(temperature=db_chat.temperature)
-
-    # new implementation of agent memory
-    chat_memory = create_memory(chat_id=chat_id, llm=llm, messages=chat_history,
-                                vector_store=chroma_vector_store, token_limit=128_000, system_prompt=db_chat.context)
-
-    for file_id, file_params in chat.params.files.items():
-        files_to_query = [file for file in files if file.id == file_id and file_params.queried == True]
-        query_engine_tools = (
-            create_query_engine_tools(files=files_to_query, chroma_vector_store=chroma_vector_store, llm=llm, params=file_params)
-        )
-        if len(query_engine_tools) > 0:
-            tools += query_engine_tools
-        for file in files_to_query:
-            if file.id == file_id and file_params.query_type == 'sql':
-                sql_tools = create_sql_engines_tools_from_files(files=files_to_query,
-                                                                chroma_vector_store=chroma_vector_store)
-                tools += sql_tools
-            if file.id == file_id and file_params.query_type == 'spreadsheet':
-                pd_tools = create_pandas_engines_tools_from_files(files=files_to_query)
-                tools += pd_tools
-    
-    if chat.params.use_link_scraping:
-        scrape_tool = create_url_loader_tool(chroma_vector_store=chroma_vector_store, chat=db_chat)
-        tools.append(scrape_tool)
-    if chat.params.use_websearch:
-        search_engine_tool = create_search_engine_tool(chroma_vector_store=chroma_vector_store, chat=db_chat)
-        tools.append(search_engine_tool)
 
-    agent = create_agent(system_prompt=db_chat.context, tools=tools, llm=llm)
-    streaming_generator = stream_agent_response(agent=agent, user_input=chat.text, db_client=db_client,
-                                                chat_id=db_chat.id, user_message=user_message, chat_memory=chat_memory)
+    # bounded concurrency per model backend with a fair queue per user; a full queue fails fast
+    admission = get_admission_controller()
+    admission_model = f"{provider}:{IONOS_MODEL if provider == 'IONOS' else model_from_chat}"
+    try:
+        ticket = admission.admit(admission_model, db_chat.user_id)
+    except AdmissionRejected as e:
+        logger.warning(f"Rejected chat request of chat {chat_id}: {e}")
+        raise HTTPException(status_code=429, detail="Too many requests for this model, please retry later",
+                            headers={"Retry-After": str(e.retry_after)})
 
-    return StreamingResponse(streaming_generator, media_type="text/event-stream")
+    try:
+        # the LLM and the file tools are reused across turns until the chat's files or settings change
+        tool_cache = get_tool_cache()
+        cache_key = tool_cache_key(chat_id, get_chat_tools_version(redis_client, chat_id), chat.params.files,
+                                   model=model_from_chat, temperature=db_chat.temperature, provider=provider,
+                                   retrieval_mode=RETRIEVAL_MODE)
+        cached = tool_cache.get(cache_key)
+        if cached:
+            llm, file_tools = cached
+        else:
+            llm = None
+            file_tools: List[BaseTool] = []
+
+            if provider in ('OLLAMA', 'IONOS'):
+                # shared instances with pooled, keep-alive connections per backend
+                llm = get_llm_registry().get_llm(provider, model_from_chat, db_chat.temperature)
+
+            merged_files = []
+            if RETRIEVAL_MODE == 'merged':
+                # all files with a classic (or hybrid) query are searched by one tool with a single retrieval
+                for query_type in ('basic', 'hybrid'):
+                    merged_ids = {file_id for file_id, file_params in chat.params.files.items()
+                                  if file_params.queried and file_params.query_type == query_type}
+                    query_type_files = [file for file in files if file.id in merged_ids]
+                    merged_tool = create_merged_query_engine_tool(files=query_type_files,
+                                                                  chroma_vector_store=chroma_vector_store, llm=llm,
+                                                                  hybrid=query_type == 'hybrid')
+                    if merged_tool:
+                        file_tools.append(merged_tool)
+                    merged_files += query_type_files
+
+            for file_id, file_params in chat.params.files.items():
+                files_to_query = [file for file in files if file.id == file_id and file_params.queried == True]
+                files_for_engines = [file for file in files_to_query if file not in merged_files]
+                query_engine_tools = (
+                    create_query_engine_tools(files=files_for_engines, chroma_vector_store=chroma_vector_store, llm=llm,
+                                              params=file_params)
+                )
+                if len(query_engine_tools) > 0:
+                    file_tools += query_engine_tools
+                for file in files_to_query:
+                    if file.id == file_id and file_params.query_type == 'sql':
+                        sql_tools = create_sql_engines_tools_from_files(files=files_to_query,
+                                                                        chroma_vector_store=chroma_vector_store)
+                        file_tools += sql_tools
+                    if file.id == file_id and file_params.query_type == 'duckdb':
+                        duckdb_tools = create_duckdb_engines_tools_from_files(files=files_to_query, llm=llm)
+                        file_tools += duckdb_tools
+
+            tool_cache.put(cache_key, (llm, file_tools))
+
+        tools: List[BaseTool] = list(file_tools)
+        # pandas tools hold their DataFrames, so they are not cached with the other tools; the frames
+        # come from the size-bounded DataFrame cache instead
+        spreadsheet_files = [file for file in files
+                             if file.id in chat.params.files and chat.params.files[file.id].queried == True
+                             and chat.params.files[file.id].query_type == 'spreadsheet']
+        tools += create_pandas_engines_tools_from_files(files=spreadsheet_files)
+
+        # new implementation of agent memory
+        chat_memory = create_memory(chat_id=chat_id, llm=llm, messages=chat_history,
+                                    vector_store=chroma_vector_store, token_limit=128_000, system_prompt=db_chat.context)
+
+        if chat.params.use_link_scraping:
+            scrape_tool = create_url_loader_tool(chroma_vector_store=chroma_vector_store, chat=db_chat)
+            tools.append(scrape_tool)
+        if chat.params.use_websearch:
+            search_engine_tool = create_search_engine_tool(chroma_vector_store=chroma_vector_store, chat=db_chat)
+            tools.append(search_engine_tool)
+
+        agent = create_agent(system_prompt=db_chat.context, tools=tools, llm=llm)
+        streaming_generator = stream_agent_response(agent=agent, user_input=chat.text, chat_id=db_chat.id, user_message=user_message, chat_memory=chat_memory,
+                                                    request=request, admission_ticket=ticket)
+
+        return AdmittedStreamingResponse(streaming_generator, ticket=ticket, media_type="text/event-stream")
+    except Exception:
+        admission.release(ticket)
+        raise
 
 @router.post("/{chat_id}/chat")
 async def chat_with_given_chat_id(chat_id: str, chat: ChatQuery,
-                                  db_client: SessionDep = SessionDep,
+                                  db_client: AsyncSessionDep = AsyncSessionDep,
                                   request: Request = Request,
                                   redis_client: Redis = Depends(get_redis_client),
                                   chroma_vector_store: ChromaVectorStore = Depends(get_chroma_vector)):
@@ -474,7 +740,7 @@ async def chat_with_given_chat_id(chat_id: str, chat: ChatQuery,
         logger.error("Missing chat parameter")
         raise HTTPException(status_code=404, detail="Body: text is required")
 
-    db_chat = db_client.get(Chat, chat_id)
+    db_chat = await get_chat_with_files(db_client, chat_id)
     if not db_chat:
         logger.error(f"Chat {chat_id} not found")
         raise HTTPException(status_code=404, detail="Chat not found")
@@ -494,9 +760,9 @@ async def chat_with_given_chat_id(chat_id: str, chat: ChatQuery,
         created_at=datetime.now(),
     )
 
-    old_messages = (db_client.query(ChatMessage)
-                    .filter(ChatMessage.chat_id == chat_id)
-                    .order_by(ChatMessage.created_at.desc()).all())[:25]
+    old_messages = (await db_client.exec(select(ChatMessage)
+                                         .where(ChatMessage.chat_id == chat_id)
+                                         .order_by(ChatMessage.created_at.desc()).limit(25))).all()
 
     chat_history = [
         LLMChatMessage(
@@ -531,7 +797,7 @@ async def chat_with_given_chat_id(chat_id: str, chat: ChatQuery,
     else:
         model_from_chat = "llama3.3:70b"
 
-    llm = Ollama(model=model_from_chat, temperature=db_chat.temperature, request_timeout=500, base_url=base_url)
+    llm = get_llm_registry().get_llm('OLLAMA', model_from_chat, db_chat.temperature)
     agent = create_agent(memory=chat_memory, system_prompt=PromptTemplate(db_chat.context), tools=tools, llm=llm)
     agent_response: AgentChatResponse = await agent.achat(chat.text)
 
@@ -548,11 +814,9 @@ async def chat_with_given_chat_id(chat_id: str, chat: ChatQuery,
             created_at=datetime.now(),
         )
     ]
-    for chat_message in chat_messages:
-        db_chat.messages.append(chat_message)
+    db_client.add_all(chat_messages)
     db_client.add(db_chat)
-    db_client.commit()
-    db_client.refresh(db_chat)
+    await db_client.commit()
 
     return {
         **db_chat.model_dump(),
@@ -565,16 +829,17 @@ async def chat_with_given_chat_id(chat_id: str, chat: ChatQuery,
 
 @router.post("/{chat_id}/upload")
 async def upload_file_to_chat(chat_id: str, file: UploadFile = File(...),
-                              db_client: SessionDep = SessionDep,
+                              db_client: AsyncSessionDep = AsyncSessionDep,
                               request: Request = Request,
                               chroma_collection: Collection = Depends(get_chroma_collection),
-                              redis_session: Redis = Depends(get_redis_client),
-                              background_tasks: BackgroundTasks = BackgroundTasks):
+                              redis_session: Redis = Depends(get_redis_client)):
     """
     Upload a file to a specific chat.
 
-    This endpoint allows the user to upload a file to a chat. If the file is an SQL dump, 
-    it will be processed and indexed in the background.
+    This endpoint allows the user to upload a file to a chat. The file is persisted and an 
+    indexing job is enqueued in the durable job queue; SQL dumps, spreadsheets and documents are 
+    processed and indexed by the separate indexing workers (`python worker.py`). The job state is 
+    reflected in the file's `index_status`.
 
     - **chat_id**: The unique identifier of the chat.
     - **file**: The file to be uploaded.
@@ -582,7 +847,6 @@ async def upload_file_to_chat(chat_id: str, file: UploadFile = File(...),
     - **request**: HTTP request object to extract cookies.
     - **chroma_collection**: Dependency for vector store operations.
     - **redis_session**: Redis client dependency for session validation.
-    - **background_tasks**: Background task manager for processing SQL dumps.
 
     **Returns**:
     - The updated chat details, including the uploaded file.
@@ -591,7 +855,7 @@ async def upload_file_to_chat(chat_id: str, file: UploadFile = File(...),
     - 404: If the chat is not found, does not belong to the user, or the file already exists.
     - 500: If an error occurs during file processing or indexing.
     """
-    db_chat = db_client.get(Chat, chat_id)
+    db_chat = await get_chat_with_files(db_client, chat_id)
     # Check if chat exists, if exists, continue
     if not db_chat:
         logger.error("Chat not found")
@@ -634,49 +898,141 @@ async def upload_file_to_chat(chat_id: str, file: UploadFile = File(...),
         db_file.database_name = database_name
         database_type = detect_sql_dump_type(str(file_path))
         db_file.database_type = database_type
-        background_tasks.add_task(process_dump_to_persist, db_client=db_client, chat_id=chat_id,
-                                  sql_dump_path=str(file_path), database_type=database_type, chat_file_id=db_file.id,
-                                  db_name=database_name, chroma_collection=chroma_collection)
 
     try:
-        # indexes file
+        # persists the file together with its indexing job, which the indexing workers (worker.py) pick up
         db_chat.last_interacted_at = datetime.now()
         db_chat.files.append(db_file)
-        db_client.commit()
-
+        if db_file.database_name:
+            enqueue_indexing_job(db_client, db_file, kind=JOB_KIND_SQL_DUMP,
+                                 payload={'sql_dump_path': str(file_path), 'database_type': db_file.database_type,
+                                          'db_name': db_file.database_name})
         if not any(ext in file.content_type.lower() or ext in file.filename.lower()
                    for ext in ["sql", "xlsx", "spreadsheet", "csv"]):
-            background_tasks.add_task(index_uploaded_file, path=str(file_path), chat_file=db_file,
-                                      chroma_collection=chroma_collection, db_client=db_client)
+            enqueue_indexing_job(db_client, db_file, kind=JOB_KIND_DOCUMENT, payload={'path': str(file_path)})
         if any(ext in file.content_type.lower() or ext in file.filename.lower()
                for ext in ["xlsx", "spreadsheet", "csv"]):
-            md_id = str(uuid.uuid4())
-            md_file_path = f"{os.getcwd()}/uploads/{db_chat.id}/{file.filename.split('.')[0]}.md"
-            md_file = ChatFile(
-                id=md_id,
-                file_name=f"{db_file.file_name.split('.')[0]}.md",
-                path_name=md_file_path,
-                indexed=False,
-                chat_id=chat_id,
-                mime_type="text/markdown"
-            )
-            try:
-                db_chat.files.append(md_file)
-                db_client.commit()
-                logger.info(f"Created temporary markdown file, that is not indexed yet: {md_file.file_name}")
-            except Exception as e:
-                logger.error(e)
-                db_client.rollback()
-            background_tasks.add_task(index_spreadsheet, chroma_collection=chroma_collection,
-                                      file=db_file,
-                                      db_client=db_client)
-        db_client.refresh(db_chat)
+            enqueue_indexing_job(db_client, db_file, kind=JOB_KIND_SPREADSHEET)
+        await db_client.commit()
+        invalidate_chat_tools(redis_session, chat_id)
+        await db_client.refresh(db_chat, attribute_names=["files"])
+        return {
+            **db_chat.model_dump(),
+            'files': db_chat.files,
+        }
+    except Exception as e:
+        await db_client.rollback()
+        # neither the file nor its job were persisted
+        file_path.unlink(missing_ok=True)
+        logger.error(e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.put("/{chat_id}/replace/{file_id}")
+async def replace_file_of_chat(chat_id: str, file_id: str, file: UploadFile = File(...),
+                               db_client: AsyncSessionDep = AsyncSessionDep,
+                               request: Request = Request,
+                               redis_session: Redis = Depends(get_redis_client)):
+    """
+    Replace an uploaded file of a chat with a new version.
+
+    The new content is written over the stored file and the file is re-indexed by the indexing
+    workers. Re-indexing diffs the chunks of the new version against the chunks stored for the
+    file: only new or changed chunks are embedded and upserted, and chunks that vanished are
+    removed from the vector store. The file keeps its id and name, so tool selections of the
+    chat stay valid.
+
+    - **chat_id**: The unique identifier of the chat.
+    - **file_id**: The unique identifier of the file to replace.
+    - **file**: The new version of the file.
+    - **db_client**: Database session dependency.
+    - **request**: HTTP request object to extract cookies.
+    - **redis_session**: Redis client dependency for session validation.
+
+    **Returns**:
+    - The updated chat details, including the replaced file.
+
+    **Raises**:
+    - 400: If the file is a SQL dump or the new version is of a different kind.
+    - 404: If the chat or file is not found, or the chat does not belong to the user.
+    - 409: If the file is being indexed right now.
+    - 500: If an error occurs while persisting the new version.
+    """
+    db_chat = await get_chat_with_files(db_client, chat_id)
+    if not db_chat:
+        logger.error(f"Chat {chat_id} not found")
+        raise HTTPException(status_code=404, detail="Chat not found")
+
+    belongs_to_user, _ = check_property_belongs_to_user(request, redis_session, db_chat)
+    if not belongs_to_user:
+        logger.error(f"Chat {chat_id} does not belong to user")
+        raise HTTPException(status_code=404, detail="Chat does not belong to user")
+
+    db_file = await db_client.get(ChatFile, file_id)
+    if not db_file or db_file.chat_id != chat_id:
+        logger.error(f"File {file_id} not found or does not belong to Chat {chat_id}")
+        raise HTTPException(status_code=404, detail="File not found or does not belong to this chat")
+
+    if db_file.mime_type.lower().find("sql") != -1 or file.content_type.lower().find("sql") != -1:
+        logger.error(f"Replacing SQL dump {db_file.file_name} is not supported")
+        raise HTTPException(status_code=400, detail="SQL dumps can not be replaced, delete and upload it again")
+
+    def is_spreadsheet(mime_type: str, file_name: str) -> bool:
+        return any(ext in mime_type.lower() or ext in file_name.lower() for ext in ["xlsx", "spreadsheet", "csv"])
+
+    spreadsheet = is_spreadsheet(db_file.mime_type, db_file.file_name)
+    if spreadsheet != is_spreadsheet(file.content_type, file.filename):
+        logger.error(f"New version of {db_file.file_name} is of a different kind: {file.filename}")
+        raise HTTPException(status_code=400, detail="The new version must be of the same kind as the file")
+
+    # the file's unfinished jobs stay locked until the new version is committed, so no worker
+    # claims a pending job (and starts reading the old version) while the file is swapped
+    pending_jobs = (await db_client.exec(
+        select(IndexingJob)
+        .where(IndexingJob.chat_file_id == db_file.id,
+               IndexingJob.status.in_([STATUS_QUEUED, STATUS_RETRYING, STATUS_RUNNING]))
+        .with_for_update()
+    )).all()
+    if any(job.status == STATUS_RUNNING for job in pending_jobs):
+        await db_client.rollback()
+        logger.error(f"File {db_file.file_name} is being indexed, can not replace it now")
+        raise HTTPException(status_code=409, detail="File is being indexed, try again later")
+
+    backup_path = None
+    try:
+        # write next to the old version and swap atomically, so readers never see a partial file;
+        # the old version is kept until the re-indexing job is committed
+        tmp_path = f"{db_file.path_name}.{uuid.uuid4()}.tmp"
+        with open(tmp_path, "wb+") as buffer:
+            buffer.write(file.file.read())
+        backup_path = f"{db_file.path_name}.{uuid.uuid4()}.bak"
+        os.link(db_file.path_name, backup_path)
+        os.replace(tmp_path, db_file.path_name)
+
+        db_file.indexed = None if spreadsheet else False
+        db_chat.last_interacted_at = datetime.now()
+        if not pending_jobs:
+            # a pending job reads the new version anyway
+            if spreadsheet:
+                enqueue_indexing_job(db_client, db_file, kind=JOB_KIND_SPREADSHEET)
+            else:
+                enqueue_indexing_job(db_client, db_file, kind=JOB_KIND_DOCUMENT,
+                                     payload={'path': db_file.path_name})
+        await db_client.commit()
+        backup, backup_path = backup_path, None
+        os.remove(backup)
+        invalidate_chat_tools(redis_session, chat_id)
+        await db_client.refresh(db_chat, attribute_names=["files"])
+        logger.info(f"Replaced file {db_file.file_name} of chat {chat_id}, re-indexing by chunk diff")
         return {
             **db_chat.model_dump(),
             'files': db_chat.files,
         }
     except Exception as e:
-        db_client.rollback()
+        await db_client.rollback()
+        if backup_path and os.path.exists(backup_path):
+            # no job re-indexes the new version, so the stored chunks still belong to the old one
+            os.replace(backup_path, db_file.path_name)
         logger.error(e)
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -685,7 +1041,7 @@ async def upload_file_to_chat(chat_id: str, file: UploadFile = File(...),
 async def create_chat(
         chat: str = Form(...),
         file: Optional[UploadFile] = None,
-        db_client: SessionDep = SessionDep,
+        db_client: AsyncSessionDep = AsyncSessionDep,
         request: Request = Request,
         redis_client: Redis = Depends(get_redis_client)
 ):
@@ -746,23 +1102,22 @@ async def create_chat(
 
     try:
         db_client.add(db_chat)
-        db_client.commit()
-        db_client.refresh(db_chat)
+        await db_client.commit()
     except Exception as e:
         logger.error(e)
-        db_client.rollback()
+        await db_client.rollback()
         return Response(status_code=500, content="Chat create error.")
 
     return {
         **db_chat.model_dump(),
-        'files': db_chat.files,
+        'files': [],
     }
 
 
 @router.put("/{chat_id}")
 async def update_chat(chat_id: str, chat: str = Form(...), file: UploadFile = File(None),
                       request: Request = Request,
-                      db_client: SessionDep = SessionDep,
+                      db_client: AsyncSessionDep = AsyncSessionDep,
                       redis_client: Redis = Depends(get_redis_client)):
     """
     Update an existing chat.
@@ -784,7 +1139,7 @@ async def update_chat(chat_id: str, chat: str = Form(...), file: UploadFile = Fi
     - 404: If the chat is not found or does not belong to the user.
     - 400: If the avatar image format is invalid.
     """
-    db_chat = db_client.get(Chat, chat_id)
+    db_chat = await get_chat_with_files(db_client, chat_id)
     if not db_chat:
         logger.error(f"Chat {chat_id} not found")
         raise HTTPException(status_code=404, detail="Chat not found")
@@ -820,8 +1175,8 @@ async def update_chat(chat_id: str, chat: str = Form(...), file: UploadFile = Fi
 
     db_chat.last_interacted_at = datetime.now()
     db_client.add(db_chat)
-    db_client.commit()
-    db_client.refresh(db_chat)
+    await db_client.commit()
+    invalidate_chat_tools(redis_client, chat_id)
 
     return {
         **db_chat.model_dump(),
@@ -830,7 +1185,7 @@ async def update_chat(chat_id: str, chat: str = Form(...), file: UploadFile = Fi
 
 
 @router.delete("/{chat_id}")
-async def delete_chat(chat_id: str, db_client: SessionDep = SessionDep,
+async def delete_chat(chat_id: str, db_client: AsyncSessionDep = AsyncSessionDep,
                       request: Request = Request,
                       redis_client: Redis = Depends(get_redis_client),
                       chroma_collection: Collection = Depends(get_chroma_collection)):
@@ -852,7 +1207,7 @@ async def delete_chat(chat_id: str, db_client: SessionDep = SessionDep,
     **Raises**:
     - 404: If the chat is not found or does not belong to the user.
     """
-    db_chat = db_client.get(Chat, chat_id)
+    db_chat = await get_chat_with_files(db_client, chat_id)
     if not db_chat:
         logger.error(f"Chat {chat_id} not found")
         raise HTTPException(status_code=404, detail="Chat not found")
@@ -863,8 +1218,13 @@ async def delete_chat(chat_id: str, db_client: SessionDep = SessionDep,
         raise HTTPException(status_code=404, detail="Chat does not belong to user")
 
     files = db_chat.files
-    for _file in files:
-        deletes_file_index_from_collection(file_id=_file.id, chroma_collection=chroma_collection)
+    if CHROMA_SHARDING == "chat" and chroma_collection.name != CHROMA_COLLECTION:
+        # the chat's shard holds nothing but its own vectors; the global collection, which legacy
+        # chats resolve to, is never dropped
+        await asyncio.to_thread(chroma_client.delete_collection, chroma_collection.name)
+    else:
+        await deletes_files_index_from_collection(file_ids=[_file.id for _file in files],
+                                                  chroma_collection=chroma_collection, db_client=db_client)
 
     # Get chat folder path and delete all files inside
     chat_folder = BASE_UPLOAD_DIR / str(chat_id)
@@ -877,15 +1237,16 @@ async def delete_chat(chat_id: str, db_client: SessionDep = SessionDep,
     if db_chat.avatar_path and Path(db_chat.avatar_path).exists():
         Path(db_chat.avatar_path).unlink()
 
-    db_client.delete(db_chat)
-    db_client.commit()
+    await db_client.delete(db_chat)
+    await db_client.commit()
+    invalidate_chat_tools(redis_client, chat_id)
     return {
         **db_chat.model_dump(),
     }
 
 
 @router.delete("/{chat_id}/delete/{file_id}")
-async def delete_file_of_chat(chat_id: str, file_id: str, db_client: SessionDep = SessionDep,
+async def delete_file_of_chat(chat_id: str, file_id: str, db_client: AsyncSessionDep = AsyncSessionDep,
                               request: Request = Request,
                               redis_client: Redis = Depends(get_redis_client),
                               chroma_collection: Collection = Depends(get_chroma_collection)):
@@ -909,7 +1270,7 @@ async def delete_file_of_chat(chat_id: str, file_id: str, db_client: SessionDep
     - 404: If the chat or file is not found, or the file does not belong to the chat.
     """
     # If chat is not existing, raise Error
-    db_chat = db_client.get(Chat, chat_id)
+    db_chat = await get_chat_with_files(db_client, chat_id)
     if not db_chat:
         logger.error(f"Chat {chat_id} not found")
         raise HTTPException(status_code=404, detail="Chat not found")
@@ -920,7 +1281,7 @@ async def delete_file_of_chat(chat_id: str, file_id: str, db_client: SessionDep
         raise HTTPException(status_code=404, detail="Chat does not belong to user")
 
     # If file is not existing or does not belong to Chat, raise Error
-    db_file = db_client.get(ChatFile, file_id)
+    db_file = await db_client.get(ChatFile, file_id)
     if not db_file or db_file.chat_id != chat_id:
         logger.error(f"{db_file.file_name} not found or does not belong to Chat")
         raise HTTPException(status_code=404, detail="File not found or does not belong to this chat")
@@ -929,18 +1290,21 @@ async def delete_file_of_chat(chat_id: str, file_id: str, db_client: SessionDep
     file_path = BASE_UPLOAD_DIR / str(chat_id) / db_file.file_name
     if file_path.exists():
         file_path.unlink()  # Delete file from storage
+    remove_columnar_files(str(file_path))  # Parquet copies of spreadsheets
+    remove_lexical_index(str(file_path))
 
     if db_file.mime_type.find("sql") != -1:
-        # delete sql database
-        delete_database_from_postgres(db_file.database_name)
-    else:
-        # deletes index from DB
-        deletes_file_index_from_collection(chroma_collection=chroma_collection, file_id=db_file.id)
+        # delete sql database; the blocking DROP DATABASE runs in a worker thread
+        await asyncio.to_thread(delete_database_from_postgres, db_file.database_name)
+    # deletes index from DB, for SQL dumps the vectors of their table schemas
+    await deletes_file_index_from_collection(chroma_collection=chroma_collection, file_id=db_file.id,
+                                             db_client=db_client)
     # Remove file record from the database
-    db_client.delete(db_file)
+    await db_client.delete(db_file)
     db_chat.last_interacted_at = datetime.now()
-    db_client.commit()
-    db_client.refresh(db_chat)
+    await db_client.commit()
+    invalidate_chat_tools(redis_client, chat_id)
+    await db_client.refresh(db_chat, attribute_names=["files"])
 
     return {
         **db_chat.model_dump(),
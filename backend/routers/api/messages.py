@@ -1,14 +1,14 @@
 from routers.custom_router import APIRouter
 from fastapi import Depends
 from redis import Redis
-from sqlmodel import Session
+from sqlmodel import select
 from starlette.exceptions import HTTPException
 from starlette.requests import Request
-from dependencies import get_db_session, get_redis_client
+from dependencies import AsyncSessionDep, get_redis_client
 from utils import decode_jwt
 from models import Chat, ChatMessage
 from fastapi_pagination import Page
-from fastapi_pagination.ext.sqlalchemy import paginate as sqlalchemy_pagination
+from fastapi_pagination.ext.sqlalchemy import apaginate
 from dependencies import logger
 
 router = APIRouter(
@@ -20,7 +20,7 @@ router = APIRouter(
 @router.get("/{chat_id}", response_model=Page[ChatMessage])
 async def get_messages_by_chat_id(chat_id: str, request: Request = Request,
                                   redis_client: Redis = Depends(get_redis_client),
-                                  db_client: Session = Depends(get_db_session)):
+                                  db_client: AsyncSessionDep = AsyncSessionDep):
     """
     Retrieve paginated chat messages for a specific chat ID.
 
@@ -31,7 +31,7 @@ async def get_messages_by_chat_id(chat_id: str, request: Request = Request,
         chat_id (str): The unique identifier of the chat whose messages are to be retrieved.
         request (Request): The HTTP request object, used to extract cookies.
         redis_client (Redis): Redis client dependency for session validation.
-        db_client (Session): Database session dependency for querying chat messages.
+        db_client (AsyncSession): Async database session dependency for querying chat messages.
 
     Returns:
         Page[ChatMessage]: A paginated list of chat messages for the specified chat ID.
@@ -63,7 +63,6 @@ async def get_messages_by_chat_id(chat_id: str, request: Request = Request,
             "size": 5
         }
     """
-    query = db_client.query(ChatMessage)
     session_id = request.cookies.get("session_id")
     if not session_id:
         logger.error(f"No session_id cookie found for {chat_id}")
@@ -71,12 +70,12 @@ async def get_messages_by_chat_id(chat_id: str, request: Request = Request,
     token = redis_client.get(f"session:{session_id}")
     claims = decode_jwt(token)
     user_id = claims["oid"]
-    query = query.filter(ChatMessage.chat_id == chat_id).order_by(ChatMessage.created_at.desc())
-    page = sqlalchemy_pagination(query)
-    chat: Chat | None = page.items[0].chat if len(page.items) > 0 else None
+    chat: Chat | None = await db_client.get(Chat, chat_id)
 
     if chat and not chat.user_id == user_id:
-        logger.error(f"Chat {chat.chat_id} does not belong to {user_id}")
+        logger.error(f"Chat {chat.id} does not belong to {user_id}")
         raise HTTPException(status_code=404, detail="Chat does not belong to you")
 
+    query = select(ChatMessage).where(ChatMessage.chat_id == chat_id).order_by(ChatMessage.created_at.desc())
+    page = await apaginate(db_client, query)
     return page
\ No newline at end of file
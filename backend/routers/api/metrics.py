@@ -0,0 +1,53 @@
+from redis import Redis
+from starlette.requests import Request
+from routers.custom_router import APIRouter
+from fastapi import Depends, HTTPException
+from dependencies import get_redis_client, logger
+from services import (
+    get_embedding_cache,
+    get_query_cache,
+    get_tool_cache,
+    get_dataframe_cache,
+    get_llm_registry,
+    get_admission_controller,
+)
+from utils import get_sql_engine_registry, get_sql_result_cache
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["metrics"],
+    responses={404: {"description": "Not found"}},
+)
+
+@router.get("/")
+async def get_metrics(request: Request, redis_client: Redis = Depends(get_redis_client)):
+    """
+    Retrieve runtime metrics of the backend's caches and pools.
+
+    - **request**: HTTP request object to extract cookies.
+    - **redis_client**: Redis client dependency for session validation.
+
+    **Returns**:
+    - A dictionary with one entry per instrumented component, e.g. the embedding cache's
+      hit/miss counters.
+
+    **Raises**:
+    - 401: If the session ID is not found or expired.
+    """
+    session_id = request.cookies.get("session_id")
+    if not session_id or not redis_client.get(f"session:{session_id}"):
+        logger.error("Metrics requested without a valid session")
+        raise HTTPException(status_code=401, detail="Not logged in")
+
+    embedding_cache = get_embedding_cache()
+    query_cache = get_query_cache()
+    return {
+        "embedding_cache": embedding_cache.stats() if embedding_cache else None,
+        "query_cache": query_cache.stats() if query_cache else None,
+        "tool_cache": get_tool_cache().stats(),
+        "llm_registry": get_llm_registry().stats(),
+        "admission": get_admission_controller().stats(),
+        "dataframe_cache": get_dataframe_cache().stats(),
+        "sql_engines": get_sql_engine_registry().stats(),
+        "sql_result_cache": get_sql_result_cache().stats(),
+    }
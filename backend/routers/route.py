@@ -1,5 +1,5 @@
 from routers.custom_router import APIRouter
-from .api import chats, avatar, favourites, messages, users
+from .api import chats, avatar, favourites, messages, users, metrics
 
 router = APIRouter(
     prefix="/api",
@@ -11,4 +11,5 @@ router.include_router(chats.router, tags=["chats"])
 router.include_router(avatar.router, tags=["avatar"])
 router.include_router(favourites.router, tags=["favourites"])
 router.include_router(messages.router, tags=["messages"])
-router.include_router(users.router, tags=["users"])
\ No newline at end of file
+router.include_router(users.router, tags=["users"])
+router.include_router(metrics.router, tags=["metrics"])
\ No newline at end of file
@@ -1,24 +1,114 @@
 from services.llm_agent import (
     create_agent,
+    cancel_agent_run,
+)
+from services.llm_registry import (
+    LLMRegistry,
+    get_llm_registry,
+    IONOS_MODEL,
+)
+from services.admission import (
+    AdmissionController,
+    AdmissionRejected,
+    AdmissionTicket,
+    get_admission_controller,
 )
 from services.tools_initializer import (
-    create_query_engines_from_filters,
-    create_filters_for_files,
     create_pandas_engines_tools_from_files,
+    create_duckdb_engines_tools_from_files,
     create_sql_engines_tools_from_files,
     create_search_engine_tool,
     create_url_loader_tool,
     create_query_engine_tools,
+    create_merged_query_engine_tool,
     create_text_extraction_tool_from_file
 )
+from services.retrievers import (
+    MultiFileRetriever,
+    HybridRetriever,
+    RETRIEVAL_MODE,
+)
+from services.embedding_cache import (
+    EmbeddingCache,
+    get_embedding_cache,
+)
+from services.query_cache import (
+    QueryCache,
+    get_query_cache,
+    bump_file_versions,
+)
+from services.streaming import (
+    CoalescingSSEWriter,
+    sse_event,
+)
+from services.progress import (
+    IndexingProgress,
+    progress_channel,
+    progress_snapshot_key,
+)
+from services.parsing_pool import (
+    ParsingPool,
+    ParsingTimeoutError,
+    get_parsing_pool,
+)
+from services.spreadsheet_reader import (
+    iter_spreadsheet_nodes,
+)
+from services.columnar_store import (
+    DataFrameCache,
+    get_dataframe_cache,
+    load_spreadsheet_frame,
+    remove_columnar_files,
+)
+from services.duckdb_engine import (
+    DuckDBQueryEngine,
+)
+from services.lexical_index import (
+    LexicalIndex,
+    load_lexical_index,
+    remove_lexical_index,
+)
+from services.sql_schema import (
+    CachedSQLDatabase,
+    compute_schema_context,
+    get_schema_context,
+)
+from services.ingestion import (
+    EmbeddingPipeline,
+    AdaptiveBatchSizer,
+)
 from services.indexer import (
     index_uploaded_file,
+    sync_file_nodes,
     deletes_file_index_from_collection,
+    deletes_files_index_from_collection,
     index_sql_dump,
     index_spreadsheet
 )
+from services.job_queue import (
+    enqueue_indexing_job,
+    claim_next_job,
+    complete_job,
+    fail_job,
+    renew_lease,
+    JobLease,
+    JOB_KIND_DOCUMENT,
+    JOB_KIND_SPREADSHEET,
+    JOB_KIND_SQL_DUMP,
+    STATUS_QUEUED,
+    STATUS_RUNNING,
+    STATUS_RETRYING,
+)
 from services.tasks import (
-    process_dump_to_persist 
+    process_dump_to_persist,
+    run_indexing_job,
+)
+from services.tool_cache import (
+    ToolCache,
+    get_tool_cache,
+    tool_cache_key,
+    get_chat_tools_version,
+    invalidate_chat_tools,
 )
 from services.memory import (
     create_memory,
@@ -0,0 +1,232 @@
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from typing import AsyncGenerator, Deque, Dict, List, Optional
+
+ADMISSION_MAX_CONCURRENT_PER_MODEL = int(os.getenv("ADMISSION_MAX_CONCURRENT_PER_MODEL", 4))
+ADMISSION_MAX_QUEUE_PER_MODEL = int(os.getenv("ADMISSION_MAX_QUEUE_PER_MODEL", 32))
+ADMISSION_MAX_QUEUED_PER_USER = int(os.getenv("ADMISSION_MAX_QUEUED_PER_USER", 3))
+ADMISSION_QUEUE_UPDATE_SECONDS = float(os.getenv("ADMISSION_QUEUE_UPDATE_SECONDS", 15))
+# assumed duration of a chat run until runs of the model were measured
+ADMISSION_DEFAULT_RUN_SECONDS = float(os.getenv("ADMISSION_DEFAULT_RUN_SECONDS", 30))
+ADMISSION_MAX_RETRY_AFTER_SECONDS = 600
+
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a model's queue (or the user's share of it) is full.
+
+    Args:
+        model (str): The model backend that rejected the request.
+        retry_after (int): Seconds after which a retry is likely to be queued.
+    """
+    def __init__(self, model: str, retry_after: int):
+        super().__init__(f"Admission queue of model '{model}' is full, retry after {retry_after}s")
+        self.model = model
+        self.retry_after = retry_after
+
+
+class AdmissionTicket:
+    """A chat run's claim on a model backend, returned by ``AdmissionController.admit``."""
+    def __init__(self, model: str, user_id: str):
+        self.model = model
+        self.user_id = user_id
+        self.admitted = False
+        self.released = False
+        self.enqueued_at = time.monotonic()
+        self.admitted_at: Optional[float] = None
+        self.changed = asyncio.Event()
+
+
+class _ModelState:
+    def __init__(self):
+        self.active = 0
+        # user id -> the user's waiting tickets; the order of the users is the round-robin order
+        self.waiting: "OrderedDict[str, Deque[AdmissionTicket]]" = OrderedDict()
+        self.avg_run_seconds: Optional[float] = None
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+
+    @property
+    def queue_length(self) -> int:
+        return sum(len(tickets) for tickets in self.waiting.values())
+
+
+class AdmissionController:
+    """
+    Admission control for chat runs with a concurrency limit and a fair queue per model backend.
+
+    At most ``max_concurrent`` runs per model are admitted at a time; further runs wait in the
+    model's queue, so under a burst the admitted runs are served at full speed instead of all runs
+    slowing down until they time out together. The queue is fair between users: waiting runs are
+    admitted round-robin across users, so one user's burst does not delay everybody else. Beyond
+    ``max_queue`` waiting runs per model, or ``max_queued_per_user`` waiting runs of one user,
+    ``admit`` fails fast with ``AdmissionRejected``, which carries a ``Retry-After`` estimate based
+    on the measured run durations of the model.
+
+    The controller is in-process and runs on the API's event loop, so the limits apply per API
+    process.
+
+    Args:
+        max_concurrent (int): Runs admitted at a time per model.
+        max_queue (int): Runs waiting at most per model.
+        max_queued_per_user (int): Runs of a single user waiting at most per model.
+    """
+    def __init__(self, max_concurrent: int = ADMISSION_MAX_CONCURRENT_PER_MODEL,
+                 max_queue: int = ADMISSION_MAX_QUEUE_PER_MODEL,
+                 max_queued_per_user: int = ADMISSION_MAX_QUEUED_PER_USER):
+        if max_concurrent <= 0 or max_queue < 0 or max_queued_per_user <= 0:
+            raise ValueError("Expected positive max_concurrent and max_queued_per_user and max_queue >= 0")
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_queued_per_user = max_queued_per_user
+        self._models: Dict[str, _ModelState] = {}
+
+    def _state(self, model: str) -> _ModelState:
+        if model not in self._models:
+            self._models[model] = _ModelState()
+        return self._models[model]
+
+    def admit(self, model: str, user_id: str) -> AdmissionTicket:
+        """
+        Admits a run of ``user_id`` on ``model`` or puts it into the model's queue.
+
+        Every ticket must be passed to ``release`` once the run ended or was abandoned.
+
+        Returns:
+            AdmissionTicket: The ticket; ``admitted`` tells whether the run may start right away,
+                otherwise wait for it with ``wait``.
+
+        Raises:
+            AdmissionRejected: If the queue of the model or the user's share of it is full.
+        """
+        state = self._state(model)
+        ticket = AdmissionTicket(model, user_id)
+        if state.active < self.max_concurrent and not state.waiting:
+            self._start(state, ticket)
+            return ticket
+
+        queue_length = state.queue_length
+        if queue_length >= self.max_queue or len(state.waiting.get(user_id, ())) >= self.max_queued_per_user:
+            state.rejected += 1
+            raise AdmissionRejected(model, self._retry_after(state, queue_length))
+        state.waiting.setdefault(user_id, deque()).append(ticket)
+        state.queued += 1
+        return ticket
+
+    def _start(self, state: _ModelState, ticket: AdmissionTicket):
+        ticket.admitted = True
+        ticket.admitted_at = time.monotonic()
+        state.active += 1
+        state.admitted += 1
+        ticket.changed.set()
+
+    def _retry_after(self, state: _ModelState, queue_length: int) -> int:
+        # time until enough running and waiting runs finished for a new one to be queued
+        run_seconds = state.avg_run_seconds or ADMISSION_DEFAULT_RUN_SECONDS
+        excess = max(1, queue_length - self.max_queue + 1)
+        return max(1, min(ADMISSION_MAX_RETRY_AFTER_SECONDS, math.ceil(run_seconds * excess / self.max_concurrent)))
+
+    @staticmethod
+    def _queue_order(state: _ModelState) -> List[AdmissionTicket]:
+        # round robin: the first ticket of every user in user order, then the second ones, ...
+        order = []
+        queues = list(state.waiting.values())
+        depth = 0
+        while True:
+            tickets = [queue[depth] for queue in queues if len(queue) > depth]
+            if not tickets:
+                return order
+            order.extend(tickets)
+            depth += 1
+
+    def position(self, ticket: AdmissionTicket) -> int:
+        """Returns the 1-based queue position of ``ticket``, or 0 once it is admitted."""
+        if ticket.admitted:
+            return 0
+        return self._queue_order(self._state(ticket.model)).index(ticket) + 1
+
+    async def wait(self, ticket: AdmissionTicket,
+                   update_seconds: float = ADMISSION_QUEUE_UPDATE_SECONDS) -> AsyncGenerator[int, None]:
+        """
+        Waits until ``ticket`` is admitted, or withdrawn with ``release``.
+
+        Yields:
+            int: The ticket's queue position, whenever it changed and at least every
+                ``update_seconds`` (which doubles as a heartbeat of the waiting stream).
+        """
+        while not ticket.admitted and not ticket.released:
+            ticket.changed.clear()
+            yield self.position(ticket)
+            if ticket.admitted or ticket.released:
+                return
+            try:
+                await asyncio.wait_for(ticket.changed.wait(), timeout=update_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def release(self, ticket: AdmissionTicket):
+        """
+        Ends a run or withdraws a waiting one, admitting the next waiting runs. Idempotent.
+        """
+        if ticket.released:
+            return
+        ticket.released = True
+        state = self._state(ticket.model)
+        if ticket.admitted:
+            state.active -= 1
+            duration = time.monotonic() - ticket.admitted_at
+            state.avg_run_seconds = (duration if state.avg_run_seconds is None
+                                     else 0.8 * state.avg_run_seconds + 0.2 * duration)
+        else:
+            queue = state.waiting.get(ticket.user_id)
+            if queue is not None and ticket in queue:
+                queue.remove(ticket)
+                if not queue:
+                    del state.waiting[ticket.user_id]
+            ticket.changed.set()
+
+        while state.active < self.max_concurrent and state.waiting:
+            user_id, queue = next(iter(state.waiting.items()))
+            del state.waiting[user_id]
+            self._start(state, queue.popleft())
+            if queue:
+                # the user goes to the end of the round
+                state.waiting[user_id] = queue
+        # positions of all waiting runs may have changed
+        for queue in state.waiting.values():
+            for waiting in queue:
+                waiting.changed.set()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrent_per_model": self.max_concurrent,
+            "max_queue_per_model": self.max_queue,
+            "max_queued_per_user": self.max_queued_per_user,
+            "models": {
+                model: {
+                    "active": state.active,
+                    "queued": state.queue_length,
+                    "waiting_users": len(state.waiting),
+                    "admitted_total": state.admitted,
+                    "queued_total": state.queued,
+                    "rejected_total": state.rejected,
+                    "avg_run_seconds": round(state.avg_run_seconds, 3) if state.avg_run_seconds else None,
+                }
+                for model, state in self._models.items()
+            },
+        }
+
+
+_admission_controller: Optional[AdmissionController] = None
+
+
+def get_admission_controller() -> AdmissionController:
+    """Provides the process-wide admission controller."""
+    global _admission_controller
+    if _admission_controller is None:
+        _admission_controller = AdmissionController()
+    return _admission_controller
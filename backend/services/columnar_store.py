@@ -0,0 +1,157 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from dependencies import logger
+from parsing_tasks import (
+    SHEET_NAME_METADATA_KEY,
+    columnar_sheet_paths,
+    is_csv,
+)
+
+COLUMNAR_CACHE_MAX_BYTES = int(os.getenv("COLUMNAR_CACHE_MAX_MB", 512)) * 1024 * 1024
+
+
+def list_columnar_sheets(path: str) -> List[Tuple[str, str]]:
+    """
+    Lists the Parquet copies of a spreadsheet's sheets.
+
+    Copies older than the spreadsheet itself (e.g. after the file was replaced and before it was
+    converted again) are ignored.
+
+    Returns:
+        List[Tuple[str, str]]: ``(sheet_name, parquet_path)`` per sheet in workbook order, or an
+            empty list if the spreadsheet was not converted (yet).
+    """
+    try:
+        source_mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return []
+    sheets = []
+    for parquet_path in columnar_sheet_paths(path):
+        try:
+            if os.stat(parquet_path).st_mtime_ns < source_mtime:
+                return []
+            metadata = pq.read_schema(parquet_path).metadata or {}
+        except (FileNotFoundError, pa.ArrowInvalid):
+            return []
+        sheet_name = metadata.get(SHEET_NAME_METADATA_KEY, b"").decode() or os.path.basename(parquet_path)
+        sheets.append((sheet_name, parquet_path))
+    return sheets
+
+
+def remove_columnar_files(path: str):
+    """Deletes the Parquet copies of a spreadsheet."""
+    for parquet_path in columnar_sheet_paths(path):
+        try:
+            os.remove(parquet_path)
+        except FileNotFoundError:
+            pass
+
+
+class DataFrameCache:
+    """
+    In-process LRU cache of spreadsheet DataFrames, bounded by their total in-memory size.
+
+    Entries are keyed by the Parquet path together with its modification time and size, so a
+    re-converted spreadsheet is never served from a stale entry. A frame larger than the whole
+    budget is returned but not cached.
+
+    Args:
+        max_bytes (int): Budget for the summed ``DataFrame.memory_usage(deep=True)`` of all entries.
+    """
+    def __init__(self, max_bytes: int = COLUMNAR_CACHE_MAX_BYTES):
+        if max_bytes <= 0:
+            raise ValueError("max_bytes must be positive")
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple, Tuple[pd.DataFrame, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Tuple) -> Optional[pd.DataFrame]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Tuple, df: pd.DataFrame):
+        size = int(df.memory_usage(deep=True).sum())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            # older versions of the same file are unreachable, drop them right away
+            for outdated in [k for k in self._entries if k[0] == key[0]]:
+                self._bytes -= self._entries.pop(outdated)[1]
+            self._entries[key] = (df, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+
+_dataframe_cache: Optional[DataFrameCache] = None
+
+
+def get_dataframe_cache() -> DataFrameCache:
+    """Provides the process-wide DataFrame cache."""
+    global _dataframe_cache
+    if _dataframe_cache is None:
+        _dataframe_cache = DataFrameCache()
+    return _dataframe_cache
+
+
+def load_spreadsheet_frame(path: str, sheet_index: int = 0) -> pd.DataFrame:
+    """
+    Loads one sheet of a spreadsheet as a DataFrame, preferring its Parquet copy.
+
+    The Parquet copy is read memory-mapped and kept in the DataFrame cache. Spreadsheets that were
+    not converted yet (the indexing job is still queued, or the file predates the conversion) are
+    parsed from the original file and not cached.
+
+    Args:
+        path (str): File system path of the CSV file or workbook.
+        sheet_index (int): The sheet to load; the first sheet by default.
+
+    Returns:
+        pd.DataFrame: The sheet's data.
+    """
+    sheets = list_columnar_sheets(path)
+    if sheet_index >= len(sheets):
+        logger.debug(f"No Parquet copy of {path}, parsing the original file")
+        return pd.read_csv(path) if is_csv(path) else pd.read_excel(path, sheet_name=sheet_index)
+
+    parquet_path = sheets[sheet_index][1]
+    stat = os.stat(parquet_path)
+    key = (parquet_path, stat.st_mtime_ns, stat.st_size)
+    cache = get_dataframe_cache()
+    df = cache.get(key)
+    if df is None:
+        df = pd.read_parquet(parquet_path, engine="pyarrow", memory_map=True)
+        cache.put(key, df)
+    return df
@@ -0,0 +1,112 @@
+import hashlib
+import os
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional
+
+from llama_index.core.ingestion import run_transformations
+from llama_index.core.schema import BaseNode, Document, TransformComponent
+
+from dependencies import logger
+from services.progress import IndexingProgress
+from parsing_tasks import load_documents
+from services.parsing_pool import get_parsing_pool, iter_pdf_page_documents
+
+# upper bound of a text section; sections are cut at content-defined boundaries well before
+STREAM_TEXT_SECTION_BYTES = int(os.getenv("STREAM_TEXT_SECTION_BYTES", 64 * 1024))
+STREAM_TEXT_SECTION_TARGET_BYTES = int(os.getenv("STREAM_TEXT_SECTION_TARGET_BYTES", 8 * 1024))
+
+TEXT_EXTENSIONS = {".txt", ".md", ".markdown", ".json", ".log", ".rst", ".html", ".htm", ".xml"}
+
+
+def _ends_section(block: str, target_bytes: float) -> bool:
+    # A block ends its section if its hash falls below a threshold that grows with the block's
+    # size, so sections hold about ``target_bytes`` and the decision depends on the block alone.
+    digest = hashlib.blake2b(block.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2 ** 64 < len(block) / target_bytes
+
+
+def iter_text_sections(path: str, section_bytes: int = STREAM_TEXT_SECTION_BYTES,
+                       target_bytes: int = STREAM_TEXT_SECTION_TARGET_BYTES) -> Iterator[Document]:
+    """
+    Yields a plain text file in sections of roughly ``target_bytes``, split at line boundaries.
+
+    Section boundaries are content-defined: once a section holds a quarter of ``target_bytes``,
+    it is cut before a Markdown heading, or after a paragraph whose content hash hits a threshold.
+    Text without blank lines falls back to single lines as candidates once the section is twice
+    the target, and ``section_bytes`` forces a cut. Since the chunks of a section are packed from
+    its start, editing a paragraph only changes the chunks of its own section; the following
+    sections, and with them their chunk ids (see ``assign_chunk_ids``), stay the same.
+    """
+    file_name = Path(path).name
+    min_bytes = target_bytes / 4
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        lines: List[str] = []
+        paragraph: List[str] = []
+        size = 0
+        for line in f:
+            if lines and size >= min_bytes and line.startswith("#"):
+                yield Document(text="".join(lines), metadata={"file_name": file_name})
+                lines, paragraph, size = [], [], 0
+            lines.append(line)
+            size += len(line)
+            if line.strip():
+                paragraph.append(line)
+                cut = size >= section_bytes or (size >= 2 * target_bytes and _ends_section(line, target_bytes))
+            else:
+                cut = bool(paragraph) and size >= min_bytes and _ends_section("".join(paragraph), target_bytes)
+                paragraph = []
+            if cut:
+                yield Document(text="".join(lines), metadata={"file_name": file_name})
+                lines, paragraph, size = [], [], 0
+        if lines:
+            yield Document(text="".join(lines), metadata={"file_name": file_name})
+
+
+def iter_document_pages(path: str) -> Iterator[Document]:
+    """
+    Yields the pages or sections of the document at ``path`` lazily.
+
+    PDFs are extracted in page ranges by the parsing pool, in parallel and in order, and text files
+    are read section by section. Other formats have no incremental reader and are loaded with
+    ``SimpleDirectoryReader`` in the parsing pool, then yielded one document at a time.
+
+    Args:
+        path (str): File system path of the uploaded document.
+
+    Yields:
+        Document: One page or section of the document.
+    """
+    extension = Path(path).suffix.lower()
+    if extension == ".pdf":
+        yield from iter_pdf_page_documents(path)
+    elif extension in TEXT_EXTENSIONS:
+        yield from iter_text_sections(path)
+    else:
+        logger.debug(f"No streaming reader for '{extension}', loading {path} at once")
+        yield from get_parsing_pool().run(load_documents, path)
+
+
+def iter_chunks(pages: Iterable[Document], transformations: List[TransformComponent],
+                progress: Optional[IndexingProgress] = None) -> Iterator[BaseNode]:
+    """
+    Chunks ``pages`` one at a time and yields the resulting nodes.
+
+    Combined with ``EmbeddingPipeline``, which pulls chunks lazily, at most one page plus the
+    in-flight embedding batches are held in memory, and the first chunks are upserted while
+    later pages have not been read yet.
+
+    Args:
+        pages (Iterable[Document]): Pages of the document, e.g. from ``iter_document_pages``.
+        transformations (List[TransformComponent]): Node parsers applied to each page.
+        progress (IndexingProgress, optional): Receives parsed page and produced chunk counts.
+
+    Yields:
+        BaseNode: The chunks of every page in document order.
+    """
+    for page in pages:
+        if progress:
+            progress.parsed_pages(1)
+        nodes = run_transformations([page], transformations)
+        if progress:
+            progress.produced_chunks(len(nodes))
+        yield from nodes
@@ -0,0 +1,203 @@
+import asyncio
+import os
+import re
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+import duckdb
+import pandas as pd
+from llama_index.core.base.base_query_engine import BaseQueryEngine
+from llama_index.core.base.response.schema import Response
+from llama_index.core.llms import LLM
+from llama_index.core.prompts import PromptTemplate
+from llama_index.core.schema import QueryBundle
+
+from dependencies import logger
+from parsing_tasks import is_csv
+from services.columnar_store import list_columnar_sheets, load_spreadsheet_frame
+
+DUCKDB_MEMORY_LIMIT = os.getenv("DUCKDB_MEMORY_LIMIT", "1GB")
+DUCKDB_THREADS = int(os.getenv("DUCKDB_THREADS", 2))
+DUCKDB_TEMP_DIRECTORY = os.getenv("DUCKDB_TEMP_DIRECTORY", os.path.join(tempfile.gettempdir(), "duckdb"))
+DUCKDB_MAX_RESULT_ROWS = int(os.getenv("DUCKDB_MAX_RESULT_ROWS", 100))
+DUCKDB_SAMPLE_ROWS = 3
+
+DEFAULT_DUCKDB_TEXT_TO_SQL_PROMPT = PromptTemplate(
+    "You are working with the DuckDB tables of the spreadsheet '{file_name}'.\n"
+    "{schema}\n\n"
+    "Write a single DuckDB SQL SELECT statement that answers the question below. Only select the "
+    "columns you need and aggregate in SQL instead of returning raw rows where possible. Quote "
+    "identifiers with double quotes. Return only the SQL, without explanation or Markdown.\n\n"
+    "Question: {query_str}\n"
+    "SQL: "
+)
+
+DEFAULT_DUCKDB_SQL_FIX_PROMPT = PromptTemplate(
+    "The following DuckDB SQL statement failed.\n"
+    "{schema}\n\n"
+    "Question: {query_str}\n"
+    "SQL: {sql_query}\n"
+    "Error: {error}\n\n"
+    "Return only the corrected SQL statement, without explanation or Markdown.\n"
+    "SQL: "
+)
+
+
+def duckdb_table_name(sheet_name: str, taken: List[str]) -> str:
+    """Derives a unique, unquoted-safe table name from a sheet name."""
+    name = re.sub(r"\W+", "_", sheet_name.strip().lower()).strip("_") or "sheet"
+    if name[0].isdigit():
+        name = f"t_{name}"
+    unique, counter = name, 1
+    while unique in taken:
+        counter += 1
+        unique = f"{name}_{counter}"
+    return unique
+
+
+def _sql_string(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def extract_sql(text: str) -> str:
+    """Strips Markdown code fences and a leading ``SQL:`` label from an LLM completion."""
+    fenced = re.search(r"```(?:sql)?\s*(.*?)```", text, re.DOTALL | re.IGNORECASE)
+    if fenced:
+        text = fenced.group(1)
+    text = re.sub(r"^\s*sql:\s*", "", text.strip(), flags=re.IGNORECASE)
+    return text.strip().rstrip(";").strip()
+
+
+def open_spreadsheet_connection(path: str, file_name: str) -> Tuple[duckdb.DuckDBPyConnection, Dict[str, str]]:
+    """
+    Opens an in-memory DuckDB connection with one view per sheet of a spreadsheet.
+
+    Views read the Parquet copies of the sheets, or a CSV file directly, so DuckDB scans only the
+    columns and row groups a query needs and aggregates in a streaming fashion within
+    ``DUCKDB_MEMORY_LIMIT``, spilling to ``DUCKDB_TEMP_DIRECTORY`` beyond it. Workbooks that were not
+    converted to Parquet yet fall back to their first sheet loaded into memory.
+
+    Afterwards file system access is restricted to the spreadsheet's own files and the configuration
+    is locked, so generated SQL can neither read other files nor write any.
+
+    Args:
+        path (str): File system path of the CSV file or workbook.
+        file_name (str): The original file name, used for the table of a CSV file.
+
+    Returns:
+        Tuple[duckdb.DuckDBPyConnection, Dict[str, str]]: The connection and the sheet name per table.
+    """
+    os.makedirs(DUCKDB_TEMP_DIRECTORY, exist_ok=True)
+    connection = duckdb.connect(database=":memory:", config={
+        "memory_limit": DUCKDB_MEMORY_LIMIT,
+        "threads": DUCKDB_THREADS,
+        "temp_directory": DUCKDB_TEMP_DIRECTORY,
+    })
+    tables: Dict[str, str] = {}
+    allowed_paths: List[str] = []
+
+    sheets = list_columnar_sheets(path)
+    if sheets:
+        for sheet_name, parquet_path in sheets:
+            table = duckdb_table_name(sheet_name, list(tables))
+            connection.execute(f'CREATE VIEW "{table}" AS SELECT * FROM read_parquet({_sql_string(parquet_path)})')
+            tables[table] = sheet_name
+            allowed_paths.append(parquet_path)
+    elif is_csv(path):
+        table = duckdb_table_name(os.path.splitext(file_name)[0], [])
+        connection.execute(f'CREATE VIEW "{table}" AS SELECT * FROM read_csv_auto({_sql_string(path)})')
+        tables[table] = file_name
+        allowed_paths.append(path)
+    else:
+        logger.debug(f"No Parquet copy of {path}, registering its first sheet in memory")
+        table = duckdb_table_name(os.path.splitext(file_name)[0], [])
+        connection.register(table, load_spreadsheet_frame(path))
+        tables[table] = file_name
+
+    connection.execute(f"SET allowed_paths = [{', '.join(_sql_string(p) for p in allowed_paths)}]")
+    connection.execute("SET enable_external_access = false")
+    connection.execute("SET lock_configuration = true")
+    return connection, tables
+
+
+class DuckDBQueryEngine(BaseQueryEngine):
+    """
+    Answers questions about a spreadsheet by letting the LLM write DuckDB SQL over its sheets.
+
+    Unlike the ``PandasQueryEngine`` the data is never loaded into a DataFrame: DuckDB pushes the
+    projection and predicates down into the Parquet (or CSV) scan and aggregates out of core, so
+    memory stays bounded for multi-GB uploads. Only the first ``max_rows`` result rows are fetched.
+    A failing statement is sent back to the LLM once for correction.
+
+    Args:
+        path (str): File system path of the CSV file or workbook.
+        file_name (str): The original file name shown to the LLM.
+        llm (LLM): The LLM writing the SQL statements.
+        max_rows (int): Maximum result rows returned.
+    """
+    def __init__(self, path: str, file_name: str, llm: LLM, max_rows: int = DUCKDB_MAX_RESULT_ROWS):
+        super().__init__(callback_manager=None)
+        self.file_name = file_name
+        self.llm = llm
+        self.max_rows = max_rows
+        self._connection, self.tables = open_spreadsheet_connection(path, file_name)
+        self._schema: Optional[str] = None
+
+    def _get_prompt_modules(self) -> dict:
+        return {}
+
+    @property
+    def schema(self) -> str:
+        """Describes the columns and a few sample rows of every table for the prompt."""
+        if self._schema is None:
+            cursor = self._connection.cursor()
+            try:
+                descriptions = []
+                for table, sheet_name in self.tables.items():
+                    columns = cursor.execute(f'DESCRIBE "{table}"').fetchall()
+                    column_desc = ", ".join(f'"{column[0]}" {column[1]}' for column in columns)
+                    sample = cursor.execute(f'SELECT * FROM "{table}" LIMIT {DUCKDB_SAMPLE_ROWS}').fetchdf()
+                    descriptions.append(f'Table "{table}" (sheet \'{sheet_name}\'): {column_desc}\n'
+                                        f"Sample rows:\n{sample.to_markdown(index=False)}")
+                self._schema = "\n\n".join(descriptions)
+            finally:
+                cursor.close()
+        return self._schema
+
+    def _execute(self, sql_query: str) -> Tuple[pd.DataFrame, bool]:
+        # a cursor per query, since a DuckDB connection must not be shared between threads
+        cursor = self._connection.cursor()
+        try:
+            result = cursor.execute(sql_query)
+            columns = [column[0] for column in result.description or []]
+            rows = result.fetchmany(self.max_rows + 1)
+        finally:
+            cursor.close()
+        return pd.DataFrame(rows[:self.max_rows], columns=columns), len(rows) > self.max_rows
+
+    def _query(self, query_bundle: QueryBundle) -> Response:
+        query_str = query_bundle.query_str
+        completion = self.llm.complete(DEFAULT_DUCKDB_TEXT_TO_SQL_PROMPT.format(
+            file_name=self.file_name, schema=self.schema, query_str=query_str))
+        sql_query = extract_sql(completion.text)
+        try:
+            df, truncated = self._execute(sql_query)
+        except duckdb.Error as e:
+            logger.warning(f"DuckDB query on {self.file_name} failed, asking for a correction: {e}")
+            completion = self.llm.complete(DEFAULT_DUCKDB_SQL_FIX_PROMPT.format(
+                schema=self.schema, query_str=query_str, sql_query=sql_query, error=str(e)))
+            sql_query = extract_sql(completion.text)
+            try:
+                df, truncated = self._execute(sql_query)
+            except duckdb.Error as e:
+                logger.error(f"DuckDB query on {self.file_name} failed: {e}")
+                return Response(response=f"The query could not be executed: {e}", metadata={"sql_query": sql_query})
+
+        result = df.to_markdown(index=False) if not df.empty else "The query returned no rows."
+        if truncated:
+            result += f"\n\n(Only the first {self.max_rows} rows are shown.)"
+        return Response(response=f"SQL: {sql_query}\n\nResult:\n{result}",
+                        metadata={"sql_query": sql_query, "truncated": truncated})
+
+    async def _aquery(self, query_bundle: QueryBundle) -> Response:
+        return await asyncio.to_thread(self._query, query_bundle)
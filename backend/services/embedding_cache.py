@@ -0,0 +1,146 @@
+import hashlib
+import os
+import re
+import time
+from array import array
+from typing import Dict, List, Optional, Sequence
+
+from redis import Redis
+
+from dependencies import REDIS_HOST, REDIS_PORT, logger
+
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 50_000))
+EMBEDDING_CACHE_NAMESPACE = os.getenv("EMBEDDING_CACHE_NAMESPACE", "embedding-cache")
+
+
+class EmbeddingCache:
+    """
+    Persistent, size-bounded LRU cache for chunk embeddings, backed by Redis.
+
+    Entries are content-addressed: the key is a SHA-256 digest of the embedding model name
+    and the whitespace-normalized chunk text, so the same chunk uploaded into different chats
+    is only embedded once per model.
+
+    Layout in Redis:
+        - ``<namespace>:vectors``: hash of digest -> packed float32 vector.
+        - ``<namespace>:recency``: sorted set of digest -> last access timestamp (LRU order).
+        - ``<namespace>:stats``: hash with ``hits``, ``misses`` and ``evictions`` counters.
+
+    Args:
+        redis_client (Redis): Redis client created with ``decode_responses=False``.
+        max_entries (int): Upper bound of cached vectors; least recently used entries are evicted.
+        namespace (str): Key prefix for all cache keys.
+    """
+    def __init__(self, redis_client: Redis, max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES,
+                 namespace: str = EMBEDDING_CACHE_NAMESPACE):
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        self._redis = redis_client
+        self.max_entries = max_entries
+        self._vectors_key = f"{namespace}:vectors"
+        self._recency_key = f"{namespace}:recency"
+        self._stats_key = f"{namespace}:stats"
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Collapses whitespace so formatting-only differences hit the same entry."""
+        return re.sub(r"\s+", " ", text).strip()
+
+    def key_for(self, model_name: str, text: str) -> str:
+        """Returns the content address of ``text`` embedded with ``model_name``."""
+        payload = f"{model_name}\x00{self.normalize(text)}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def get_many(self, model_name: str, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """
+        Looks up embeddings for ``texts``, refreshing the recency of every hit.
+
+        Returns:
+            List[Optional[List[float]]]: One entry per text, ``None`` for cache misses.
+        """
+        if not texts:
+            return []
+        digests = [self.key_for(model_name, text) for text in texts]
+        packed = self._redis.hmget(self._vectors_key, digests)
+        hits = {digest for digest, vector in zip(digests, packed) if vector is not None}
+
+        pipe = self._redis.pipeline(transaction=False)
+        if hits:
+            pipe.zadd(self._recency_key, {digest: time.time() for digest in hits})
+        pipe.hincrby(self._stats_key, "hits", len(hits))
+        pipe.hincrby(self._stats_key, "misses", len(digests) - len(hits))
+        pipe.execute()
+        return [self._unpack(vector) if vector is not None else None for vector in packed]
+
+    def put_many(self, model_name: str, texts: Sequence[str], embeddings: Sequence[List[float]]):
+        """Stores embeddings for ``texts`` and evicts the least recently used overflow."""
+        if not texts:
+            return
+        now = time.time()
+        vectors: Dict[str, bytes] = {
+            self.key_for(model_name, text): self._pack(embedding)
+            for text, embedding in zip(texts, embeddings)
+        }
+        pipe = self._redis.pipeline(transaction=False)
+        pipe.hset(self._vectors_key, mapping=vectors)
+        pipe.zadd(self._recency_key, {digest: now for digest in vectors})
+        pipe.execute()
+        self._evict()
+
+    def stats(self) -> dict:
+        """Returns hit/miss/eviction counters, the hit ratio and the current number of entries."""
+        raw = self._redis.hgetall(self._stats_key)
+        counters = {key.decode() if isinstance(key, bytes) else key: int(value) for key, value in raw.items()}
+        hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+        return {
+            "hits": hits,
+            "misses": misses,
+            "evictions": counters.get("evictions", 0),
+            "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            "entries": self._redis.zcard(self._recency_key),
+            "max_entries": self.max_entries,
+        }
+
+    def _evict(self):
+        overflow = self._redis.zcard(self._recency_key) - self.max_entries
+        if overflow <= 0:
+            return
+        stale = self._redis.zrange(self._recency_key, 0, overflow - 1)
+        if not stale:
+            return
+        pipe = self._redis.pipeline(transaction=False)
+        pipe.hdel(self._vectors_key, *stale)
+        pipe.zrem(self._recency_key, *stale)
+        pipe.hincrby(self._stats_key, "evictions", len(stale))
+        pipe.execute()
+        logger.debug(f"Evicted {len(stale)} embeddings from cache")
+
+    @staticmethod
+    def _pack(embedding: Sequence[float]) -> bytes:
+        return array("f", embedding).tobytes()
+
+    @staticmethod
+    def _unpack(packed: bytes) -> List[float]:
+        vector = array("f")
+        vector.frombytes(packed)
+        return vector.tolist()
+
+
+_embedding_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Provides the process-wide embedding cache.
+
+    Returns:
+        Optional[EmbeddingCache]: The cache, or None if it is disabled via ``EMBEDDING_CACHE_ENABLED``.
+    """
+    global _embedding_cache
+    if not EMBEDDING_CACHE_ENABLED:
+        return None
+    if _embedding_cache is None:
+        _embedding_cache = EmbeddingCache(Redis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=False))
+    return _embedding_cache
+
@@ -1,40 +1,198 @@
 from llama_index.core.objects import SQLTableNodeMapping, SQLTableSchema
-from llama_index.core.readers import SimpleDirectoryReader
 from llama_index.vector_stores.chroma import ChromaVectorStore
-from llama_index.core import StorageContext, SQLDatabase
-from llama_index.core.indices import VectorStoreIndex
-from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.schema import BaseNode, Document, MetadataMode
 from llama_index.core.settings import Settings
 
 from chromadb import Collection
-from sqlalchemy import create_engine
-from markitdown import MarkItDown
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from models import ChatFile
-from utils import initialize_pg_url
+from utils import get_sql_engine_registry
+from services.sql_schema import CachedSQLDatabase
 from dependencies import logger, SessionDep
+from services.embedding_cache import get_embedding_cache
+from services.ingestion import EmbeddingPipeline
+from services.document_stream import iter_document_pages, iter_chunks
+from services.spreadsheet_reader import iter_spreadsheet_nodes
+from parsing_tasks import convert_spreadsheet_to_parquet
+from services.columnar_store import list_columnar_sheets
+from services.parsing_pool import get_parsing_pool
+from services.progress import IndexingProgress
+from services.vector_tracking import (
+    track_vectors,
+    untrack_vectors,
+    get_tracked_vector_ids,
+    auntrack_vectors,
+    aget_tracked_vector_ids,
+)
+from services.lexical_index import tokenize, write_lexical_index
+from services.query_cache import bump_file_versions
+from typing import Callable, Iterable, Iterator, List, Optional, Set
+from collections import Counter
+
+import asyncio
+import hashlib
+
+CHROMA_DELETE_BATCH_SIZE = 500
+
+
+def tag_documents_with_file_id(documents: List[Document], file_id: str):
+    """
+    Adds the owning ``file_id`` to the metadata of ``documents``.
+
+    The metadata set by the reader (``page_label``, ``file_name``, ...) is kept, so it still reaches
+    the LLM with every retrieved chunk. None of it is embedded: it carries no meaning for similarity
+    search, would make identical chunks in different files miss the embedding cache, and a shifted
+    page label would change the content-derived id of an unchanged chunk (see ``assign_chunk_ids``).
+    """
+    for document in documents:
+        document.metadata = {**(document.metadata or {}), 'file_id': file_id}
+        document.excluded_embed_metadata_keys = list(document.metadata)
+
+
+def index_nodes(nodes: Iterable[BaseNode], chroma_collection: Collection,
+                progress: Optional[IndexingProgress] = None,
+                on_upserted: Optional[Callable[[List[BaseNode]], None]] = None) -> dict:
+    """
+    Embeds ``nodes`` in concurrent, adaptively sized batches and upserts them into the Chroma
+    collection as each batch completes. Cached embeddings are reused.
+
+    Args:
+        nodes (Iterable[BaseNode]): Chunked nodes carrying their ``file_id`` metadata.
+        chroma_collection (Collection): The Chroma collection to store the vectors in.
+        progress (IndexingProgress, optional): Receives embedded/upserted chunk counts.
+        on_upserted (Callable[[List[BaseNode]], None], optional): Called with every upserted batch.
+
+    Returns:
+        dict: The pipeline's counters (chunks, cached, embedded, upserted, ...).
+    """
+    vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
+    pipeline = EmbeddingPipeline(vector_store=vector_store, embed_model=Settings.embed_model, progress=progress,
+                                 on_upserted=on_upserted)
+    stats = pipeline.run(nodes)
 
-import os
+    cache = get_embedding_cache()
+    logger.info(f"Indexed {stats['chunks']} chunks ({stats['cached']} from embedding cache, "
+                f"{stats['embedded']} embedded). Cache stats: {cache.stats() if cache else 'disabled'}")
+    return stats
 
-def index_spreadsheet(chroma_collection: Collection, file: ChatFile, db_client: SessionDep):
+def assign_chunk_ids(nodes: Iterable[BaseNode], file_id: str) -> Iterator[BaseNode]:
     """
-    Indexes a spreadsheet file by converting it to Markdown, splitting it into chunks, 
+    Gives every chunk of a file a deterministic id derived from its content.
+
+    The id is ``<file_id>-<sha256 of the chunk>``, with a counter appended for repeated chunks,
+    so re-chunking an unchanged passage yields the id that is already stored in Chroma. The hash
+    covers the embedded content only; metadata excluded from embedding, e.g. the row range of a
+    spreadsheet chunk, does not change the id.
+    """
+    occurrences = {}
+    for node in nodes:
+        digest = hashlib.sha256(node.get_content(metadata_mode=MetadataMode.EMBED).encode("utf-8")).hexdigest()[:32]
+        occurrence = occurrences.get(digest, 0)
+        occurrences[digest] = occurrence + 1
+        node.id_ = f"{file_id}-{digest}" if occurrence == 0 else f"{file_id}-{digest}-{occurrence}"
+        yield node
+
+
+def get_file_chunk_ids(file_id: str, chroma_collection: Collection) -> Set[str]:
+    """Returns the ids of all chunks stored for ``file_id``."""
+    result = chroma_collection.get(where={'file_id': {'$eq': file_id}}, include=[])
+    return set(result['ids'])
+
+
+def sync_file_nodes(nodes: Iterable[BaseNode], file_id: str, chroma_collection: Collection,
+                    db_client: SessionDep, progress: Optional[IndexingProgress] = None,
+                    path: Optional[str] = None) -> dict:
+    """
+    Brings the chunks stored for a file in line with ``nodes`` by chunk diff.
+
+    Chunks get content-derived ids (see ``assign_chunk_ids``). Chunks whose id is already stored
+    are skipped, only new or changed chunks are embedded and upserted, and stored chunks that no
+    longer occur are removed afterwards. For a first upload nothing is stored yet, so every
+    chunk is indexed; re-indexing a changed file only costs the changed chunks.
+
+    The Chroma ids of the file are recorded in ``chat_file_vectors`` as batches are upserted, so
+    the stored ids are read from Postgres and the file can later be deleted by id. Files indexed
+    before ids were tracked are looked up in Chroma once and tracked from then on.
+
+    If ``path`` is given, the BM25 index of the file (see ``services.lexical_index``) is rebuilt
+    from all current chunks, unchanged ones included, for hybrid retrieval. Cached retrieval
+    results over the file are invalidated afterwards.
+
+    Args:
+        nodes (Iterable[BaseNode]): The current chunks of the file, tagged with ``file_id``.
+        file_id (str): The id of the file.
+        chroma_collection (Collection): The Chroma collection storing the file's chunks.
+        db_client (SessionDep): The database session recording the file's Chroma ids.
+        progress (IndexingProgress, optional): Receives embedded/upserted chunk counts.
+        path (str, optional): File system path of the file, next to which the BM25 index is written.
+
+    Returns:
+        dict: The pipeline's counters plus ``unchanged`` and ``removed`` chunk counts.
+    """
+    tracked_ids = get_tracked_vector_ids(db_client, [file_id]).get(file_id)
+    stored_ids = set(tracked_ids) if tracked_ids is not None else get_file_chunk_ids(file_id, chroma_collection)
+    current_ids: Set[str] = set()
+    term_frequencies = []
+
+    def changed_nodes():
+        for node in assign_chunk_ids(nodes, file_id):
+            current_ids.add(node.id_)
+            if path:
+                terms = tokenize(node.get_content(metadata_mode=MetadataMode.NONE))
+                term_frequencies.append((node.id_, Counter(terms)))
+            if node.id_ not in stored_ids:
+                yield node
+
+    def on_upserted(batch: List[BaseNode]):
+        track_vectors(db_client, file_id, [node.node_id for node in batch])
+
+    stats = index_nodes(changed_nodes(), chroma_collection, progress=progress, on_upserted=on_upserted)
+
+    if tracked_ids is None:
+        track_vectors(db_client, file_id, stored_ids & current_ids)
+    stale_ids = list(stored_ids - current_ids)
+    delete_vectors_by_id(stale_ids, chroma_collection)
+    untrack_vectors(db_client, stale_ids)
+    stats['unchanged'] = len(stored_ids & current_ids)
+    stats['removed'] = len(stale_ids)
+    if path:
+        write_lexical_index(path, term_frequencies)
+    bump_file_versions([file_id])
+    logger.info(f"Synced chunks of file {file_id}: {stats['upserted']} upserted, "
+                f"{stats['unchanged']} unchanged, {stats['removed']} removed")
+    return stats
+
+
+def delete_vectors_by_id(vector_ids: List[str], chroma_collection: Collection):
+    """Deletes ``vector_ids`` from the Chroma collection in batches."""
+    for i in range(0, len(vector_ids), CHROMA_DELETE_BATCH_SIZE):
+        chroma_collection.delete(ids=vector_ids[i:i + CHROMA_DELETE_BATCH_SIZE])
+
+
+def index_spreadsheet(chroma_collection: Collection, file: ChatFile, db_client: SessionDep,
+                      progress: Optional[IndexingProgress] = None):
+    """
+    Indexes a spreadsheet file by reading its sheets into DataFrames, grouping rows into chunks
     and storing the resulting vectorized data in a Chroma vector store.
 
     Args:
         chroma_collection (Collection): The Chroma collection to store the vectorized data.
         file (ChatFile): The file object containing metadata and path information for the spreadsheet.
         db_client (SessionDep): The database session dependency for updating the file's indexing status.
+        progress (IndexingProgress, optional): Publishes the ingestion progress of the file.
 
     Workflow:
-        1. Converts the spreadsheet file to Markdown format using the MarkItDown library.
-        2. Saves the converted Markdown content to a file.
-        3. Loads the Markdown file as documents using SimpleDirectoryReader.
-        4. Updates document metadata with the file ID.
-        5. Creates a Chroma vector store and a storage context.
-        6. Splits the document content into chunks using SentenceSplitter.
-        7. Indexes the documents into the vector store using VectorStoreIndex.
-        8. Updates the database to mark the file as indexed.
+        1. Converts every sheet into a Parquet file next to the upload in the parsing pool, so the
+           Pandas tools never parse the CSV or Excel file again.
+        2. Reads the Parquet copies sheet by sheet into DataFrames in the parsing pool.
+        3. Groups consecutive rows into chunks, each rendered as a Markdown table with the
+           column headers and the sheet name, so tables are never cut mid-row.
+        4. Tags every chunk with the file ID, the sheet name and its row range.
+        5. Embeds new or changed chunks in concurrent batches, upserts them into the vector store
+           and removes chunks of a previous version that no longer occur. The BM25 index of the
+           row groups is written next to the upload.
+        6. Updates the database to mark the file as indexed.
 
     Logs:
         - Logs the start and completion of the indexing process.
@@ -44,32 +202,18 @@ def index_spreadsheet(chroma_collection: Collection, file: ChatFile, db_client:
         Exception: If an error occurs during the database update process.
     """
     id = file.id
-    logger.info(f"Start indexing markdown for: {id}, {file.path_name}")
-
-    md = MarkItDown(enable_plugins=True)
-    md_path = f"{os.getcwd()}/uploads/{file.chat_id}/{file.file_name.split('.')[0]}.md"
-    result = md.convert(file.path_name)
+    logger.info(f"Start indexing spreadsheet for: {id}, {file.path_name}")
 
-    with open(md_path, "w", encoding='utf-8') as f:
-        f.write(result.text_content)
+    try:
+        get_parsing_pool().run(convert_spreadsheet_to_parquet, file.path_name)
+    except Exception as e:
+        # the original file can still be indexed and queried, just without the columnar copy
+        logger.error(f"Could not convert spreadsheet {id} to Parquet: {e}")
+    sheets = list_columnar_sheets(file.path_name)
 
-    documents = SimpleDirectoryReader(input_files=[md_path]).load_data()
-    for document in documents:
-        document.metadata = {
-            'file_id': id,
-        }
-
-    chroma_vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
-    storage_context = StorageContext.from_defaults(vector_store=chroma_vector_store)
-    transformations = SentenceSplitter(
-        chunk_size=256,
-        chunk_overlap=20,
-    )
-    VectorStoreIndex.from_documents(documents=documents,
-                                    storage_context=storage_context,
-                                    vector_store=chroma_vector_store,
-                                    transformations=[transformations],
-                                    show_progress=True, embedding=Settings.embed_model)
+    nodes = iter_spreadsheet_nodes(file.path_name, file_id=id, progress=progress, sheets=sheets)
+    sync_file_nodes(nodes, file_id=id, chroma_collection=chroma_collection, db_client=db_client,
+                    progress=progress, path=file.path_name)
     logger.info('Indexed spreadsheet.')
 
     try:
@@ -77,23 +221,31 @@ def index_spreadsheet(chroma_collection: Collection, file: ChatFile, db_client:
         db_file.indexed = True
         db_client.commit()
         db_client.refresh(db_file)
-        logger.info(f"Indexed Markdown file of spreadsheet: {db_file.file_name}")
+        logger.info(f"Indexed spreadsheet: {db_file.file_name}")
     except Exception as e:
         logger.error(e)
         db_client.rollback()
 
 
-def index_uploaded_file(path: str, chat_file: ChatFile, chroma_collection: Collection, db_client: SessionDep):
+def index_uploaded_file(path: str, chat_file: ChatFile, chroma_collection: Collection, db_client: SessionDep,
+                        progress: Optional[IndexingProgress] = None):
     """
     Indexes an uploaded file into a ChromaDB collection for vector search capabilities.
 
     This function processes a document, adds metadata, and stores it in a vector database
-    for efficient similarity searching.
+    for efficient similarity searching. Chunks already embedded for another upload are
+    served from the embedding cache instead of being sent to the embedding model.
+
+    The document is streamed: pages are read, chunked, embedded and upserted incrementally,
+    so memory stays bounded regardless of the file size and the first chunks become
+    queryable before the whole file is indexed. When a file is replaced, only chunks that
+    changed are embedded (see ``sync_file_nodes``).
 
     Args:
         path (str): File system path to the document to be indexed
         chat_file (ChatFile): ChatFile object containing metadata about the file
         chroma_collection (Collection): ChromaDB collection instance for storage
+        progress (IndexingProgress, optional): Publishes the ingestion progress of the file
 
     Returns:
         None
@@ -101,18 +253,14 @@ def index_uploaded_file(path: str, chat_file: ChatFile, chroma_collection: Colle
     Example:
         >>> index_uploaded_file("/path/to/file.pdf", chat_file, chroma_collection)
     """
-    documents = SimpleDirectoryReader(input_files=[path]).load_data()
-    for document in documents:
-        document.metadata = {
-            'file_id': chat_file.id,
-        }
-
-    vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
-    storage_context = StorageContext.from_defaults(vector_store=vector_store)
-
-    VectorStoreIndex.from_documents(documents=documents,
-                                    storage_context=storage_context,
-                                    vector_store=vector_store, show_progress=True, embedding=Settings.embed_model)
+    def tagged_pages():
+        for page in iter_document_pages(path):
+            tag_documents_with_file_id([page], chat_file.id)
+            yield page
+
+    nodes = iter_chunks(tagged_pages(), Settings.transformations, progress=progress)
+    sync_file_nodes(nodes, file_id=chat_file.id, chroma_collection=chroma_collection, db_client=db_client,
+                    progress=progress, path=chat_file.path_name)
     try:
         chat_file = db_client.get(ChatFile, chat_file.id)
         chat_file.indexed = True
@@ -123,7 +271,8 @@ def index_uploaded_file(path: str, chat_file: ChatFile, chroma_collection: Colle
         logger.error(e)
 
 
-def index_sql_dump(file: ChatFile, chroma_collection: Collection):
+def index_sql_dump(file: ChatFile, chroma_collection: Collection, db_client: SessionDep,
+                   progress: Optional[IndexingProgress] = None):
     """
     Indexes a SQL database dump into a vector store for efficient querying.
 
@@ -136,6 +285,8 @@ def index_sql_dump(file: ChatFile, chroma_collection: Collection):
             including the database name and the list of tables to index.
         chroma_collection (Collection): A Chroma collection used as the 
             backend for the vector store.
+        db_client (SessionDep): The database session recording the schema nodes' Chroma ids.
+        progress (IndexingProgress, optional): Publishes the ingestion progress of the dump.
 
     Raises:
         Any exceptions raised during database connection, vector store 
@@ -149,11 +300,7 @@ def index_sql_dump(file: ChatFile, chroma_collection: Collection):
         return
 
     try:
-        vector_store = ChromaVectorStore(chroma_collection=chroma_collection)
-        storage_context = StorageContext.from_defaults(vector_store=vector_store)
-        pg_url = initialize_pg_url(file.database_name)
-        db_engine = create_engine(pg_url)
-        sql_database = SQLDatabase(db_engine, include_tables=file.tables)
+        sql_database = CachedSQLDatabase.from_file(file)
         tables_node_mapping = SQLTableNodeMapping(sql_database)
 
         table_schema_objs = [SQLTableSchema(table_name=t) for t in file.tables]
@@ -165,38 +312,67 @@ def index_sql_dump(file: ChatFile, chroma_collection: Collection):
             base_meta = getattr(node, 'metadata', {}) or {}
             base_meta.update({'file_id': file.id})
             node.metadata = base_meta
+            node.excluded_embed_metadata_keys = list(set(node.excluded_embed_metadata_keys) | {'file_id'})
+
+        if progress:
+            progress.produced_chunks(len(nodes))
 
-        # Directly build a VectorStoreIndex from nodes (no ObjectIndex indirection needed here)
-        VectorStoreIndex(
-            nodes,
-            storage_context=storage_context,
-            show_progress=True,
-            embed_model=Settings.embed_model,
-        )
+        # Embed and upsert the schema nodes directly (no ObjectIndex indirection needed here); by chunk
+        # diff with content-derived, tracked ids, so a retry does not store the schema a second time
+        sync_file_nodes(nodes, file_id=file.id, chroma_collection=chroma_collection, db_client=db_client,
+                        progress=progress)
         logger.info(f"Indexed SQL schema for {len(nodes)} tables (file_id={file.id}).")
     except Exception as e:
         logger.error(f"Error indexing SQL dump for file_id={file.id}: {e}", exc_info=True)
         raise
+    finally:
+        # the indexing worker does not query the database again
+        get_sql_engine_registry().dispose(file.database_name)
 
 
-def deletes_file_index_from_collection(file_id: str, chroma_collection: Collection):
+async def deletes_file_index_from_collection(file_id: str, chroma_collection: Collection, db_client: AsyncSession):
     """
     Deletes all documents associated with a given file ID from the specified Chroma collection.
 
     Args:
         file_id (str): The unique identifier of the file whose documents are to be deleted.
         chroma_collection (Collection): The Chroma collection from which the documents will be deleted.
+        db_client (AsyncSession): The request's database session holding the file's tracked Chroma ids.
+
+    Behavior:
+        - See ``deletes_files_index_from_collection``.
+    """
+    await deletes_files_index_from_collection([file_id], chroma_collection, db_client)
+
+
+async def deletes_files_index_from_collection(file_ids: List[str], chroma_collection: Collection,
+                                              db_client: AsyncSession):
+    """
+    Deletes all documents associated with the given file IDs from the specified Chroma collection.
+
+    Args:
+        file_ids (List[str]): The unique identifiers of the files whose documents are to be deleted.
+        chroma_collection (Collection): The Chroma collection from which the documents will be deleted.
+        db_client (AsyncSession): The request's database session holding the files' tracked Chroma ids.
 
     Behavior:
-        - Deletes documents from the collection where the 'file_id' matches the provided value.
-        - Attempts to retrieve documents with the same 'file_id' after deletion to verify the operation.
-        - Logs an error if no documents are found for the given 'file_id' after the deletion process.
-
-    Note:
-        Ensure that the `chroma_collection` object supports the `delete` and `get` methods with the 
-        specified query format.
-    """
-    chroma_collection.delete(where={'file_id': {'$eq': file_id}})
-    docs = chroma_collection.get(where={'file_id': {'$eq': file_id}})
-    if len(docs['metadatas']) <= 0:
-        logger.error('No documents found for file_id', file_id, 'Deleted file: ', file_id)
+        - Looks up the Chroma ids recorded for all files with a single query and deletes them
+          by id in batches, without a metadata scan and without a verification read.
+        - Files indexed before ids were tracked fall back to a delete by 'file_id' metadata filter.
+        - The blocking Chroma deletes and Redis writes run in a worker thread, off the event loop.
+        - Removes the records of the deleted ids within the session's transaction; the caller commits.
+        - Invalidates the cached retrieval results over the files.
+    """
+    tracked = await aget_tracked_vector_ids(db_client, file_ids)
+    vector_ids = [vector_id for ids in tracked.values() for vector_id in ids]
+    untracked_file_ids = [file_id for file_id in file_ids if file_id not in tracked]
+    await asyncio.to_thread(_delete_files_vectors, vector_ids, untracked_file_ids, chroma_collection)
+    await auntrack_vectors(db_client, vector_ids)
+    await asyncio.to_thread(bump_file_versions, file_ids)
+    logger.info(f"Deleted {len(vector_ids)} tracked vectors of {len(file_ids)} files")
+
+
+def _delete_files_vectors(vector_ids: List[str], untracked_file_ids: List[str], chroma_collection: Collection):
+    delete_vectors_by_id(vector_ids, chroma_collection)
+    for file_id in untracked_file_ids:
+        chroma_collection.delete(where={'file_id': {'$eq': file_id}})
@@ -0,0 +1,248 @@
+import asyncio
+import os
+import time
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.schema import BaseNode, MetadataMode
+from llama_index.vector_stores.chroma import ChromaVectorStore
+
+from dependencies import logger
+from services.embedding_cache import EmbeddingCache, get_embedding_cache
+from services.progress import IndexingProgress
+
+EMBED_MAX_IN_FLIGHT = int(os.getenv("EMBED_MAX_IN_FLIGHT", 4))
+EMBED_INITIAL_BATCH_SIZE = int(os.getenv("EMBED_INITIAL_BATCH_SIZE", 32))
+EMBED_MIN_BATCH_SIZE = int(os.getenv("EMBED_MIN_BATCH_SIZE", 4))
+EMBED_MAX_BATCH_SIZE = int(os.getenv("EMBED_MAX_BATCH_SIZE", 256))
+EMBED_TARGET_LATENCY = float(os.getenv("EMBED_TARGET_LATENCY", 5.0))
+EMBED_REQUEST_TIMEOUT = float(os.getenv("EMBED_REQUEST_TIMEOUT", 120.0))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", 3))
+
+
+class AdaptiveBatchSizer:
+    """
+    Chooses the embedding batch size from observed latencies and errors (AIMD).
+
+    Batches that finish well below ``target_latency`` grow the batch size additively,
+    slow batches shrink it proportionally and failures halve it, so the pipeline
+    converges on the largest batch the embedding backend serves without timing out.
+
+    Args:
+        initial (int): Starting batch size.
+        min_size (int): Lower bound of the batch size.
+        max_size (int): Upper bound of the batch size.
+        target_latency (float): Desired seconds per batch.
+    """
+    def __init__(self, initial: int = EMBED_INITIAL_BATCH_SIZE, min_size: int = EMBED_MIN_BATCH_SIZE,
+                 max_size: int = EMBED_MAX_BATCH_SIZE, target_latency: float = EMBED_TARGET_LATENCY):
+        if not 0 < min_size <= max_size:
+            raise ValueError("Expected 0 < min_size <= max_size")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_latency = target_latency
+        self.size = max(min_size, min(initial, max_size))
+
+    def record_success(self, batch_size: int, latency: float):
+        """Adjusts the batch size after a batch of ``batch_size`` chunks took ``latency`` seconds."""
+        if batch_size < self.size:
+            # Trailing partial batches say little about the backend's capacity.
+            return
+        if latency < self.target_latency / 2:
+            self.size = min(self.max_size, self.size + max(1, self.size // 4))
+        elif latency > self.target_latency:
+            scaled = int(self.size * self.target_latency / latency)
+            self.size = max(self.min_size, scaled)
+
+    def record_failure(self):
+        """Halves the batch size after a failed or timed out batch."""
+        self.size = max(self.min_size, self.size // 2)
+
+
+class EmbeddingPipeline:
+    """
+    Ingestion stage that embeds chunks in concurrent, adaptively sized batches.
+
+    Chunks are pulled lazily from the input iterable, so only ``max_in_flight`` batches (plus the
+    one being pulled) are held in memory at any time. The iterable is consumed in a worker
+    thread, because pulling a chunk may parse the next pages or sheets of a file; parsing thus
+    overlaps with the batches being embedded instead of blocking the event loop. Each batch
+    consults the embedding cache, embeds the misses, and is upserted to Chroma as soon as it
+    completes, so early chunks become queryable while later ones are still being embedded.
+
+    ``on_upserted`` runs in a worker thread as well, one call at a time, so it may use a sync
+    database session.
+
+    Every batch is sent to the backend as one request: batches never grow beyond the model's
+    ``embed_batch_size``, which would otherwise split them into sequential requests.
+
+    Args:
+        vector_store (ChromaVectorStore): Destination of the embedded chunks.
+        embed_model (BaseEmbedding): Embedding model, usually ``Settings.embed_model``.
+        cache (EmbeddingCache, optional): Embedding cache. Defaults to ``get_embedding_cache()``.
+        max_in_flight (int): Maximum number of concurrently embedding batches.
+        sizer (AdaptiveBatchSizer, optional): Batch size controller.
+        request_timeout (float): Seconds before an embedding request is considered failed.
+        max_retries (int): Retries per batch before the pipeline fails.
+        on_upserted (Callable[[List[BaseNode]], None], optional): Called with every upserted batch.
+        progress (IndexingProgress, optional): Receives embedded/upserted chunk counts.
+    """
+    def __init__(self, vector_store: ChromaVectorStore, embed_model: BaseEmbedding,
+                 cache: Optional[EmbeddingCache] = None,
+                 max_in_flight: int = EMBED_MAX_IN_FLIGHT,
+                 sizer: Optional[AdaptiveBatchSizer] = None,
+                 request_timeout: float = EMBED_REQUEST_TIMEOUT,
+                 max_retries: int = EMBED_MAX_RETRIES,
+                 on_upserted: Optional[Callable[[List[BaseNode]], None]] = None,
+                 progress: Optional[IndexingProgress] = None):
+        if max_in_flight <= 0:
+            raise ValueError("max_in_flight must be positive")
+        self.vector_store = vector_store
+        self.embed_model = embed_model
+        self.cache = cache if cache is not None else get_embedding_cache()
+        self.max_in_flight = max_in_flight
+        self.sizer = sizer or AdaptiveBatchSizer()
+        request_size = getattr(embed_model, "embed_batch_size", None)
+        if request_size and self.sizer.max_size > request_size:
+            # the model splits larger batches into sequential requests, which would hide the
+            # latency of a single request from the sizer
+            logger.warning(f"Embedding batches capped at the model's embed_batch_size of {request_size}")
+            self.sizer.max_size = max(self.sizer.min_size, request_size)
+            self.sizer.size = min(self.sizer.size, self.sizer.max_size)
+        self.request_timeout = request_timeout
+        self.max_retries = max_retries
+        self.on_upserted = on_upserted
+        self.progress = progress
+        # serializes ``on_upserted``, which runs in worker threads
+        self._callback_lock = asyncio.Lock()
+        self.stats = {"chunks": 0, "cached": 0, "embedded": 0, "upserted": 0, "batches": 0, "errors": 0}
+
+    def run(self, nodes: Iterable[BaseNode]) -> dict:
+        """Synchronous entry point for background jobs without a running event loop."""
+        return asyncio.run(self.arun(nodes))
+
+    async def arun(self, nodes: Iterable[BaseNode]) -> dict:
+        """
+        Embeds and upserts all ``nodes``.
+
+        Returns:
+            dict: Counters of processed chunks, cache hits, embedded chunks, upserted chunks,
+            batches and errors, plus the final batch size and the elapsed seconds.
+
+        Raises:
+            Exception: The first batch failure that exhausted its retries.
+        """
+        started = time.perf_counter()
+        slots = asyncio.Semaphore(self.max_in_flight)
+        tasks: List[asyncio.Task] = []
+
+        async def process(batch: List[BaseNode]):
+            try:
+                await self._process_batch(batch)
+            finally:
+                slots.release()
+
+        chunks = iter(nodes)
+        while True:
+            batch = await asyncio.to_thread(self._take, chunks, self.sizer.size)
+            if not batch:
+                break
+            await slots.acquire()
+            self._raise_failed(tasks)
+            tasks.append(asyncio.create_task(process(batch)))
+
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            raise errors[0]
+
+        self.stats["batch_size"] = self.sizer.size
+        self.stats["seconds"] = round(time.perf_counter() - started, 3)
+        logger.info(f"Embedding pipeline finished: {self.stats}")
+        return self.stats
+
+    @staticmethod
+    def _take(chunks: Iterator[BaseNode], size: int) -> List[BaseNode]:
+        return list(islice(chunks, size))
+
+    @staticmethod
+    def _raise_failed(tasks: List[asyncio.Task]):
+        # Stop pulling new chunks as soon as a batch gave up.
+        for task in tasks:
+            if task.done() and not task.cancelled() and task.exception():
+                raise task.exception()
+
+    async def _process_batch(self, batch: List[BaseNode]):
+        self.stats["chunks"] += len(batch)
+        pending = [node for node in batch if node.embedding is None]
+        if pending:
+            await self._embed(pending)
+        if self.progress:
+            self.progress.embedded_chunks(len(batch))
+        await asyncio.to_thread(self.vector_store.add, batch)
+        self.stats["upserted"] += len(batch)
+        self.stats["batches"] += 1
+        if self.progress:
+            self.progress.upserted_chunks(len(batch))
+        if self.on_upserted:
+            async with self._callback_lock:
+                await asyncio.to_thread(self.on_upserted, batch)
+
+    async def _embed(self, nodes: List[BaseNode]):
+        texts = [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
+        model_name = self.embed_model.model_name
+
+        cached: List[Optional[List[float]]] = [None] * len(nodes)
+        if self.cache is not None:
+            try:
+                cached = await asyncio.to_thread(self.cache.get_many, model_name, texts)
+            except Exception as e:
+                logger.error(f"Embedding cache lookup failed, embedding all chunks: {e}")
+
+        misses = [i for i, embedding in enumerate(cached) if embedding is None]
+        for i, embedding in enumerate(cached):
+            if embedding is not None:
+                nodes[i].embedding = embedding
+        self.stats["cached"] += len(nodes) - len(misses)
+        if not misses:
+            return
+
+        miss_texts = [texts[i] for i in misses]
+        embeddings = await self._embed_with_retries(miss_texts)
+        for i, embedding in zip(misses, embeddings):
+            nodes[i].embedding = embedding
+        self.stats["embedded"] += len(misses)
+
+        if self.cache is not None:
+            try:
+                await asyncio.to_thread(self.cache.put_many, model_name, miss_texts, embeddings)
+            except Exception as e:
+                logger.error(f"Embedding cache write failed: {e}")
+
+    async def _embed_with_retries(self, texts: List[str]) -> List[List[float]]:
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                embeddings = await asyncio.wait_for(self.embed_model.aget_text_embedding_batch(texts),
+                                                    timeout=self.request_timeout)
+                self.sizer.record_success(len(texts), time.perf_counter() - started)
+                return embeddings
+            except Exception as e:
+                attempt += 1
+                self.stats["errors"] += 1
+                self.sizer.record_failure()
+                if attempt > self.max_retries:
+                    logger.error(f"Embedding batch of {len(texts)} chunks failed after {attempt} attempts: {e}")
+                    raise
+                if len(texts) > self.sizer.size:
+                    # Retry the halves separately so an overloaded backend gets smaller requests.
+                    middle = len(texts) // 2
+                    logger.warning(f"Embedding batch of {len(texts)} chunks failed ({e}), splitting it")
+                    first = await self._embed_with_retries(texts[:middle])
+                    second = await self._embed_with_retries(texts[middle:])
+                    return first + second
+                backoff = min(30.0, 2 ** attempt)
+                logger.warning(f"Embedding batch failed ({e}), retrying in {backoff}s")
+                await asyncio.sleep(backoff)
@@ -0,0 +1,223 @@
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import and_, or_, update
+from sqlmodel import Session, select
+
+from dependencies import engine, logger
+from models import ChatFile, IndexingJob
+
+JOB_MAX_ATTEMPTS = int(os.getenv("INDEXING_JOB_MAX_ATTEMPTS", 5))
+JOB_BACKOFF_SECONDS = float(os.getenv("INDEXING_JOB_BACKOFF_SECONDS", 10))
+JOB_BACKOFF_MAX_SECONDS = float(os.getenv("INDEXING_JOB_BACKOFF_MAX_SECONDS", 600))
+# a running job's worker renews its lease every JOB_HEARTBEAT_SECONDS; a job whose lease expired
+# (its worker died) is claimed again
+JOB_LEASE_SECONDS = float(os.getenv("INDEXING_JOB_LEASE_SECONDS", 600))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("INDEXING_JOB_HEARTBEAT_SECONDS", 60))
+
+JOB_KIND_DOCUMENT = "document"
+JOB_KIND_SPREADSHEET = "spreadsheet"
+JOB_KIND_SQL_DUMP = "sql_dump"
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_RETRYING = "retrying"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+
+
+def enqueue_indexing_job(db_client: Session, chat_file: ChatFile, kind: str, payload: Optional[dict] = None,
+                         max_attempts: int = JOB_MAX_ATTEMPTS) -> IndexingJob:
+    """
+    Adds a durable indexing job for ``chat_file`` to the session.
+
+    The job becomes visible to the workers once the caller commits the session, so the job and
+    the ``ChatFile`` it refers to are persisted atomically.
+
+    Args:
+        db_client (Session): The database session of the request.
+        chat_file (ChatFile): The uploaded file to index.
+        kind (str): One of ``document``, ``spreadsheet`` or ``sql_dump``.
+        payload (dict, optional): Kind-specific arguments for the worker.
+        max_attempts (int): Attempts before the job is marked as failed.
+
+    Returns:
+        IndexingJob: The pending job.
+    """
+    job = IndexingJob(
+        kind=kind,
+        chat_id=chat_file.chat_id,
+        chat_file_id=chat_file.id,
+        payload=payload or {},
+        max_attempts=max_attempts,
+    )
+    chat_file.index_status = STATUS_QUEUED
+    chat_file.index_attempts = 0
+    chat_file.index_error = None
+    db_client.add(job)
+    logger.info(f"Enqueued {kind} indexing job {job.id} for file {chat_file.id}")
+    return job
+
+
+def claim_next_job(db_client: Session, worker_id: str) -> Optional[IndexingJob]:
+    """
+    Atomically claims the oldest runnable job.
+
+    Uses ``SELECT ... FOR UPDATE SKIP LOCKED`` so concurrent workers never claim the same job.
+    Jobs whose lease expired (their worker died mid-run) are claimed again, unless they used up
+    their attempts, in which case they are marked as failed.
+
+    Args:
+        db_client (Session): A session owned by the worker.
+        worker_id (str): Identifier of the claiming worker, stored for diagnostics.
+
+    Returns:
+        Optional[IndexingJob]: The claimed job, or None if the queue is empty.
+    """
+    while True:
+        now = datetime.now()
+        statement = (
+            select(IndexingJob)
+            .where(or_(
+                and_(IndexingJob.status.in_([STATUS_QUEUED, STATUS_RETRYING]), IndexingJob.run_after <= now),
+                and_(IndexingJob.status == STATUS_RUNNING,
+                     IndexingJob.locked_at < now - timedelta(seconds=JOB_LEASE_SECONDS)),
+            ))
+            .order_by(IndexingJob.run_after)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        job = db_client.exec(statement).first()
+        if job is None:
+            db_client.rollback()
+            return None
+
+        chat_file = db_client.get(ChatFile, job.chat_file_id)
+        if job.status == STATUS_RUNNING and job.attempts >= job.max_attempts:
+            job.status = STATUS_FAILED
+            job.last_error = f"Worker {job.locked_by} stopped renewing the lease of the last attempt"
+            job.locked_by = None
+            job.locked_at = None
+            job.updated_at = now
+            if chat_file:
+                chat_file.index_status = STATUS_FAILED
+                chat_file.index_error = job.last_error
+            db_client.commit()
+            logger.error(f"Indexing job {job.id} failed permanently after {job.attempts} attempts: {job.last_error}")
+            continue
+
+        job.status = STATUS_RUNNING
+        job.attempts += 1
+        job.locked_by = worker_id
+        job.locked_at = now
+        job.updated_at = now
+        if chat_file:
+            chat_file.index_status = STATUS_RUNNING
+            chat_file.index_attempts = job.attempts
+        db_client.commit()
+        db_client.refresh(job)
+        return job
+
+
+def renew_lease(db_client: Session, job_id: str, worker_id: str) -> bool:
+    """
+    Extends the lease of a running job held by ``worker_id``.
+
+    Returns:
+        bool: False if the job is no longer running under this worker.
+    """
+    now = datetime.now()
+    result = db_client.execute(
+        update(IndexingJob)
+        .where(IndexingJob.id == job_id, IndexingJob.status == STATUS_RUNNING, IndexingJob.locked_by == worker_id)
+        .values(locked_at=now, updated_at=now)
+    )
+    db_client.commit()
+    return result.rowcount > 0
+
+
+class JobLease:
+    """
+    Keeps the lease of a claimed job alive while it runs.
+
+    A background thread renews the lease every ``interval`` seconds with its own session, so a
+    job that runs longer than ``JOB_LEASE_SECONDS`` is not claimed by a second worker. Use it as
+    a context manager around the job's execution.
+
+    Args:
+        job (IndexingJob): The claimed job.
+        worker_id (str): The worker that claimed the job.
+        interval (float): Seconds between renewals.
+    """
+    def __init__(self, job: IndexingJob, worker_id: str, interval: float = JOB_HEARTBEAT_SECONDS):
+        self.job_id = job.id
+        self.worker_id = worker_id
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"lease-{job.id}", daemon=True)
+
+    def __enter__(self) -> "JobLease":
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                with Session(engine) as db_client:
+                    if not renew_lease(db_client, self.job_id, self.worker_id):
+                        logger.warning(f"Lease of indexing job {self.job_id} was lost by worker {self.worker_id}")
+                        return
+            except Exception as e:
+                logger.error(f"Could not renew the lease of indexing job {self.job_id}: {e}")
+
+
+def complete_job(db_client: Session, job: IndexingJob):
+    """Marks ``job`` and its file as succeeded."""
+    job.status = STATUS_SUCCEEDED
+    job.last_error = None
+    job.updated_at = datetime.now()
+    chat_file = db_client.get(ChatFile, job.chat_file_id)
+    if chat_file:
+        chat_file.index_status = STATUS_SUCCEEDED
+        chat_file.index_error = None
+    db_client.commit()
+
+
+def fail_job(db_client: Session, job: IndexingJob, error: Exception):
+    """
+    Records a failed attempt of ``job``.
+
+    The job is rescheduled with exponential backoff until ``max_attempts`` is reached,
+    after which it and its file are marked as failed.
+    """
+    db_client.rollback()
+    job = db_client.get(IndexingJob, job.id)
+    if job is None:
+        # The file (and with it the job) was deleted while the job was running.
+        return
+    now = datetime.now()
+    job.last_error = str(error)[:2000]
+    job.locked_by = None
+    job.locked_at = None
+    job.updated_at = now
+    if job.attempts < job.max_attempts:
+        delay = min(JOB_BACKOFF_MAX_SECONDS, JOB_BACKOFF_SECONDS * 2 ** (job.attempts - 1))
+        job.status = STATUS_RETRYING
+        job.run_after = now + timedelta(seconds=delay)
+        logger.warning(f"Indexing job {job.id} failed (attempt {job.attempts}/{job.max_attempts}), "
+                       f"retrying in {delay}s: {error}")
+    else:
+        job.status = STATUS_FAILED
+        logger.error(f"Indexing job {job.id} failed permanently after {job.attempts} attempts: {error}")
+
+    chat_file = db_client.get(ChatFile, job.chat_file_id)
+    if chat_file:
+        chat_file.index_status = job.status
+        chat_file.index_error = job.last_error
+    db_client.commit()
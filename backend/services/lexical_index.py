@@ -0,0 +1,129 @@
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+from dependencies import logger
+
+BM25_K1 = float(os.getenv("BM25_K1", 1.5))
+BM25_B = float(os.getenv("BM25_B", 0.75))
+LEXICAL_INDEX_CACHE_SIZE = int(os.getenv("LEXICAL_INDEX_CACHE_SIZE", 32))
+
+# words, numbers and identifiers joined by - . / : _ such as INV-2023-0042, SKU 12.500-B or E_1234
+_TOKEN = re.compile(r"\w+(?:[-./:]\w+)*")
+_SEPARATOR = re.compile(r"[-./:_]")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Splits ``text`` into lowercase BM25 terms.
+
+    Compound identifiers are kept as one term and additionally split into their parts, so
+    ``INV-2023-0042`` matches exactly as well as by its number.
+    """
+    terms = []
+    for token in _TOKEN.findall(text.lower()):
+        terms.append(token)
+        if _SEPARATOR.search(token):
+            terms.extend(part for part in _SEPARATOR.split(token) if part)
+    return terms
+
+
+def lexical_index_path(path: str) -> str:
+    """Returns the path of the BM25 index of the uploaded file at ``path``."""
+    return f"{path}.bm25.json"
+
+
+def write_lexical_index(path: str, documents: Iterable[Tuple[str, Counter]]):
+    """
+    Writes the BM25 index of a file next to it.
+
+    Args:
+        path (str): File system path of the uploaded file.
+        documents (Iterable[Tuple[str, Counter]]): The term frequencies per chunk, keyed by the chunk's
+            Chroma id, so search results can be resolved to the stored nodes.
+    """
+    docs = {node_id: {"length": sum(frequencies.values()), "tf": dict(frequencies)}
+            for node_id, frequencies in documents}
+    target = lexical_index_path(path)
+    tmp_path = f"{target}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump({"version": 1, "docs": docs}, file)
+    os.replace(tmp_path, target)
+    logger.info(f"Wrote BM25 index of {len(docs)} chunks for {path}")
+
+
+def remove_lexical_index(path: str):
+    """Deletes the BM25 index of an uploaded file."""
+    try:
+        os.remove(lexical_index_path(path))
+    except FileNotFoundError:
+        pass
+
+
+class LexicalIndex:
+    """
+    In-memory BM25 index over the chunks of one file.
+
+    Args:
+        docs (Dict[str, dict]): ``{"length", "tf"}`` per chunk id, as written by ``write_lexical_index``.
+        k1 (float): BM25 term frequency saturation.
+        b (float): BM25 length normalization.
+    """
+    def __init__(self, docs: Dict[str, dict], k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.lengths = {node_id: doc["length"] for node_id, doc in docs.items()}
+        self.avg_length = (sum(self.lengths.values()) / len(self.lengths)) if self.lengths else 0.0
+        self.postings: Dict[str, List[Tuple[str, int]]] = defaultdict(list)
+        for node_id, doc in docs.items():
+            for term, frequency in doc["tf"].items():
+                self.postings[term].append((node_id, frequency))
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def search(self, query: str, top_k: int) -> List[Tuple[str, float]]:
+        """
+        Scores the chunks against ``query`` with Okapi BM25.
+
+        Returns:
+            List[Tuple[str, float]]: The ``top_k`` best ``(chunk id, score)`` pairs with a positive score.
+        """
+        count = len(self.lengths)
+        if not count:
+            return []
+        scores: Dict[str, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for node_id, frequency in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[node_id] / (self.avg_length or 1))
+                scores[node_id] += idf * frequency * (self.k1 + 1) / (frequency + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+
+
+@lru_cache(maxsize=LEXICAL_INDEX_CACHE_SIZE)
+def _load_lexical_index(index_path: str, mtime_ns: int) -> LexicalIndex:
+    with open(index_path, encoding="utf-8") as file:
+        return LexicalIndex(json.load(file)["docs"])
+
+
+def load_lexical_index(path: str) -> LexicalIndex:
+    """
+    Loads the BM25 index of an uploaded file; indexes are cached per process until the file is re-indexed.
+
+    Files indexed before BM25 indexes were written have an empty index.
+    """
+    index_path = lexical_index_path(path)
+    try:
+        mtime_ns = os.stat(index_path).st_mtime_ns
+    except FileNotFoundError:
+        logger.debug(f"No BM25 index for {path}")
+        return LexicalIndex({})
+    return _load_lexical_index(index_path, mtime_ns)
@@ -1,5 +1,7 @@
+import asyncio
 from llama_index.core.agent.workflow import ReActAgent
-from typing import List
+from llama_index.core.workflow.handler import WorkflowHandler
+from typing import List, Set
 from llama_index.core.tools import BaseTool
 from llama_index.core.llms import LLM
 
@@ -30,3 +32,28 @@ def create_agent(system_prompt: str, tools: List[BaseTool],
         **kwargs,
     )
     return agent
+
+
+# keeps scheduled cancellations alive until they ran
+_cancellations: Set[asyncio.Task] = set()
+
+
+def cancel_agent_run(handler: WorkflowHandler):
+    """
+    Cancels a running agent workflow, e.g. after the client of a streamed answer disconnected.
+
+    The workflow cancels all of its running steps, which aborts in-flight LLM requests (the model
+    server stops generating once the connection is closed) and the tool calls awaited by them.
+    The cancellation is scheduled as a separate task, so it also works from code that is itself
+    being cancelled and must not await anymore.
+
+    Args:
+        handler (WorkflowHandler): The handler returned by ``agent.run``.
+    """
+    if handler.done():
+        return
+    # the handler fails with WorkflowCancelledByUser, which nobody awaits anymore
+    handler.add_done_callback(lambda future: future.cancelled() or future.exception())
+    task = asyncio.get_running_loop().create_task(handler.cancel_run())
+    _cancellations.add(task)
+    task.add_done_callback(_cancellations.discard)
@@ -0,0 +1,194 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import httpx
+from llama_index.core.llms import LLM
+
+from dependencies import base_url, logger
+
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", 500))
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", 32))
+LLM_HTTP_MAX_KEEPALIVE = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", 16))
+LLM_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", 60))
+LLM_HTTP_POOL_TIMEOUT = float(os.getenv("LLM_HTTP_POOL_TIMEOUT", 120))
+LLM_REGISTRY_MAX_ENTRIES = int(os.getenv("LLM_REGISTRY_MAX_ENTRIES", 32))
+LLM_REGISTRY_IDLE_SECONDS = float(os.getenv("LLM_REGISTRY_IDLE_SECONDS", 1800))
+
+IONOS_MODEL = "meta-llama/Llama-3.3-70B-Instruct"
+
+
+class LLMRegistry:
+    """
+    Process-wide registry of LLM clients, keyed by provider, model and temperature.
+
+    Every LLM backend (the Ollama host or the IONOS endpoint) gets one pair of pooled HTTP clients
+    (sync and async) with keep-alive, shared by all LLM instances of the backend, so chat turns
+    reuse open connections instead of setting up new ones. The pool's ``max_connections`` bounds
+    the concurrent requests per backend; further requests wait up to ``pool_timeout`` seconds for
+    a free connection.
+
+    LLM instances unused for ``idle_seconds`` are dropped, and beyond ``max_entries`` the least
+    recently used one is dropped. The HTTP clients stay open until ``aclose`` on shutdown. The
+    async clients belong to the event loop of the API process and must not be used from another
+    loop.
+
+    Args:
+        max_connections (int): Maximum open connections per backend.
+        max_keepalive (int): Idle connections kept open per backend.
+        keepalive_expiry (float): Seconds after which an idle connection is closed.
+        pool_timeout (float): Seconds to wait for a free connection.
+        request_timeout (float): Seconds before an LLM request fails.
+        max_entries (int): Maximum number of cached LLM instances.
+        idle_seconds (float): Seconds after the last use after which an LLM instance is dropped.
+    """
+    def __init__(self, max_connections: int = LLM_HTTP_MAX_CONNECTIONS, max_keepalive: int = LLM_HTTP_MAX_KEEPALIVE,
+                 keepalive_expiry: float = LLM_HTTP_KEEPALIVE_EXPIRY, pool_timeout: float = LLM_HTTP_POOL_TIMEOUT,
+                 request_timeout: float = LLM_REQUEST_TIMEOUT, max_entries: int = LLM_REGISTRY_MAX_ENTRIES,
+                 idle_seconds: float = LLM_REGISTRY_IDLE_SECONDS):
+        if max_connections <= 0 or max_entries <= 0:
+            raise ValueError("max_connections and max_entries must be positive")
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive,
+                                   keepalive_expiry=keepalive_expiry)
+        self.timeout = httpx.Timeout(request_timeout, pool=pool_timeout)
+        self.request_timeout = request_timeout
+        self.max_entries = max_entries
+        self.idle_seconds = idle_seconds
+        # (provider, model, temperature) -> (llm, last use as monotonic time)
+        self._llms: "OrderedDict[Tuple, Tuple[LLM, float]]" = OrderedDict()
+        # backend -> shared clients
+        self._clients: Dict[str, Tuple] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _ollama_clients(self):
+        from ollama import AsyncClient, Client
+
+        if "ollama" not in self._clients:
+            self._clients["ollama"] = (
+                Client(host=base_url, timeout=self.timeout, limits=self.limits),
+                AsyncClient(host=base_url, timeout=self.timeout, limits=self.limits),
+            )
+        return self._clients["ollama"]
+
+    def _ionos_clients(self):
+        if "ionos" not in self._clients:
+            self._clients["ionos"] = (
+                httpx.Client(timeout=self.timeout, limits=self.limits),
+                httpx.AsyncClient(timeout=self.timeout, limits=self.limits),
+            )
+        return self._clients["ionos"]
+
+    def _create_llm(self, provider: str, model: str, temperature: float) -> LLM:
+        if provider == "IONOS":
+            from llama_index.llms.openai_like import OpenAILike
+
+            ionos_base_url = os.getenv("IONOS_BASE_URL", "http://localhost:11434")
+            api_key = os.getenv("IONOS_API_KEY", "your_api_key_here")
+            # tools expecting OpenAI-like APIs read these
+            os.environ["OPENAI_API_BASE"] = ionos_base_url
+            os.environ["OPENAI_API_KEY"] = api_key
+            http_client, async_http_client = self._ionos_clients()
+            return OpenAILike(
+                api_base=ionos_base_url,
+                temperature=temperature,
+                model=model,
+                is_chat_model=True,
+                default_headers={
+                    'Authorization': f'Bearer {api_key}',
+                    'Content-Type': 'application/json',
+                },
+                api_key=api_key,
+                context_window=128000,
+                http_client=http_client,
+                async_http_client=async_http_client,
+            )
+
+        from llama_index.llms.ollama import Ollama
+
+        client, async_client = self._ollama_clients()
+        return Ollama(model=model, temperature=temperature, request_timeout=self.request_timeout,
+                      base_url=base_url, client=client, async_client=async_client)
+
+    def get_llm(self, provider: str, model: str, temperature: float) -> LLM:
+        """
+        Returns the shared LLM instance of ``provider``, ``model`` and ``temperature``.
+
+        Args:
+            provider (str): ``OLLAMA`` or ``IONOS``.
+            model (str): The model name; IONOS always serves ``IONOS_MODEL``.
+            temperature (float): The sampling temperature.
+
+        Returns:
+            LLM: The LLM, talking to its backend through the backend's pooled HTTP clients.
+        """
+        provider = provider.upper()
+        if provider == "IONOS":
+            model = IONOS_MODEL
+        key = (provider, model, temperature)
+        now = time.monotonic()
+        with self._lock:
+            for idle_key in [k for k, (_, last_used) in self._llms.items()
+                             if k != key and now - last_used > self.idle_seconds]:
+                del self._llms[idle_key]
+                self.evictions += 1
+
+            entry = self._llms.get(key)
+            if entry is None:
+                llm = self._create_llm(provider, model, temperature)
+                self.misses += 1
+            else:
+                llm = entry[0]
+                self.hits += 1
+            self._llms[key] = (llm, now)
+            self._llms.move_to_end(key)
+
+            while len(self._llms) > self.max_entries:
+                self._llms.popitem(last=False)
+                self.evictions += 1
+        return llm
+
+    async def aclose(self):
+        """Closes the pooled HTTP clients of all backends, e.g. on shutdown."""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            self._llms.clear()
+        for sync_client, async_client in clients:
+            try:
+                sync_client.close()
+                if isinstance(async_client, httpx.AsyncClient):
+                    await async_client.aclose()
+                else:
+                    await async_client.close()
+            except Exception as e:
+                logger.error(f"Could not close LLM HTTP client: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._llms),
+                "max_entries": self.max_entries,
+                "backends": sorted(self._clients),
+                "max_connections_per_backend": self.limits.max_connections,
+            }
+
+
+_llm_registry: Optional[LLMRegistry] = None
+
+
+def get_llm_registry() -> LLMRegistry:
+    """Provides the process-wide LLM registry."""
+    global _llm_registry
+    if _llm_registry is None:
+        _llm_registry = LLMRegistry()
+    return _llm_registry
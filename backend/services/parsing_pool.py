@@ -0,0 +1,154 @@
+import multiprocessing
+import os
+import threading
+from collections import deque
+from multiprocessing.pool import Pool
+from typing import Any, Callable, Iterable, Iterator, Optional, Sequence
+
+from llama_index.core.schema import Document
+
+from dependencies import logger
+from parsing_tasks import (
+    PARSING_MEMORY_LIMIT_MB,
+    count_pdf_pages,
+    extract_pdf_page_range,
+    limit_memory,
+)
+
+PARSING_POOL_PROCESSES = int(os.getenv("PARSING_POOL_PROCESSES", os.cpu_count() or 2))
+PARSING_TASK_TIMEOUT = float(os.getenv("PARSING_TASK_TIMEOUT", 300))
+PARSING_MAX_TASKS_PER_CHILD = int(os.getenv("PARSING_MAX_TASKS_PER_CHILD", 100))
+PARSING_PDF_PAGES_PER_TASK = int(os.getenv("PARSING_PDF_PAGES_PER_TASK", 8))
+
+
+class ParsingTimeoutError(TimeoutError):
+    """Raised when a parsing task exceeds its timeout. The pool is recycled afterwards."""
+
+
+class ParsingPool:
+    """
+    Process pool for the CPU-bound parsing and conversion of uploaded files.
+
+    Parsing in separate processes keeps it from holding the GIL of the process that embeds chunks
+    and lets it scale across cores. Every child has its address space capped at ``memory_limit_mb``
+    and is replaced after ``max_tasks_per_child`` tasks, so leaks of the parsing libraries do not
+    accumulate. Tasks live in the lightweight ``parsing_tasks`` module, so the children do not import
+    the application. A task that exceeds ``timeout`` seconds raises ``ParsingTimeoutError``; since a stuck
+    child cannot be cancelled individually, the whole pool is terminated and recreated lazily.
+
+    Args:
+        processes (int): Number of child processes.
+        timeout (float): Seconds a single task may take.
+        memory_limit_mb (int): Address space limit per child in MB, ``0`` disables the limit.
+        max_tasks_per_child (int): Tasks after which a child is replaced.
+    """
+    def __init__(self, processes: int = PARSING_POOL_PROCESSES, timeout: float = PARSING_TASK_TIMEOUT,
+                 memory_limit_mb: int = PARSING_MEMORY_LIMIT_MB,
+                 max_tasks_per_child: int = PARSING_MAX_TASKS_PER_CHILD):
+        if processes <= 0:
+            raise ValueError("processes must be positive")
+        self.processes = processes
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.max_tasks_per_child = max_tasks_per_child
+        self._pool: Optional[Pool] = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> Pool:
+        with self._lock:
+            if self._pool is None:
+                context = multiprocessing.get_context("spawn")
+                self._pool = context.Pool(processes=self.processes, initializer=limit_memory,
+                                          initargs=(self.memory_limit_mb,),
+                                          maxtasksperchild=self.max_tasks_per_child)
+            return self._pool
+
+    def _recycle(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.terminate()
+                self._pool.join()
+                self._pool = None
+
+    def _wait(self, result, description: str, timeout: Optional[float]):
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            return result.get(timeout=timeout)
+        except multiprocessing.TimeoutError:
+            logger.error(f"Parsing task {description} exceeded {timeout}s, recycling the parsing pool")
+            self._recycle()
+            raise ParsingTimeoutError(f"Parsing {description} exceeded {timeout}s")
+
+    def run(self, func: Callable, *args: Any, timeout: Optional[float] = None) -> Any:
+        """
+        Runs ``func(*args)`` in a child process and returns its result.
+
+        Raises:
+            ParsingTimeoutError: If the task exceeds its timeout.
+            Exception: Any exception raised by ``func``, e.g. ``MemoryError`` when the memory limit is hit.
+        """
+        result = self._get_pool().apply_async(func, args)
+        return self._wait(result, f"{func.__name__}{args}", timeout)
+
+    def imap(self, func: Callable, tasks: Iterable[Sequence[Any]], prefetch: Optional[int] = None,
+             timeout: Optional[float] = None) -> Iterator[Any]:
+        """
+        Runs ``func(*args)`` for every ``args`` in ``tasks`` in parallel and yields the results in order.
+
+        At most ``prefetch`` tasks (default: twice the number of processes) are submitted ahead of the
+        consumer, so results are handed to the next stage as a bounded queue rather than collected.
+        """
+        prefetch = prefetch or 2 * self.processes
+        pool = self._get_pool()
+        pending = deque()
+        for args in tasks:
+            pending.append((pool.apply_async(func, tuple(args)), args))
+            if len(pending) >= prefetch:
+                result, pending_args = pending.popleft()
+                yield self._wait(result, f"{func.__name__}{tuple(pending_args)}", timeout)
+        while pending:
+            result, pending_args = pending.popleft()
+            yield self._wait(result, f"{func.__name__}{tuple(pending_args)}", timeout)
+
+    def close(self):
+        """Stops the child processes."""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.close()
+                self._pool.join()
+                self._pool = None
+
+
+_parsing_pool: Optional[ParsingPool] = None
+
+
+def get_parsing_pool() -> ParsingPool:
+    """
+    Provides the process-wide parsing pool.
+
+    Returns:
+        ParsingPool: The pool; its child processes are started on first use.
+    """
+    global _parsing_pool
+    if _parsing_pool is None:
+        _parsing_pool = ParsingPool()
+    return _parsing_pool
+
+
+def iter_pdf_page_documents(path: str, pages_per_task: int = PARSING_PDF_PAGES_PER_TASK) -> Iterator[Document]:
+    """
+    Yields the pages of a PDF in order while the parsing pool extracts page ranges in parallel.
+
+    Args:
+        path (str): File system path of the PDF.
+        pages_per_task (int): Pages extracted per pool task.
+
+    Yields:
+        Document: One document per page with extractable text.
+    """
+    pool = get_parsing_pool()
+    page_count = pool.run(count_pdf_pages, path)
+    ranges = ((path, start, start + pages_per_task) for start in range(0, page_count, pages_per_task))
+    for pages in pool.imap(extract_pdf_page_range, ranges):
+        for page in pages:
+            yield Document(text=page["text"], metadata=page["metadata"])
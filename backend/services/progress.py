@@ -0,0 +1,109 @@
+import json
+import os
+import time
+from typing import Optional
+
+from redis import Redis
+
+from dependencies import REDIS_HOST, REDIS_PORT, logger
+
+PROGRESS_PUBLISH_INTERVAL = float(os.getenv("INDEXING_PROGRESS_INTERVAL", 0.5))
+PROGRESS_TTL_SECONDS = int(os.getenv("INDEXING_PROGRESS_TTL_SECONDS", 3600))
+
+
+def progress_channel(chat_id: str) -> str:
+    """Redis pub/sub channel carrying the indexing progress events of a chat."""
+    return f"indexing:progress:{chat_id}"
+
+
+def progress_snapshot_key(file_id: str) -> str:
+    """Redis key holding the latest progress snapshot of a file."""
+    return f"indexing:progress:file:{file_id}"
+
+
+class IndexingProgress:
+    """
+    Tracks the ingestion of one ``ChatFile`` and publishes progress events to Redis.
+
+    Every event is a JSON snapshot with the counters of all stages (parsed pages, produced,
+    embedded and upserted chunks) and the upsert throughput in chunks/sec. Events are published
+    on ``progress_channel(chat_id)`` at most every ``min_interval`` seconds (stage changes and the
+    final event are always published), and the latest snapshot is kept under
+    ``progress_snapshot_key(file_id)`` so late subscribers can catch up. Publishing failures
+    never interrupt indexing.
+
+    Args:
+        chat_id (str): The chat the file belongs to.
+        file_id (str): The indexed file.
+        redis_client (Redis, optional): Client with ``decode_responses=True``. Created if omitted.
+        min_interval (float): Minimal seconds between two intermediate events.
+    """
+    def __init__(self, chat_id: str, file_id: str, redis_client: Optional[Redis] = None,
+                 min_interval: float = PROGRESS_PUBLISH_INTERVAL):
+        self.chat_id = chat_id
+        self.file_id = file_id
+        self._redis = redis_client or Redis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True)
+        self.min_interval = min_interval
+        self.started = time.perf_counter()
+        self._last_published = 0.0
+        self.stage = "parsing"
+        self.status = "running"
+        self.error: Optional[str] = None
+        self.pages_parsed = 0
+        self.chunks_produced = 0
+        self.chunks_embedded = 0
+        self.chunks_upserted = 0
+
+    def parsed_pages(self, count: int):
+        self.pages_parsed += count
+        self._update("parsing")
+
+    def produced_chunks(self, count: int):
+        self.chunks_produced += count
+        self._update("chunking")
+
+    def embedded_chunks(self, count: int):
+        self.chunks_embedded += count
+        self._update("embedding")
+
+    def upserted_chunks(self, count: int):
+        self.chunks_upserted += count
+        self._update("upserting")
+
+    def finish(self, error: Optional[Exception] = None):
+        """Publishes the final event, marking the ingestion as succeeded or failed."""
+        self.status = "failed" if error else "succeeded"
+        self.error = str(error) if error else None
+        self._update("done", force=True)
+
+    def snapshot(self) -> dict:
+        elapsed = time.perf_counter() - self.started
+        return {
+            "chat_id": self.chat_id,
+            "file_id": self.file_id,
+            "stage": self.stage,
+            "status": self.status,
+            "error": self.error,
+            "pages_parsed": self.pages_parsed,
+            "chunks_produced": self.chunks_produced,
+            "chunks_embedded": self.chunks_embedded,
+            "chunks_upserted": self.chunks_upserted,
+            "chunks_per_second": round(self.chunks_upserted / elapsed, 2) if elapsed > 0 else 0.0,
+            "elapsed_seconds": round(elapsed, 2),
+        }
+
+    def _update(self, stage: str, force: bool = False):
+        stage_changed = stage != self.stage
+        self.stage = stage
+        now = time.perf_counter()
+        if not (force or stage_changed) and now - self._last_published < self.min_interval:
+            return
+        self._last_published = now
+        event = json.dumps(self.snapshot())
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            pipe.setex(progress_snapshot_key(self.file_id), PROGRESS_TTL_SECONDS, event)
+            pipe.publish(progress_channel(self.chat_id), event)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Could not publish indexing progress of file {self.file_id}: {e}")
@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+from array import array
+from typing import List, Optional, Sequence
+
+from llama_index.core.schema import NodeWithScore
+from llama_index.core.storage.docstore.utils import doc_to_json, json_to_doc
+from redis import Redis
+
+from dependencies import REDIS_HOST, REDIS_PORT, logger
+from services.embedding_cache import EmbeddingCache
+
+QUERY_CACHE_ENABLED = os.getenv("QUERY_CACHE_ENABLED", "true").lower() == "true"
+QUERY_EMBEDDING_CACHE_TTL = int(os.getenv("QUERY_EMBEDDING_CACHE_TTL", 7 * 24 * 3600))
+RETRIEVAL_CACHE_TTL = int(os.getenv("RETRIEVAL_CACHE_TTL", 600))
+QUERY_CACHE_NAMESPACE = os.getenv("QUERY_CACHE_NAMESPACE", "query-cache")
+
+
+class QueryCache:
+    """
+    Redis cache of query embeddings and retrieval results, shared by all API processes.
+
+    Agents repeat nearly identical sub-queries within one run, and users of a shared document ask
+    the same questions, so both the query embedding and the Chroma search are served from Redis
+    on repeated queries.
+
+    - Query embeddings are keyed by the embedding model and the whitespace-normalized query text.
+      They do not depend on any file and expire after ``embedding_ttl`` seconds.
+    - Retrieval results are keyed by a hash of the query embedding, the searched files with their
+      versions, ``top_k`` and the retriever variant, and expire after ``retrieval_ttl`` seconds.
+      Every file has a version counter that is bumped whenever the file's chunks change (indexing,
+      re-indexing, deletion, see ``bump_file_versions``), which makes all cached results over the
+      file unreachable at once.
+
+    Layout in Redis:
+        - ``<namespace>:embedding:<digest>``: packed float32 query vector.
+        - ``<namespace>:retrieval:<digest>``: JSON list of the retrieved nodes with their scores.
+        - ``<namespace>:file-version:<file_id>``: version counter of a file.
+        - ``<namespace>:stats``: hash with hit and miss counters of both caches.
+
+    Cache failures never fail a query: they are logged and the query is answered uncached.
+
+    Args:
+        redis_client (Redis): Redis client created with ``decode_responses=False``.
+        embedding_ttl (int): Seconds a query embedding is kept.
+        retrieval_ttl (int): Seconds a retrieval result is kept.
+        namespace (str): Key prefix for all cache keys.
+    """
+    def __init__(self, redis_client: Redis, embedding_ttl: int = QUERY_EMBEDDING_CACHE_TTL,
+                 retrieval_ttl: int = RETRIEVAL_CACHE_TTL, namespace: str = QUERY_CACHE_NAMESPACE):
+        if embedding_ttl <= 0 or retrieval_ttl <= 0:
+            raise ValueError("embedding_ttl and retrieval_ttl must be positive")
+        self._redis = redis_client
+        self.embedding_ttl = embedding_ttl
+        self.retrieval_ttl = retrieval_ttl
+        self.namespace = namespace
+        self._stats_key = f"{namespace}:stats"
+
+    def _file_version_key(self, file_id: str) -> str:
+        return f"{self.namespace}:file-version:{file_id}"
+
+    def _embedding_key(self, model_name: str, text: str) -> str:
+        payload = f"{model_name}\x00{EmbeddingCache.normalize(text)}".encode("utf-8")
+        return f"{self.namespace}:embedding:{hashlib.sha256(payload).hexdigest()}"
+
+    def _count(self, counter: str):
+        try:
+            self._redis.hincrby(self._stats_key, counter, 1)
+        except Exception as e:
+            logger.debug(f"Could not count query cache {counter}: {e}")
+
+    def get_query_embedding(self, model_name: str, text: str) -> Optional[List[float]]:
+        """Returns the cached embedding of the query ``text``, or None."""
+        try:
+            packed = self._redis.get(self._embedding_key(model_name, text))
+        except Exception as e:
+            logger.error(f"Query embedding cache lookup failed: {e}")
+            return None
+        if packed is None:
+            self._count("embedding_misses")
+            return None
+        self._count("embedding_hits")
+        vector = array("f")
+        vector.frombytes(packed)
+        return vector.tolist()
+
+    def put_query_embedding(self, model_name: str, text: str, embedding: Sequence[float]):
+        try:
+            self._redis.set(self._embedding_key(model_name, text), array("f", embedding).tobytes(),
+                            ex=self.embedding_ttl)
+        except Exception as e:
+            logger.error(f"Query embedding cache write failed: {e}")
+
+    def retrieval_key(self, embedding: Sequence[float], file_ids: Sequence[str], top_k: int,
+                      variant: str = "vector") -> Optional[str]:
+        """
+        Builds the cache key of a retrieval, reading the current versions of ``file_ids``.
+
+        Args:
+            embedding (Sequence[float]): The query embedding.
+            file_ids (Sequence[str]): The searched files, i.e. the metadata filter of the search.
+            top_k (int): Number of retrieved nodes.
+            variant (str): Everything else the result depends on, e.g. the retriever and, for
+                lexical search, the query text.
+
+        Returns:
+            Optional[str]: The key, or None if the file versions could not be read.
+        """
+        file_ids = sorted(file_ids)
+        try:
+            versions = self._redis.mget([self._file_version_key(file_id) for file_id in file_ids])
+        except Exception as e:
+            logger.error(f"Could not read file versions for the retrieval cache: {e}")
+            return None
+        digest = hashlib.sha256(array("f", embedding).tobytes())
+        for file_id, version in zip(file_ids, versions):
+            digest.update(f"\x00{file_id}:{int(version) if version else 0}".encode("utf-8"))
+        digest.update(f"\x00{top_k}\x00{variant}".encode("utf-8"))
+        return f"{self.namespace}:retrieval:{digest.hexdigest()}"
+
+    def get_retrieval(self, key: str) -> Optional[List[NodeWithScore]]:
+        """Returns the cached nodes of the retrieval ``key``, or None."""
+        try:
+            payload = self._redis.get(key)
+        except Exception as e:
+            logger.error(f"Retrieval cache lookup failed: {e}")
+            return None
+        if payload is None:
+            self._count("retrieval_misses")
+            return None
+        self._count("retrieval_hits")
+        return [NodeWithScore(node=json_to_doc(entry["node"]), score=entry["score"])
+                for entry in json.loads(payload)]
+
+    def put_retrieval(self, key: str, nodes: List[NodeWithScore]):
+        payload = json.dumps([{"node": doc_to_json(node.node), "score": node.score} for node in nodes])
+        try:
+            self._redis.set(key, payload, ex=self.retrieval_ttl)
+        except Exception as e:
+            logger.error(f"Retrieval cache write failed: {e}")
+
+    def bump_file_versions(self, file_ids: Sequence[str]):
+        """
+        Invalidates all cached retrieval results over any of ``file_ids``.
+
+        Called whenever chunks of the files were added, changed or deleted. Failures are logged
+        only; cached results then expire with their TTL.
+        """
+        if not file_ids:
+            return
+        try:
+            pipe = self._redis.pipeline(transaction=False)
+            for file_id in file_ids:
+                pipe.incr(self._file_version_key(file_id))
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Could not invalidate cached retrievals of files {list(file_ids)}: {e}")
+
+    def stats(self) -> dict:
+        """Returns hit and miss counters and hit ratios of the query embedding and retrieval caches."""
+        raw = self._redis.hgetall(self._stats_key)
+        counters = {key.decode() if isinstance(key, bytes) else key: int(value) for key, value in raw.items()}
+        stats = {}
+        for cache in ("embedding", "retrieval"):
+            hits, misses = counters.get(f"{cache}_hits", 0), counters.get(f"{cache}_misses", 0)
+            stats[cache] = {
+                "hits": hits,
+                "misses": misses,
+                "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+            }
+        stats["embedding"]["ttl"] = self.embedding_ttl
+        stats["retrieval"]["ttl"] = self.retrieval_ttl
+        return stats
+
+
+_query_cache: Optional[QueryCache] = None
+
+
+def get_query_cache() -> Optional[QueryCache]:
+    """
+    Provides the process-wide query cache.
+
+    Returns:
+        Optional[QueryCache]: The cache, or None if it is disabled via ``QUERY_CACHE_ENABLED``.
+    """
+    global _query_cache
+    if not QUERY_CACHE_ENABLED:
+        return None
+    if _query_cache is None:
+        _query_cache = QueryCache(Redis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=False))
+    return _query_cache
+
+
+def bump_file_versions(file_ids: Sequence[str]):
+    """Invalidates the cached retrieval results over ``file_ids``, if the query cache is enabled."""
+    cache = get_query_cache()
+    if cache is not None:
+        cache.bump_file_versions(file_ids)
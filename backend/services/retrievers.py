@@ -0,0 +1,217 @@
+import asyncio
+import math
+import os
+from typing import Dict, List, Optional, Tuple
+
+from llama_index.core import StorageContext, VectorStoreIndex
+from llama_index.core.base.base_retriever import BaseRetriever
+from llama_index.core.schema import NodeWithScore, QueryBundle
+from llama_index.core.settings import Settings
+from llama_index.core.vector_stores import FilterOperator, MetadataFilter, MetadataFilters
+from llama_index.vector_stores.chroma import ChromaVectorStore
+
+from services.lexical_index import load_lexical_index
+from services.query_cache import get_query_cache
+
+# 'merged' searches all selected files at once, 'per-file' builds one query engine tool per file
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "merged").lower()
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", 8))
+RETRIEVAL_OVERFETCH = int(os.getenv("RETRIEVAL_OVERFETCH", 3))
+RETRIEVAL_MAX_PER_FILE = int(os.getenv("RETRIEVAL_MAX_PER_FILE", 0))
+RETRIEVAL_RRF_K = int(os.getenv("RETRIEVAL_RRF_K", 60))
+
+
+def files_filter(file_ids: List[str]) -> MetadataFilters:
+    """Returns a metadata filter matching the chunks of all ``file_ids`` with a single ``$in`` clause."""
+    return MetadataFilters(filters=[MetadataFilter(key="file_id", operator=FilterOperator.IN, value=list(file_ids))])
+
+
+def apply_file_quota(nodes: List[NodeWithScore], top_k: int, max_per_file: int) -> List[NodeWithScore]:
+    """
+    Selects the ``top_k`` best nodes with at most ``max_per_file`` nodes of any single file.
+
+    Nodes are taken in score order; if the quota leaves slots empty because only few files matched,
+    the best of the skipped nodes fill them, so the result is never smaller than without a quota.
+    """
+    ranked = sorted(nodes, key=lambda node: node.score or 0.0, reverse=True)
+    selected: List[NodeWithScore] = []
+    skipped: List[NodeWithScore] = []
+    per_file: Dict[str, int] = {}
+    for node in ranked:
+        file_id = node.node.metadata.get("file_id")
+        if per_file.get(file_id, 0) < max_per_file:
+            per_file[file_id] = per_file.get(file_id, 0) + 1
+            selected.append(node)
+        else:
+            skipped.append(node)
+        if len(selected) >= top_k:
+            return selected
+    selected.extend(skipped[:top_k - len(selected)])
+    return sorted(selected, key=lambda node: node.score or 0.0, reverse=True)
+
+
+class MultiFileRetriever(BaseRetriever):
+    """
+    Retrieves from several files with one embedding and one Chroma query.
+
+    The chunks of all ``file_ids`` are searched at once through a ``file_id $in`` filter. To keep a
+    single dominant file from crowding out the others, ``top_k * overfetch`` candidates are fetched
+    and at most ``max_per_file`` of them are kept per file.
+
+    Query embeddings and results are served from the query cache (see ``services.query_cache``)
+    when the same query is repeated, e.g. by an agent within one run or by users of a shared file.
+
+    Args:
+        chroma_vector_store (ChromaVectorStore): The vector store holding the files' chunks.
+        file_ids (List[str]): The files to search.
+        top_k (int): Number of nodes returned.
+        overfetch (int): Candidate multiplier for the per-file quota.
+        max_per_file (int, optional): Quota per file. Defaults to an even share of ``top_k``.
+    """
+    def __init__(self, chroma_vector_store: ChromaVectorStore, file_ids: List[str],
+                 top_k: int = RETRIEVAL_TOP_K, overfetch: int = RETRIEVAL_OVERFETCH,
+                 max_per_file: Optional[int] = RETRIEVAL_MAX_PER_FILE or None):
+        super().__init__()
+        if not file_ids:
+            raise ValueError("file_ids must not be empty")
+        self.file_ids = list(file_ids)
+        self.top_k = top_k
+        self.max_per_file = max_per_file or max(1, math.ceil(top_k / len(self.file_ids)))
+        candidates = top_k * overfetch if len(self.file_ids) > 1 else top_k
+        storage_context = StorageContext.from_defaults(vector_store=chroma_vector_store)
+        index = VectorStoreIndex.from_vector_store(vector_store=chroma_vector_store, storage_context=storage_context,
+                                                   embed_model=Settings.embed_model)
+        self._embed_model = Settings.embed_model
+        self._retriever = index.as_retriever(similarity_top_k=candidates, filters=files_filter(self.file_ids))
+
+    def _cache_variant(self, query_bundle: QueryBundle) -> str:
+        """Describes everything besides the embedding, files and ``top_k`` the results depend on."""
+        return f"vector:{self.max_per_file}"
+
+    def _search(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        nodes = self._retriever.retrieve(query_bundle)
+        return apply_file_quota(nodes, self.top_k, self.max_per_file)
+
+    async def _asearch(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        nodes = await self._retriever.aretrieve(query_bundle)
+        return apply_file_quota(nodes, self.top_k, self.max_per_file)
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        cache = get_query_cache()
+        if cache is None:
+            return self._search(query_bundle)
+        if query_bundle.embedding is None:
+            text = "\n".join(query_bundle.embedding_strs)
+            query_bundle.embedding = cache.get_query_embedding(self._embed_model.model_name, text)
+            if query_bundle.embedding is None:
+                query_bundle.embedding = self._embed_model.get_agg_embedding_from_queries(
+                    query_bundle.embedding_strs)
+                cache.put_query_embedding(self._embed_model.model_name, text, query_bundle.embedding)
+
+        key = cache.retrieval_key(query_bundle.embedding, self.file_ids, self.top_k,
+                                  self._cache_variant(query_bundle))
+        nodes = cache.get_retrieval(key) if key else None
+        if nodes is None:
+            nodes = self._search(query_bundle)
+            if key:
+                cache.put_retrieval(key, nodes)
+        return nodes
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        cache = get_query_cache()
+        if cache is None:
+            return await self._asearch(query_bundle)
+        if query_bundle.embedding is None:
+            text = "\n".join(query_bundle.embedding_strs)
+            query_bundle.embedding = await asyncio.to_thread(cache.get_query_embedding,
+                                                             self._embed_model.model_name, text)
+            if query_bundle.embedding is None:
+                query_bundle.embedding = await self._embed_model.aget_agg_embedding_from_queries(
+                    query_bundle.embedding_strs)
+                await asyncio.to_thread(cache.put_query_embedding, self._embed_model.model_name, text,
+                                        query_bundle.embedding)
+
+        key = await asyncio.to_thread(cache.retrieval_key, query_bundle.embedding, self.file_ids, self.top_k,
+                                      self._cache_variant(query_bundle))
+        nodes = await asyncio.to_thread(cache.get_retrieval, key) if key else None
+        if nodes is None:
+            nodes = await self._asearch(query_bundle)
+            if key:
+                await asyncio.to_thread(cache.put_retrieval, key, nodes)
+        return nodes
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = RETRIEVAL_RRF_K) -> List[Tuple[str, float]]:
+    """
+    Fuses several rankings of ids with reciprocal rank fusion.
+
+    Every id scores ``sum(1 / (k + rank))`` over the rankings it occurs in (ranks start at 1), so ids
+    ranked high by either ranking come first without having to calibrate the rankings' scores.
+
+    Returns:
+        List[Tuple[str, float]]: ``(id, fused score)`` pairs, best first.
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, node_id in enumerate(ranking, start=1):
+            scores[node_id] = scores.get(node_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class HybridRetriever(MultiFileRetriever):
+    """
+    Retrieves from several files by fusing dense vector search with lexical BM25 search.
+
+    Dense retrieval misses exact identifiers such as invoice numbers, SKUs and error codes; the BM25
+    indexes written at ingest time (see ``services.lexical_index``) catch them. Both candidate lists
+    are fused with reciprocal rank fusion and the per-file quota of ``MultiFileRetriever`` is applied
+    to the fused ranking. Chunks found only lexically are loaded from Chroma by id.
+
+    Args:
+        chroma_vector_store (ChromaVectorStore): The vector store holding the files' chunks.
+        file_paths (Dict[str, str]): File system path of every file to search, keyed by file id.
+        top_k (int): Number of nodes returned.
+        overfetch (int): Candidate multiplier for both searches.
+        max_per_file (int, optional): Quota per file. Defaults to an even share of ``top_k``.
+        rrf_k (int): Rank offset of the reciprocal rank fusion.
+    """
+    def __init__(self, chroma_vector_store: ChromaVectorStore, file_paths: Dict[str, str],
+                 top_k: int = RETRIEVAL_TOP_K, overfetch: int = RETRIEVAL_OVERFETCH,
+                 max_per_file: Optional[int] = RETRIEVAL_MAX_PER_FILE or None, rrf_k: int = RETRIEVAL_RRF_K):
+        super().__init__(chroma_vector_store=chroma_vector_store, file_ids=list(file_paths), top_k=top_k,
+                         overfetch=overfetch, max_per_file=max_per_file)
+        self.file_paths = dict(file_paths)
+        self.candidates = top_k * max(overfetch, 1)
+        self.rrf_k = rrf_k
+        self._chroma_vector_store = chroma_vector_store
+
+    def _lexical_ranking(self, query_str: str) -> List[str]:
+        results = []
+        for path in self.file_paths.values():
+            results.extend(load_lexical_index(path).search(query_str, self.candidates))
+        results.sort(key=lambda item: item[1], reverse=True)
+        return [node_id for node_id, _ in results[:self.candidates]]
+
+    def _fuse(self, vector_nodes: List[NodeWithScore], lexical_ids: List[str]) -> List[NodeWithScore]:
+        nodes_by_id = {node.node.node_id: node.node for node in vector_nodes}
+        fused = reciprocal_rank_fusion([list(nodes_by_id), lexical_ids], k=self.rrf_k)
+        missing = [node_id for node_id, _ in fused if node_id not in nodes_by_id]
+        if missing:
+            for node in self._chroma_vector_store.get_nodes(node_ids=missing):
+                nodes_by_id[node.node_id] = node
+        results = [NodeWithScore(node=nodes_by_id[node_id], score=score)
+                   for node_id, score in fused if node_id in nodes_by_id]
+        return apply_file_quota(results, self.top_k, self.max_per_file)
+
+    def _cache_variant(self, query_bundle: QueryBundle) -> str:
+        # the lexical ranking depends on the query text, not on its embedding
+        return f"hybrid:{self.max_per_file}:{self.rrf_k}:{query_bundle.query_str}"
+
+    def _search(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        vector_nodes = self._retriever.retrieve(query_bundle)
+        return self._fuse(vector_nodes, self._lexical_ranking(query_bundle.query_str))
+
+    async def _asearch(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        vector_nodes = await self._retriever.aretrieve(query_bundle)
+        lexical_ids = await asyncio.to_thread(self._lexical_ranking, query_bundle.query_str)
+        return await asyncio.to_thread(self._fuse, vector_nodes, lexical_ids)
@@ -0,0 +1,48 @@
+from typing import Iterator, List, Optional, Tuple
+
+from llama_index.core.schema import TextNode
+
+from parsing_tasks import list_sheets, read_sheet_row_groups
+from services.parsing_pool import get_parsing_pool
+from services.progress import IndexingProgress
+
+
+def iter_spreadsheet_nodes(path: str, file_id: str, progress: Optional[IndexingProgress] = None,
+                           sheets: Optional[List[Tuple[str, str]]] = None) -> Iterator[TextNode]:
+    """
+    Yields the row-group chunks of a spreadsheet sheet by sheet.
+
+    Sheets are read in the parsing pool, so only the current sheet's chunks are held in memory and
+    the first sheet is being embedded while later sheets are still parsed.
+
+    Args:
+        path (str): File system path of the CSV file or workbook.
+        file_id (str): The id of the spreadsheet's ``ChatFile``.
+        progress (IndexingProgress, optional): Receives parsed sheet and produced chunk counts.
+        sheets (List[Tuple[str, str]], optional): ``(sheet_name, parquet_path)`` of the Parquet copies
+            of the sheets; when given, they are read instead of the original file.
+
+    Yields:
+        TextNode: One node per row group, tagged with ``file_id``, ``sheet_name`` and its row range.
+            The row range is the position when the chunk was indexed and is kept out of the
+            embedded and LLM text, since unchanged chunks are not re-indexed when rows shift.
+    """
+    pool = get_parsing_pool()
+    if sheets:
+        tasks = ((parquet_path, sheet_name) for sheet_name, parquet_path in sheets)
+    else:
+        tasks = ((path, sheet_name) for sheet_name in pool.run(list_sheets, path))
+    for row_groups in pool.imap(read_sheet_row_groups, tasks, prefetch=2):
+        if progress:
+            progress.parsed_pages(1)
+            progress.produced_chunks(len(row_groups))
+        for group in row_groups:
+            metadata = {
+                "file_id": file_id,
+                "sheet_name": group["sheet_name"],
+                "row_start": group["row_start"],
+                "row_end": group["row_end"],
+            }
+            yield TextNode(text=group["text"], metadata=metadata,
+                           excluded_embed_metadata_keys=list(metadata),
+                           excluded_llm_metadata_keys=list(metadata))
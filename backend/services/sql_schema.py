@@ -0,0 +1,218 @@
+import os
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Tuple
+
+from llama_index.core import SQLDatabase
+from sqlalchemy import MetaData, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from dependencies import logger
+from models import ChatFile
+from utils import get_sql_engine_registry, get_sql_result_cache, is_single_statement, SQL_STATEMENT_TIMEOUT_MS
+
+SQL_SCHEMA_SAMPLE_ROWS = int(os.getenv("SQL_SCHEMA_SAMPLE_ROWS", 3))
+SQL_SCHEMA_MAX_VALUE_LENGTH = 100
+SQL_SCHEMA_CACHE_SIZE = int(os.getenv("SQL_SCHEMA_CACHE_SIZE", 64))
+SQL_TOOL_MAX_ROWS = int(os.getenv("SQL_TOOL_MAX_ROWS", 200))
+SQL_TOOL_MAX_BYTES = int(os.getenv("SQL_TOOL_MAX_KB", 64)) * 1024
+SQL_TOOL_FETCH_SIZE = int(os.getenv("SQL_TOOL_FETCH_SIZE", 100))
+
+
+def _truncate(value, length: int = SQL_SCHEMA_MAX_VALUE_LENGTH) -> str:
+    value = str(value)
+    return value if len(value) <= length else value[:length - 3] + "..."
+
+
+def compute_schema_context(engine: Engine, tables: Iterable[str],
+                           sample_rows: int = SQL_SCHEMA_SAMPLE_ROWS) -> Dict[str, str]:
+    """
+    Describes the tables of a database for the SQL tools.
+
+    The description follows the format of ``SQLDatabase.get_single_table_info`` (columns with their
+    types and comments, table comment, foreign keys) and appends a few sample rows, which help the
+    LLM with value formats. It is computed once when a dump is loaded, since dumps are immutable
+    afterwards.
+
+    Args:
+        engine (Engine): The engine of the database.
+        tables (Iterable[str]): The tables to describe.
+        sample_rows (int): Number of sample rows per table, ``0`` disables them.
+
+    Returns:
+        Dict[str, str]: The description per table name.
+    """
+    inspector = inspect(engine)
+    preparer = engine.dialect.identifier_preparer
+    schema_context = {}
+    with engine.connect() as connection:
+        for table in tables:
+            columns = []
+            for column in inspector.get_columns(table):
+                if column.get("comment"):
+                    columns.append(f"{column['name']} ({column['type']!s}): '{column.get('comment')}'")
+                else:
+                    columns.append(f"{column['name']} ({column['type']!s})")
+            info = f"Table '{table}' has columns: {', '.join(columns)}, "
+
+            try:
+                comment = inspector.get_table_comment(table)["text"]
+                if comment:
+                    info += f"with comment: ({comment}) "
+            except NotImplementedError:
+                pass
+
+            foreign_keys = [f"{fk['constrained_columns']} -> {fk['referred_table']}.{fk['referred_columns']}"
+                            for fk in inspector.get_foreign_keys(table)]
+            if foreign_keys:
+                info += f" and foreign keys: {', '.join(foreign_keys)}"
+            info += "."
+
+            if sample_rows > 0:
+                result = connection.execute(text(f"SELECT * FROM {preparer.quote(table)} LIMIT {int(sample_rows)}"))
+                rows = [", ".join(_truncate(value) for value in row) for row in result]
+                if rows:
+                    info += f"\nSample rows ({', '.join(result.keys())}):\n" + "\n".join(rows)
+            schema_context[table] = info
+    return schema_context
+
+
+@lru_cache(maxsize=SQL_SCHEMA_CACHE_SIZE)
+def _live_schema_context(database_name: str, tables: tuple) -> Dict[str, str]:
+    # for dumps loaded before the schema was stored with the file
+    logger.info(f"Computing schema context of database '{database_name}'")
+    return compute_schema_context(get_sql_engine_registry().get_engine(database_name), tables)
+
+
+def get_schema_context(file: ChatFile) -> Dict[str, str]:
+    """
+    Returns the table descriptions of an uploaded SQL database.
+
+    Uses the descriptions stored with the ``ChatFile``; older uploads without them are described
+    live once per process and cached.
+    """
+    if file.table_schemas:
+        return file.table_schemas
+    return _live_schema_context(file.database_name, tuple(file.tables or []))
+
+
+class CachedSQLDatabase(SQLDatabase):
+    """
+    ``SQLDatabase`` serving precomputed table descriptions instead of reflecting the schema.
+
+    The base class lists and reflects all tables on construction and inspects columns and
+    foreign keys on every ``get_single_table_info`` call. Since uploaded dumps do not change,
+    this subclass is built from the descriptions computed at upload time and only touches the
+    database to run queries. The engine is looked up in the SQL engine registry on every use, so
+    long-lived instances (e.g. in the tool cache) never keep an engine the registry has disposed.
+    Results of read statements are served from the SQL result cache.
+
+    Generated statements are executed bounded: a single statement only, in a read-only transaction
+    with a statement timeout, fetched through a server-side cursor until ``max_rows`` rows or
+    ``max_bytes`` of result text are reached. The rest of the result is never transferred; the
+    response then says that it was truncated.
+
+    Args:
+        database_name (str): The name of the uploaded database.
+        schema_context (Dict[str, str]): The description per table, see ``compute_schema_context``.
+        max_string_length (int): Maximum length of a single value in query results.
+        max_rows (int): Maximum number of result rows fetched.
+        max_bytes (int): Maximum size of the result text.
+    """
+    def __init__(self, database_name: str, schema_context: Dict[str, str], max_string_length: int = 300,
+                 max_rows: int = SQL_TOOL_MAX_ROWS, max_bytes: int = SQL_TOOL_MAX_BYTES):
+        self.database_name = database_name
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self._schema = None
+        self._all_tables = set(schema_context)
+        self._include_tables = set(schema_context)
+        self._ignore_tables = set()
+        self._usable_tables = set(schema_context)
+        self._sample_rows_in_table_info = 0
+        self._indexes_in_table_info = False
+        self._custom_table_info = dict(schema_context)
+        self._max_string_length = max_string_length
+        self._metadata = MetaData()
+
+    @classmethod
+    def from_file(cls, file: ChatFile) -> "CachedSQLDatabase":
+        return cls(database_name=file.database_name, schema_context=get_schema_context(file))
+
+    @property
+    def _engine(self) -> Engine:
+        return get_sql_engine_registry().get_engine(self.database_name)
+
+    @property
+    def _inspector(self):
+        return inspect(self._engine)
+
+    def run_sql(self, command: str) -> Tuple[str, Dict[str, Any]]:
+        cache = get_sql_result_cache()
+        cached = cache.get(self.database_name, command)
+        if cached is not None:
+            return cached
+        result = self._run_bounded_sql(command)
+        cache.put(self.database_name, command, result)
+        return result
+
+    def _run_bounded_sql(self, command: str) -> Tuple[str, Dict[str, Any]]:
+        if not is_single_statement(command):
+            raise NotImplementedError(f"Statement {command!r} is invalid SQL.\nError: only a single statement "
+                                      f"can be executed")
+        engine = self._engine
+        with engine.connect() as connection:
+            connection = connection.execution_options(stream_results=True, max_row_buffer=SQL_TOOL_FETCH_SIZE)
+            with connection.begin():
+                if engine.dialect.name == "postgresql":
+                    # the engines are read-only with a timeout already; repeated per transaction as a guard
+                    connection.execute(text("SET TRANSACTION READ ONLY"))
+                    connection.execute(text(f"SET LOCAL statement_timeout = {int(SQL_STATEMENT_TIMEOUT_MS)}"))
+                try:
+                    cursor = connection.execute(text(command))
+                except (ProgrammingError, OperationalError) as exc:
+                    raise NotImplementedError(
+                        f"Statement {command!r} is invalid SQL.\nError: {exc.orig}"
+                    ) from exc
+                if not cursor.returns_rows:
+                    return "", {}
+                col_keys = list(cursor.keys())
+
+                rows, size, truncated = [], 0, False
+                try:
+                    while not truncated:
+                        batch = cursor.fetchmany(SQL_TOOL_FETCH_SIZE)
+                        if not batch:
+                            break
+                        for row in batch:
+                            truncated_row = tuple(self.truncate_word(column, length=self._max_string_length)
+                                                  for column in row)
+                            row_size = len(str(truncated_row)) + 2
+                            if len(rows) >= self.max_rows or size + row_size > self.max_bytes:
+                                truncated = True
+                                break
+                            rows.append(truncated_row)
+                            size += row_size
+                except OperationalError as exc:
+                    raise NotImplementedError(
+                        f"Statement {command!r} could not be completed.\nError: {exc.orig}"
+                    ) from exc
+                finally:
+                    cursor.close()
+
+        response = str(rows)
+        if truncated:
+            response += (f"\n\nThe result was truncated after {len(rows)} rows; more rows exist. "
+                         f"Use aggregation, filters or LIMIT to narrow the query down.")
+            logger.info(f"Truncated result of query on '{self.database_name}' after {len(rows)} rows")
+        return response, {
+            "result": rows,
+            "col_keys": col_keys,
+            "truncated": truncated,
+        }
+
+    def get_single_table_info(self, table_name: str) -> str:
+        info = self._custom_table_info.get(table_name)
+        if info is None:
+            return super().get_single_table_info(table_name)
+        return info
@@ -0,0 +1,129 @@
+import asyncio
+import json
+import os
+import time
+from typing import AsyncGenerator, AsyncIterator, List
+
+SSE_FLUSH_INTERVAL_MS = float(os.getenv("SSE_FLUSH_INTERVAL_MS", 50))
+SSE_MAX_FRAME_BYTES = int(os.getenv("SSE_MAX_FRAME_BYTES", 4096))
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", 15))
+SSE_MAX_PENDING_DELTAS = int(os.getenv("SSE_MAX_PENDING_DELTAS", 1024))
+
+# marks the end of the producer's deltas in the queue
+_END = object()
+
+
+def sse_event(payload: dict) -> str:
+    """Formats ``payload`` as a Server-Sent Event data frame."""
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+class CoalescingSSEWriter:
+    """
+    Turns a stream of text deltas into Server-Sent Events, coalescing deltas into frames.
+
+    The deltas are read by a producer task into a bounded queue while the writer emits frames of
+    the form ``data: {"value": "<text>"}``. A frame is flushed ``flush_interval`` seconds after its
+    first delta arrived or as soon as it holds ``max_frame_bytes`` of text, whichever comes first,
+    so a token-by-token model stream costs a few frames per second instead of one JSON-encoded
+    frame per token, and no delta waits longer than ``flush_interval``. With ``flush_interval=0``
+    every frame holds whatever arrived while the previous frame was being sent.
+
+    Backpressure: the response awaits the client for every frame, so while a client reads slowly
+    deltas pile up in the queue and go out together with the next frame. Once ``max_pending``
+    deltas are queued the producer blocks, which pauses the consumption of the model's stream.
+
+    While no delta arrives, e.g. during tool calls of an agent, a comment frame is sent every
+    ``heartbeat_seconds`` to keep proxies from closing the connection.
+
+    Args:
+        flush_interval (float): Seconds a frame collects deltas after its first one.
+        max_frame_bytes (int): Text size in bytes after which a frame is flushed immediately.
+        heartbeat_seconds (float): Seconds without a delta after which a heartbeat is sent.
+        max_pending (int): Maximum number of deltas queued before the producer blocks.
+    """
+    def __init__(self, flush_interval: float = SSE_FLUSH_INTERVAL_MS / 1000,
+                 max_frame_bytes: int = SSE_MAX_FRAME_BYTES,
+                 heartbeat_seconds: float = SSE_HEARTBEAT_SECONDS,
+                 max_pending: int = SSE_MAX_PENDING_DELTAS):
+        if flush_interval < 0 or max_frame_bytes <= 0 or heartbeat_seconds <= 0 or max_pending <= 0:
+            raise ValueError("Expected flush_interval >= 0 and positive max_frame_bytes, heartbeat_seconds "
+                             "and max_pending")
+        self.flush_interval = flush_interval
+        self.max_frame_bytes = max_frame_bytes
+        self.heartbeat_seconds = heartbeat_seconds
+        self.max_pending = max_pending
+        self.frames = 0
+        self.deltas = 0
+
+    async def stream(self, deltas: AsyncIterator[str]) -> AsyncGenerator[str, None]:
+        """
+        Yields the SSE frames of ``deltas``.
+
+        Args:
+            deltas (AsyncIterator[str]): The text deltas, e.g. the tokens of a model's answer.
+
+        Yields:
+            str: ``value`` frames with the coalesced text and heartbeat comments.
+
+        Raises:
+            Exception: Whatever ``deltas`` raised, after all deltas before the failure were sent.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.max_pending)
+
+        async def produce():
+            try:
+                async for delta in deltas:
+                    if delta:
+                        await queue.put(delta)
+                await queue.put(_END)
+            except Exception as e:
+                await queue.put(e)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout=self.heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+
+                frame: List[str] = []
+                size = 0
+                deadline = time.monotonic() + self.flush_interval
+                while isinstance(item, str):
+                    frame.append(item)
+                    size += len(item.encode("utf-8"))
+                    if size >= self.max_frame_bytes:
+                        item = None
+                        break
+                    try:
+                        item = queue.get_nowait()
+                        continue
+                    except asyncio.QueueEmpty:
+                        pass
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        item = None
+                        break
+                    try:
+                        item = await asyncio.wait_for(queue.get(), timeout=remaining)
+                    except asyncio.TimeoutError:
+                        item = None
+
+                if frame:
+                    self.frames += 1
+                    self.deltas += len(frame)
+                    yield sse_event({"value": "".join(frame)})
+                if item is _END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+        finally:
+            if not producer.done():
+                producer.cancel()
+                try:
+                    await producer
+                except (asyncio.CancelledError, Exception):
+                    pass
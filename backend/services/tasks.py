@@ -1,20 +1,26 @@
 from dependencies import engine
 from sqlmodel import Session
-from models import Chat, ChatFile
+from models import Chat, ChatFile, IndexingJob
 
 from utils import (
     load_dump_to_database, 
     list_all_tables_from_db, 
     pg_user, pg_port, pg_host, 
-    pg_password
+    pg_password,
+    get_sql_engine_registry
 )
-from services import index_sql_dump
+from services.indexer import index_sql_dump, index_uploaded_file, index_spreadsheet
+from services.job_queue import JOB_KIND_DOCUMENT, JOB_KIND_SPREADSHEET, JOB_KIND_SQL_DUMP
+from services.progress import IndexingProgress
+from services.sql_schema import compute_schema_context
+from typing import Optional
 from chromadb import Collection
 from dependencies import logger, SessionDep
 
 def process_dump_to_persist(db_client: SessionDep, chat_id: str, chat_file_id: str,
                             sql_dump_path: str, database_type: str, db_name: str, 
-                            chroma_collection: Collection):
+                            chroma_collection: Collection, progress: Optional[IndexingProgress] = None,
+                            retry: bool = False):
     """
     Processes a SQL dump file, loads it into a database, indexes its contents, and updates the database records.
 
@@ -26,17 +32,23 @@ def process_dump_to_persist(db_client: SessionDep, chat_id: str, chat_file_id: s
         database_type (str): The type of the database (e.g., PostgreSQL, MySQL).
         db_name (str): The name of the database where the dump will be loaded.
         chroma_collection (Collection): The Chroma collection used for indexing the SQL dump.
+        progress (IndexingProgress, optional): Publishes the ingestion progress of the dump.
+        retry (bool): Whether an earlier attempt may have loaded the dump already; its database
+            is dropped and the dump loaded again.
 
     Returns:
         None
 
     Raises:
-        None
+        Exception: Any error while loading or indexing the dump, after rolling back the session,
+            so the indexing job can be retried.
 
     Notes:
         - Ensures the chat and chat file exist in the database before proceeding.
         - Loads the SQL dump into the specified database.
         - Extracts and updates the list of tables from the database.
+        - Computes the table descriptions (columns, foreign keys, sample rows) once and stores
+          them with the chat file, so SQL chats do not reflect the schema on every turn.
         - Indexes the SQL dump contents using the provided Chroma collection.
         - Commits the changes to the database session.
     """
@@ -53,7 +65,7 @@ def process_dump_to_persist(db_client: SessionDep, chat_id: str, chat_file_id: s
                 return
 
             # 1. Load the dump (creates the target DB & populates it)
-            load_dump_to_database(sql_dump_path, db_name)
+            load_dump_to_database(sql_dump_path, db_name, replace=retry)
 
             # 2. Discover tables & persist immediately (so we don't lose them if indexing fails)
             tables = list_all_tables_from_db(
@@ -65,6 +77,13 @@ def process_dump_to_persist(db_client: SessionDep, chat_id: str, chat_file_id: s
                 db=db_name,
             )
             db_file.tables = tables
+            if tables:
+                try:
+                    db_file.table_schemas = compute_schema_context(get_sql_engine_registry().get_engine(db_name),
+                                                                   tables)
+                except Exception as e:
+                    # the SQL tools fall back to describing the schema live
+                    logger.error(f"Could not compute the schema context of DB '{db_name}': {e}", exc_info=True)
             db_session.add(db_file)  # no-op if already in session, safe call
             db_session.commit()
             db_session.refresh(db_file)
@@ -75,7 +94,8 @@ def process_dump_to_persist(db_client: SessionDep, chat_id: str, chat_file_id: s
                 return
 
             # 3. Index the SQL dump (vectorize table schemas)
-            index_sql_dump(file=db_file, chroma_collection=chroma_collection)
+            index_sql_dump(file=db_file, chroma_collection=chroma_collection, db_client=db_session,
+                           progress=progress)
 
             # 4. Mark as indexed & commit
             db_file.indexed = True
@@ -85,4 +105,44 @@ def process_dump_to_persist(db_client: SessionDep, chat_id: str, chat_file_id: s
         except Exception as e:
             db_session.rollback()
             logger.error(f"Failed processing SQL dump for Chat: {chat_id}, File: {chat_file_id}. Error: {e}", exc_info=True)
-            return
\ No newline at end of file
+            raise
+
+
+def run_indexing_job(job: IndexingJob, db_client: SessionDep, chroma_collection: Collection):
+    """
+    Executes a claimed indexing job by dispatching on its kind.
+
+    Args:
+        job (IndexingJob): The job claimed from the queue.
+        db_client (Session): The worker's database session.
+        chroma_collection (Collection): The Chroma collection to index into.
+
+    Raises:
+        ValueError: If the job's file no longer exists or its kind is unknown.
+        Exception: Any indexing error, so the queue can schedule a retry.
+    """
+    chat_file = db_client.get(ChatFile, job.chat_file_id)
+    if chat_file is None:
+        raise ValueError(f"ChatFile '{job.chat_file_id}' of job {job.id} not found")
+
+    logger.info(f"Running {job.kind} indexing job {job.id} for file {chat_file.id} (attempt {job.attempts})")
+    progress = IndexingProgress(chat_id=job.chat_id, file_id=chat_file.id)
+    try:
+        if job.kind == JOB_KIND_DOCUMENT:
+            index_uploaded_file(path=job.payload.get('path', chat_file.path_name), chat_file=chat_file,
+                                chroma_collection=chroma_collection, db_client=db_client, progress=progress)
+        elif job.kind == JOB_KIND_SPREADSHEET:
+            index_spreadsheet(chroma_collection=chroma_collection, file=chat_file, db_client=db_client,
+                              progress=progress)
+        elif job.kind == JOB_KIND_SQL_DUMP:
+            process_dump_to_persist(db_client=db_client, chat_id=job.chat_id, chat_file_id=chat_file.id,
+                                    sql_dump_path=job.payload['sql_dump_path'],
+                                    database_type=job.payload['database_type'],
+                                    db_name=job.payload['db_name'], chroma_collection=chroma_collection,
+                                    progress=progress, retry=job.attempts > 1)
+        else:
+            raise ValueError(f"Unknown indexing job kind '{job.kind}'")
+    except Exception as e:
+        progress.finish(error=e)
+        raise
+    progress.finish()
@@ -0,0 +1,118 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from redis import Redis
+
+from dependencies import logger
+from models import FileParams
+
+TOOL_CACHE_MAX_ENTRIES = int(os.getenv("TOOL_CACHE_MAX_ENTRIES", 64))
+
+
+def chat_tools_version_key(chat_id: str) -> str:
+    return f"tools:version:{chat_id}"
+
+
+def get_chat_tools_version(redis_client: Redis, chat_id: str) -> int:
+    """Returns the current tool version of a chat; it changes whenever the chat's tools may have changed."""
+    version = redis_client.get(chat_tools_version_key(chat_id))
+    return int(version) if version else 0
+
+
+def invalidate_chat_tools(redis_client: Redis, chat_id: str):
+    """
+    Invalidates the cached tools of a chat in every API process.
+
+    Called after uploads, replacements, deletions, chat edits and finished indexing jobs.
+    Failures are logged only, the tools are then rebuilt once the version changes again.
+    """
+    try:
+        redis_client.incr(chat_tools_version_key(chat_id))
+    except Exception as e:
+        logger.error(f"Could not invalidate tools of chat {chat_id}: {e}")
+
+
+def tool_cache_key(chat_id: str, version: int, files: Dict[str, FileParams], **options: Hashable) -> Tuple:
+    """
+    Builds the cache key of a chat's tools.
+
+    Args:
+        chat_id (str): The chat.
+        version (int): The chat's tool version, see ``get_chat_tools_version``.
+        files (Dict[str, FileParams]): The per-file query parameters of the request.
+        **options: Everything else the tools depend on, e.g. model, temperature and provider.
+    """
+    file_params = tuple(sorted((file_id, params.queried, params.query_type) for file_id, params in files.items()))
+    return chat_id, version, file_params, tuple(sorted(options.items()))
+
+
+class ToolCache:
+    """
+    In-process LRU cache of the LLM and the file tools (query engines, SQL and DuckDB engines) of chats.
+
+    Pandas tools are not cached: each holds its DataFrame, which would keep frames alive that the
+    size-bounded DataFrame cache (see ``services.columnar_store``) already evicted.
+
+    Entries are keyed by ``tool_cache_key``. Since the key contains the chat's tool version, an
+    invalidation makes all entries of the chat unreachable at once; they are dropped as soon as the
+    chat's tools are cached again or evicted by the LRU bound.
+
+    Args:
+        max_entries (int): Maximum number of cached tool sets.
+    """
+    def __init__(self, max_entries: int = TOOL_CACHE_MAX_ENTRIES):
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Tuple, value: Any):
+        chat_id, version = key[0], key[1]
+        with self._lock:
+            outdated = [k for k in self._entries if k[0] == chat_id and k[1] != version]
+            for k in outdated:
+                del self._entries[k]
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+
+_tool_cache: Optional[ToolCache] = None
+
+
+def get_tool_cache() -> ToolCache:
+    """Provides the process-wide tool cache."""
+    global _tool_cache
+    if _tool_cache is None:
+        _tool_cache = ToolCache()
+    return _tool_cache
@@ -1,13 +1,13 @@
 import uuid
-from typing import Dict, List
+from typing import Dict, List, Optional
 
-import pandas as pd
 from llama_index.core.indices.struct_store import SQLTableRetrieverQueryEngine
 from llama_index.core.objects import SQLTableNodeMapping, SQLTableSchema, ObjectIndex
 from llama_index.vector_stores.chroma import ChromaVectorStore
 from llama_index.core.settings import Settings
+from llama_index.core.constants import DEFAULT_SIMILARITY_TOP_K
 from llama_index.experimental.query_engine import PandasQueryEngine
-from llama_index.core.query_engine import BaseQueryEngine
+from llama_index.core.query_engine import BaseQueryEngine, RetrieverQueryEngine
 from llama_index.core.vector_stores import (
     MetadataFilter,
     MetadataFilters,
@@ -16,75 +16,16 @@ from llama_index.core.vector_stores import (
 from models import ChatFile, Chat, FileParams
 from llama_index.core import (
     StorageContext, 
-    VectorStoreIndex, 
-    SQLDatabase
+    VectorStoreIndex
 )
 from llama_index.core.tools import FunctionTool, QueryEngineTool, ToolMetadata
 from llama_index.tools.duckduckgo import DuckDuckGoSearchToolSpec
 from llama_index.readers.web import BeautifulSoupWebReader
-from sqlalchemy import create_engine
-from utils import initialize_pg_url
+from services.sql_schema import CachedSQLDatabase
 from llama_index.llms.ollama import Ollama
-
-def create_filters_for_files(files: List[ChatFile]):
-    """
-    Creates metadata filters for a list of files, excluding SQL files.
-
-    Args:
-        files (List[ChatFile]): List of ChatFile objects to create filters for.
-
-    Returns:
-        List[MetadataFilters]: List of metadata filter objects, one for each non-SQL file.
-        Returns empty list if input files list is empty.
-
-    Example:
-        >>> files = [ChatFile(id="1", mime_type="text/plain")]
-        >>> filters = create_filters_for_files(files)
-        >>> print(filters)
-        [MetadataFilters(filters=[MetadataFilter(operator=EQ, key="file_id", value="1")])]
-    """
-    if len(files) == 0:
-        return []
-    filters = [
-        MetadataFilters(
-            filters=[
-                MetadataFilter(
-                    operator=FilterOperator.EQ,
-                    key="file_id",
-                    value=file.id,
-                )
-            ]
-        )
-        for file in files
-        if all(ext not in file.mime_type.lower() for ext in ["sql", "xlsx", "csv"])
-    ]
-    return filters
-
-def create_query_engines_from_filters(filters: List[MetadataFilters],
-                                      chroma_vector_store: ChromaVectorStore, llm: Ollama) -> List[BaseQueryEngine]:
-    """
-    Creates a list of query engines from metadata filters using a Chroma vector store.
-
-    Args:
-        filters (List[MetadataFilter]): A list of metadata filters to create query engines from.
-        chroma_vector_store (ChromaVectorStore): The Chroma vector store to use for creating the index.
-        llm (Ollama): The Ollama to use for creating the index.
-
-    Returns:
-        List[BaseQueryEngine]: A list of query engines, each initialized with a corresponding metadata filter.
-
-    Example:
-        >>> filters = [MetadataFilter(key="category", value="tech"), MetadataFilter(key="date", value="2023")]
-        >>> query_engines = create_query_engines_from_filters(filters, chroma_store)
-    """
-    storage_context = StorageContext.from_defaults(vector_store=chroma_vector_store)
-    vector_index = VectorStoreIndex.from_vector_store(vector_store=chroma_vector_store, storage_context=storage_context,
-                                                      embed_model=Settings.embed_model)
-    query_engines = [
-        vector_index.as_query_engine(filter=meta_filters, llm=llm if llm is not None else Settings.llm)
-        for meta_filters in filters
-    ]
-    return query_engines
+from services.retrievers import MultiFileRetriever, HybridRetriever
+from services.columnar_store import load_spreadsheet_frame
+from services.duckdb_engine import DuckDBQueryEngine
 
 def create_query_engine_tools(files: List[ChatFile], chroma_vector_store: ChromaVectorStore, llm: Ollama, params: Dict[str, FileParams] = None) -> List[QueryEngineTool]:
     """
@@ -100,7 +41,8 @@ def create_query_engine_tools(files: List[ChatFile], chroma_vector_store: Chroma
         params (Dict[str, any], optional): A dictionary containing parameters for 
             configuring the query engines. Expected keys include:
                 - 'query_type' (str): The type of query engine to create. 
-                  Possible values are 'basic' for a standard RAG tool or 
+                  Possible values are 'basic' for a standard RAG tool, 
+                  'hybrid' for a RAG tool fusing vector and BM25 search or 
                   'text-extraction' for a tool focused on extracting fields 
                   from documents. Defaults to None.
 
@@ -110,39 +52,61 @@ def create_query_engine_tools(files: List[ChatFile], chroma_vector_store: Chroma
 
     The function performs the following steps:
         1. Filters out files with MIME types containing specific keywords 
-           (e.g., "sql", "xlsx", "csv").
-        2. Creates filters for the remaining files.
-        3. Generates query engines based on the filters and the provided 
-           `chroma_vector_store`.
-        4. Constructs `QueryEngineTool` objects for each query engine, with 
+           (e.g., "sql"). Spreadsheets are included, they are indexed as row-group chunks.
+        2. Creates one query engine per remaining file on the provided `chroma_vector_store`,
+           retrieving through the query cache (see ``MultiFileRetriever``).
+        3. Constructs `QueryEngineTool` objects for each query engine, with 
            metadata describing the tool's purpose. Special descriptions are 
-           provided for markdown files.
+           provided for markdown files and spreadsheets.
     """
-    excluded_mime_keywords = ["sql", "xlsx", "csv"]
+    excluded_mime_keywords = ["sql"]
     # Filter out unwanted files
     filtered_files = [
         file for file in files
         if all(ext not in file.mime_type.lower() for ext in excluded_mime_keywords)
     ]
 
-    # Create filters and query engines
-    filters = create_filters_for_files(files=filtered_files)
-    query_engines = create_query_engines_from_filters(filters=filters, chroma_vector_store=chroma_vector_store, llm=llm)
+    # Create query engines
+    if params.query_type == 'hybrid':
+        query_engines = [
+            RetrieverQueryEngine.from_args(
+                retriever=HybridRetriever(chroma_vector_store=chroma_vector_store,
+                                          file_paths={file.id: file.path_name}),
+                llm=llm if llm is not None else Settings.llm)
+            for file in filtered_files
+        ]
+    else:
+        query_engines = [
+            RetrieverQueryEngine.from_args(
+                retriever=MultiFileRetriever(chroma_vector_store=chroma_vector_store, file_ids=[file.id],
+                                             top_k=DEFAULT_SIMILARITY_TOP_K),
+                llm=llm if llm is not None else Settings.llm)
+            for file in filtered_files
+        ]
 
     query_engine_tools = []
     for i, query_engine in enumerate(query_engines):
         file = filtered_files[i]
         is_markdown = file.mime_type.lower() == "text/markdown"
+        is_spreadsheet = any(ext in file.mime_type.lower() for ext in ["spreadsheet", "csv"])
 
-        description = (
-            f"Query engine for deeply analyzing the markdown document '{file.file_name}'. "
-            f"This document is structured for natural language understanding—please read and reason over the full text."
-            if is_markdown else
-            f"Query engine for analyzing and retrieving information from the document '{file.file_name}'. "
-            f"Use this tool to perform searches and extract insights from the content of the file."
-        )
+        if is_markdown:
+            description = (
+                f"Query engine for deeply analyzing the markdown document '{file.file_name}'. "
+                f"This document is structured for natural language understanding—please read and reason over the full text."
+            )
+        elif is_spreadsheet:
+            description = (
+                f"Query engine for searching rows of the spreadsheet '{file.file_name}'. "
+                f"Results are groups of rows with their sheet name and column headers."
+            )
+        else:
+            description = (
+                f"Query engine for analyzing and retrieving information from the document '{file.file_name}'. "
+                f"Use this tool to perform searches and extract insights from the content of the file."
+            )
 
-        if params.query_type == 'basic':
+        if params.query_type in ('basic', 'hybrid'):
             query_engine_tools.append(
                 QueryEngineTool(
                     query_engine=query_engine,
@@ -163,12 +127,57 @@ def create_query_engine_tools(files: List[ChatFile], chroma_vector_store: Chroma
 
     return query_engine_tools
 
+def create_merged_query_engine_tool(files: List[ChatFile], chroma_vector_store: ChromaVectorStore,
+                                    llm: Ollama, hybrid: bool = False) -> Optional[QueryEngineTool]:
+    """
+    Creates one query engine tool that searches all given files at once.
+
+    Instead of one tool per file, which makes the agent call every file's tool in turn (one embedding,
+    one Chroma query and one LLM completion each), the chunks of all files are retrieved with a single
+    ``file_id $in`` search with a per-file quota (see ``MultiFileRetriever``), and the answer is
+    synthesized once over the merged context.
+
+    Args:
+        files (List[ChatFile]): The files selected for a classic ('basic') or hybrid query. SQL dumps
+            are skipped.
+        chroma_vector_store (ChromaVectorStore): The vector store holding the files' chunks.
+        llm (Ollama): The LLM used for synthesizing the answer.
+        hybrid (bool): Fuse the vector search with BM25 search over the files (see ``HybridRetriever``).
+
+    Returns:
+        Optional[QueryEngineTool]: The tool, or None if no file is left to search.
+    """
+    files = [file for file in files if "sql" not in file.mime_type.lower()]
+    if len(files) == 0:
+        return None
+
+    if hybrid:
+        retriever = HybridRetriever(chroma_vector_store=chroma_vector_store,
+                                    file_paths={file.id: file.path_name for file in files})
+    else:
+        retriever = MultiFileRetriever(chroma_vector_store=chroma_vector_store, file_ids=[file.id for file in files])
+    query_engine = RetrieverQueryEngine.from_args(retriever=retriever, llm=llm if llm is not None else Settings.llm)
+    file_names = ", ".join(f"'{file.file_name}'" for file in files)
+    description = (f"Query engine for analyzing and retrieving information from the documents {file_names}. "
+                   f"It searches all of these documents at once, so call it once per question instead of per document.")
+    if hybrid:
+        description += " It also matches exact terms such as identifiers, numbers and codes."
+    return QueryEngineTool(
+        query_engine=query_engine,
+        metadata=ToolMetadata(
+            name="HybridDocumentSearchTool" if hybrid else "DocumentSearchTool",
+            description=description,
+        )
+    )
+
 def create_pandas_engines_tools_from_files(files: List[ChatFile]):
     """
     Creates a list of Pandas-based function tools from a list of chat files.
 
     This function processes CSV and Excel files to create PandasQueryEngine instances,
-    which are then wrapped into QueryEngineTool for data analysis capabilities.
+    which are then wrapped into QueryEngineTool for data analysis capabilities. The DataFrames
+    are loaded from the Parquet copies written at indexing time and shared through the
+    process-wide DataFrame cache, so the CSV or Excel file is not parsed on every message.
 
     Args:
         files (List[ChatFile]): A list of ChatFile objects containing file information including
@@ -195,7 +204,7 @@ def create_pandas_engines_tools_from_files(files: List[ChatFile]):
     for file in files:
         if "csv" in file.mime_type.lower():
             pd_query = PandasQueryEngine(
-                df=pd.read_csv(file.path_name),
+                df=load_spreadsheet_frame(file.path_name),
                 verbose=True,
             )
             tool = QueryEngineTool.from_defaults(
@@ -210,7 +219,7 @@ def create_pandas_engines_tools_from_files(files: List[ChatFile]):
             "vnd.ms-excel" in file.mime_type.lower() or 
             "vnd.openxmlformats-officedocument.spreadsheetml.sheet" in file.mime_type.lower()):
             pd_query = PandasQueryEngine(
-                df=pd.read_excel(file.path_name),
+                df=load_spreadsheet_frame(file.path_name),
                 verbose=True,
             )
             tool = QueryEngineTool.from_defaults(
@@ -222,6 +231,43 @@ def create_pandas_engines_tools_from_files(files: List[ChatFile]):
 
     return pd_tools
 
+def create_duckdb_engines_tools_from_files(files: List[ChatFile], llm) -> List[QueryEngineTool]:
+    """
+    Creates a list of DuckDB-based query engine tools from a list of chat files.
+
+    In contrast to the Pandas tools, the spreadsheets are not loaded into DataFrames: every sheet is
+    registered as a DuckDB view over its Parquet copy (or the CSV file itself) and the LLM-generated
+    SQL is executed out of core with projection and predicate pushdown, so large uploads can be
+    analyzed within a bounded amount of memory.
+
+    Args:
+        files (List[ChatFile]): A list of ChatFile objects. Only CSV and Excel files will be processed.
+        llm: The language model that writes the SQL statements.
+
+    Returns:
+        List[QueryEngineTool]: A list of QueryEngineTool objects, one per spreadsheet, each containing:
+            - A DuckDB query engine
+            - A name based on the original filename
+            - A description listing the file's tables
+    """
+    duckdb_tools = []
+    for file in files:
+        mime_type = file.mime_type.lower()
+        if not any(kind in mime_type for kind in ["csv", "excel", "sheet"]):
+            continue
+        query_engine = DuckDBQueryEngine(path=file.path_name, file_name=file.file_name, llm=llm)
+        tables_desc = ', '.join(query_engine.tables)
+        tool = QueryEngineTool.from_defaults(
+            query_engine=query_engine,
+            name=f"DuckDBTool-{file.file_name}",
+            description=(f"Analyze, aggregate and query the spreadsheet file '{file.file_name}' with SQL. "
+                         f"Its sheets are available as the tables {tables_desc}. Use this tool for "
+                         f"calculations, filters and aggregations over the spreadsheet's rows.")
+        )
+        duckdb_tools.append(tool)
+
+    return duckdb_tools
+
 def create_text_extraction_tool_from_file(query_engine: BaseQueryEngine, file: ChatFile):
     """
     Creates a text extraction tool for a given file using the specified query engine.
@@ -268,7 +314,8 @@ def create_sql_engines_tools_from_files(files: List[ChatFile], chroma_vector_sto
 
     Notes:
         - The function filters files based on their MIME type to identify SQL-related files.
-        - It initializes a SQL database connection for each SQL file and maps its tables to a vector index.
+        - It initializes a SQL database for each SQL file from the table descriptions stored at upload
+          time (no schema reflection) and maps its tables to a vector index.
         - The resulting tools are configured with a description and a retriever for querying the database.
     """
     storage_context = StorageContext.from_defaults(vector_store=chroma_vector_store)
@@ -288,20 +335,13 @@ def create_sql_engines_tools_from_files(files: List[ChatFile], chroma_vector_sto
         )
 
         if "sql" in file.mime_type.lower():
-            pg_url = initialize_pg_url(file.database_name)
-            db_engine = create_engine(pg_url)
-
-            sql_database = SQLDatabase(db_engine, include_tables=file.tables)
+            # the table descriptions were computed when the dump was loaded, nothing is reflected here
+            sql_database = CachedSQLDatabase.from_file(file)
             tables_node_mapping = SQLTableNodeMapping(sql_database)
             table_schema_objs = [
                 SQLTableSchema(table_name=table_name)
                 for table_name in file.tables
             ]
-            nodes = tables_node_mapping.to_nodes(table_schema_objs)
-            for node in nodes:
-                node.metadata = {
-                    'file_id': file.id,
-                }
 
             obj_index = ObjectIndex.from_objects_and_index(
                 objects=table_schema_objs,
@@ -309,7 +349,7 @@ def create_sql_engines_tools_from_files(files: List[ChatFile], chroma_vector_sto
                 index=index,
             )
             query_engine = SQLTableRetrieverQueryEngine(
-                sql_database=sql_database, table_retriever=obj_index.as_retriever(similarity_top_k=1, filter=filter),
+                sql_database=sql_database, table_retriever=obj_index.as_retriever(similarity_top_k=1, filters=filter),
             )
             tables_desc = ', '.join([str(x) for x in file.tables])
             desc = (f"SQL Query Engine for database '{file.database_name}' that can execute SQL queries on the following tables: "
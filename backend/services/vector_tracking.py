@@ -0,0 +1,72 @@
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from models import ChatFileVector
+
+
+def track_vectors(db_client: Session, file_id: str, vector_ids: Iterable[str]):
+    """
+    Records the Chroma ids written for a file and commits them.
+
+    Called for every upserted batch, so the record is complete even if indexing fails half-way.
+    Already recorded ids are ignored.
+    """
+    rows = [{"vector_id": vector_id, "chat_file_id": file_id} for vector_id in vector_ids]
+    if not rows:
+        return
+    db_client.execute(insert(ChatFileVector).values(rows).on_conflict_do_nothing(index_elements=["vector_id"]))
+    db_client.commit()
+
+
+def untrack_vectors(db_client: Session, vector_ids: List[str]):
+    """Removes the records of deleted Chroma ids and commits."""
+    if not vector_ids:
+        return
+    db_client.execute(_untrack_statement(vector_ids))
+    db_client.commit()
+
+
+async def auntrack_vectors(db_client: AsyncSession, vector_ids: List[str]):
+    """Removes the records of deleted Chroma ids within the caller's transaction, which commits."""
+    if not vector_ids:
+        return
+    await db_client.execute(_untrack_statement(vector_ids))
+
+
+def get_tracked_vector_ids(db_client: Session, file_ids: List[str]) -> Dict[str, List[str]]:
+    """
+    Returns the recorded Chroma ids of the given files.
+
+    Returns:
+        Dict[str, List[str]]: The ids per file id. Files indexed before vectors were tracked are missing.
+    """
+    if not file_ids:
+        return {}
+    return _group_by_file(db_client.exec(_tracked_statement(file_ids)))
+
+
+async def aget_tracked_vector_ids(db_client: AsyncSession, file_ids: List[str]) -> Dict[str, List[str]]:
+    """Async variant of ``get_tracked_vector_ids`` for the API's sessions."""
+    if not file_ids:
+        return {}
+    return _group_by_file(await db_client.exec(_tracked_statement(file_ids)))
+
+
+def _untrack_statement(vector_ids: List[str]):
+    return delete(ChatFileVector).where(ChatFileVector.vector_id.in_(vector_ids))
+
+
+def _tracked_statement(file_ids: List[str]):
+    return select(ChatFileVector.chat_file_id, ChatFileVector.vector_id).where(
+        ChatFileVector.chat_file_id.in_(file_ids))
+
+
+def _group_by_file(rows: Iterable[Tuple[str, str]]) -> Dict[str, List[str]]:
+    tracked: Dict[str, List[str]] = {}
+    for file_id, vector_id in rows:
+        tracked.setdefault(file_id, []).append(vector_id)
+    return tracked
@@ -0,0 +1,61 @@
+import pytest
+
+
+class InMemoryRedis:
+    """The subset of the Redis client used by the caches, kept in a dict; expiry is ignored."""
+
+    def __init__(self):
+        self.data = {}
+        self.fail = False
+
+    def _check(self):
+        if self.fail:
+            raise ConnectionError("Redis is unavailable")
+
+    def get(self, key):
+        self._check()
+        return self.data.get(key)
+
+    def mget(self, keys):
+        self._check()
+        return [self.data.get(key) for key in keys]
+
+    def set(self, key, value, ex=None):
+        self._check()
+        self.data[key] = value if isinstance(value, bytes) else str(value).encode()
+
+    def incr(self, key):
+        self._check()
+        value = int(self.data.get(key, 0)) + 1
+        self.data[key] = str(value).encode()
+        return value
+
+    def hincrby(self, key, field, amount=1):
+        self._check()
+        fields = self.data.setdefault(key, {})
+        fields[field.encode()] = fields.get(field.encode(), 0) + amount
+        return fields[field.encode()]
+
+    def hgetall(self, key):
+        self._check()
+        return {field: str(value).encode() for field, value in self.data.get(key, {}).items()}
+
+    def pipeline(self, transaction=True):
+        return InMemoryPipeline(self)
+
+
+class InMemoryPipeline:
+    def __init__(self, redis_client):
+        self._redis = redis_client
+        self._commands = []
+
+    def incr(self, key):
+        self._commands.append(lambda: self._redis.incr(key))
+
+    def execute(self):
+        return [command() for command in self._commands]
+
+
+@pytest.fixture
+def redis_client():
+    return InMemoryRedis()
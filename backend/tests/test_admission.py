@@ -0,0 +1,139 @@
+import asyncio
+
+import pytest
+
+from services.admission import AdmissionController, AdmissionRejected
+
+
+def test_admits_up_to_max_concurrent():
+    controller = AdmissionController(max_concurrent=2, max_queue=4, max_queued_per_user=4)
+    first = controller.admit("model", "alice")
+    second = controller.admit("model", "bob")
+    third = controller.admit("model", "carol")
+
+    assert first.admitted and second.admitted
+    assert not third.admitted
+    assert controller.position(third) == 1
+    assert controller.stats()["models"]["model"]["active"] == 2
+
+
+def test_queue_is_round_robin_between_users():
+    controller = AdmissionController(max_concurrent=1, max_queue=10, max_queued_per_user=5)
+    running = controller.admit("model", "alice")
+    alice = [controller.admit("model", "alice") for _ in range(3)]
+    bob = [controller.admit("model", "bob") for _ in range(2)]
+
+    # the burst of alice does not delay bob
+    assert [controller.position(ticket) for ticket in alice] == [1, 3, 5]
+    assert [controller.position(ticket) for ticket in bob] == [2, 4]
+
+    order = []
+    current = running
+    for _ in range(5):
+        controller.release(current)
+        current = next(ticket for ticket in alice + bob if ticket.admitted and not ticket.released)
+        order.append(current)
+    assert order == [alice[0], bob[0], alice[1], bob[1], alice[2]]
+
+
+def test_models_are_limited_separately():
+    controller = AdmissionController(max_concurrent=1, max_queue=1, max_queued_per_user=1)
+    assert controller.admit("model-a", "alice").admitted
+    assert controller.admit("model-b", "alice").admitted
+
+
+def test_rejects_when_queue_is_full():
+    controller = AdmissionController(max_concurrent=1, max_queue=2, max_queued_per_user=5)
+    controller.admit("model", "alice")
+    controller.admit("model", "bob")
+    controller.admit("model", "carol")
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.admit("model", "dave")
+    assert rejected.value.model == "model"
+    assert rejected.value.retry_after >= 1
+    assert controller.stats()["models"]["model"]["rejected_total"] == 1
+
+
+def test_rejects_when_users_share_is_full():
+    controller = AdmissionController(max_concurrent=1, max_queue=10, max_queued_per_user=2)
+    controller.admit("model", "alice")
+    controller.admit("model", "alice")
+    controller.admit("model", "alice")
+
+    with pytest.raises(AdmissionRejected):
+        controller.admit("model", "alice")
+    # other users are still queued
+    assert not controller.admit("model", "bob").admitted
+
+
+def test_release_of_admitted_ticket_admits_next():
+    controller = AdmissionController(max_concurrent=1, max_queue=4, max_queued_per_user=4)
+    running = controller.admit("model", "alice")
+    waiting = controller.admit("model", "bob")
+
+    controller.release(running)
+    assert waiting.admitted
+    assert controller.position(waiting) == 0
+    assert controller.stats()["models"]["model"]["active"] == 1
+    assert controller.stats()["models"]["model"]["avg_run_seconds"] is not None
+
+    # releasing is idempotent
+    controller.release(running)
+    assert controller.stats()["models"]["model"]["active"] == 1
+    controller.release(waiting)
+    assert controller.stats()["models"]["model"]["active"] == 0
+
+
+def test_release_of_waiting_ticket_leaves_queue():
+    controller = AdmissionController(max_concurrent=1, max_queue=4, max_queued_per_user=4)
+    running = controller.admit("model", "alice")
+    withdrawn = controller.admit("model", "bob")
+    waiting = controller.admit("model", "carol")
+    assert controller.position(waiting) == 2
+
+    controller.release(withdrawn)
+    assert not withdrawn.admitted
+    assert controller.position(waiting) == 1
+    assert controller.stats()["models"]["model"]["queued"] == 1
+
+    controller.release(running)
+    assert waiting.admitted
+    assert not withdrawn.admitted
+    assert controller.stats()["models"]["model"]["active"] == 1
+
+
+async def test_wait_yields_positions_until_admitted():
+    controller = AdmissionController(max_concurrent=1, max_queue=4, max_queued_per_user=4)
+    running = controller.admit("model", "alice")
+    first = controller.admit("model", "bob")
+    second = controller.admit("model", "carol")
+
+    async def collect(ticket):
+        return [position async for position in controller.wait(ticket, update_seconds=5)]
+
+    waiter = asyncio.create_task(collect(second))
+    await asyncio.sleep(0.01)
+    controller.release(running)
+    await asyncio.sleep(0.01)
+    controller.release(first)
+
+    assert await asyncio.wait_for(waiter, timeout=1) == [2, 1]
+    assert second.admitted
+
+
+async def test_wait_ends_when_waiting_ticket_is_released():
+    controller = AdmissionController(max_concurrent=1, max_queue=4, max_queued_per_user=4)
+    controller.admit("model", "alice")
+    waiting = controller.admit("model", "bob")
+
+    async def collect():
+        return [position async for position in controller.wait(waiting, update_seconds=5)]
+
+    waiter = asyncio.create_task(collect())
+    await asyncio.sleep(0.01)
+    controller.release(waiting)
+
+    assert await asyncio.wait_for(waiter, timeout=1) == [1]
+    assert not waiting.admitted
+    assert controller.stats()["models"]["model"]["queued"] == 0
@@ -0,0 +1,59 @@
+import random
+
+from llama_index.core.node_parser import TokenTextSplitter
+
+from services.document_stream import iter_chunks, iter_text_sections
+from services.indexer import assign_chunk_ids
+
+WORDS = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta", "theta", "kappa", "lambda", "sigma"]
+
+
+def make_paragraphs(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    paragraphs = []
+    for i in range(count):
+        if i % 25 == 0:
+            paragraphs.append(f"# Chapter {i // 25}")
+        paragraphs.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 120))) + ".")
+    return paragraphs
+
+
+def chunk_ids(path):
+    splitter = TokenTextSplitter(chunk_size=128, chunk_overlap=16, tokenizer=str.split)
+    nodes = iter_chunks(iter_text_sections(str(path), section_bytes=16 * 1024, target_bytes=2 * 1024), [splitter])
+    return [node.id_ for node in assign_chunk_ids(nodes, "file")]
+
+
+def test_sections_join_to_file(tmp_path):
+    path = tmp_path / "doc.md"
+    text = "\n\n".join(make_paragraphs(400)) + "\n"
+    path.write_text(text)
+
+    sections = [section.text for section in iter_text_sections(str(path), target_bytes=2 * 1024)]
+    assert "".join(sections) == text
+    assert len(sections) > 10
+
+
+def test_long_lines_without_paragraphs_are_cut(tmp_path):
+    path = tmp_path / "doc.log"
+    path.write_text("\n".join(" ".join(WORDS) for _ in range(2000)) + "\n")
+
+    sections = [section.text for section in iter_text_sections(str(path), section_bytes=4 * 1024,
+                                                               target_bytes=1024)]
+    assert len(sections) > 1
+    assert all(len(section) <= 4 * 1024 + 100 for section in sections)
+
+
+def test_editing_first_paragraph_keeps_later_chunk_ids(tmp_path):
+    paragraphs = make_paragraphs(400)
+    path = tmp_path / "doc.md"
+    path.write_text("\n\n".join(paragraphs) + "\n")
+    before = chunk_ids(path)
+
+    paragraphs[1] = "An edited opening paragraph that is longer than before. " + paragraphs[1]
+    path.write_text("\n\n".join(paragraphs) + "\n")
+    after = chunk_ids(path)
+
+    changed = set(after) - set(before)
+    assert len(before) > 100
+    assert 0 < len(changed) <= 10
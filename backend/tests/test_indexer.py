@@ -0,0 +1,42 @@
+from llama_index.core.node_parser import TokenTextSplitter
+from llama_index.core.schema import Document, MetadataMode, TextNode
+
+from services.indexer import assign_chunk_ids, tag_documents_with_file_id
+
+
+def test_tagging_keeps_reader_metadata():
+    page = Document(text="Revenue grew by 12 percent.", metadata={"page_label": "3", "file_name": "report.pdf"})
+    tag_documents_with_file_id([page], "file")
+
+    assert page.metadata == {"page_label": "3", "file_name": "report.pdf", "file_id": "file"}
+    assert "page_label: 3" in page.get_content(metadata_mode=MetadataMode.LLM)
+    assert "report.pdf" in page.get_content(metadata_mode=MetadataMode.LLM)
+    assert page.get_content(metadata_mode=MetadataMode.EMBED) == "Revenue grew by 12 percent."
+
+
+def test_chunk_ids_do_not_depend_on_page_metadata():
+    def chunk_ids(page_label):
+        page = Document(text="Revenue grew by 12 percent.", metadata={"page_label": page_label})
+        tag_documents_with_file_id([page], "file")
+        nodes = TokenTextSplitter(chunk_size=64, chunk_overlap=0, tokenizer=str.split).get_nodes_from_documents([page])
+        assert all(node.metadata["page_label"] == page_label for node in nodes)
+        return [node.id_ for node in assign_chunk_ids(nodes, "file")]
+
+    assert chunk_ids("3") == chunk_ids("4")
+
+
+def test_chunk_ids_are_derived_from_content():
+    nodes = [TextNode(text="alpha"), TextNode(text="beta"), TextNode(text="alpha")]
+    ids = [node.id_ for node in assign_chunk_ids(nodes, "file")]
+
+    assert ids[0].startswith("file-") and ids[2] == f"{ids[0]}-1"
+    assert len(set(ids)) == 3
+    assert [node.id_ for node in assign_chunk_ids([TextNode(text="beta")], "file")] == [ids[1]]
+    assert [node.id_ for node in assign_chunk_ids([TextNode(text="beta")], "other")] != [ids[1]]
+
+
+def test_chunk_ids_ignore_metadata_excluded_from_embedding():
+    first = TextNode(text="rows", metadata={"row_start": 1}, excluded_embed_metadata_keys=["row_start"])
+    shifted = TextNode(text="rows", metadata={"row_start": 5}, excluded_embed_metadata_keys=["row_start"])
+
+    assert next(assign_chunk_ids([first], "file")).id_ == next(assign_chunk_ids([shifted], "file")).id_
@@ -0,0 +1,57 @@
+from collections import Counter
+
+from services.lexical_index import LexicalIndex, load_lexical_index, remove_lexical_index, tokenize, \
+    write_lexical_index
+
+
+def index_of(chunks):
+    return {node_id: {"length": len(tokenize(text)), "tf": dict(Counter(tokenize(text)))}
+            for node_id, text in chunks.items()}
+
+
+def test_tokenize_keeps_compound_identifiers_and_their_parts():
+    assert tokenize("Invoice INV-2023-0042 paid") == ["invoice", "inv-2023-0042", "inv", "2023", "0042", "paid"]
+    assert tokenize("Code E_1234.") == ["code", "e_1234", "e", "1234"]
+    assert tokenize("") == []
+
+
+def test_search_ranks_chunks_by_bm25():
+    index = LexicalIndex(index_of({
+        "invoice": "invoice INV-2023-0042 was paid in march",
+        "other-invoice": "invoice INV-2023-0043 is still open",
+        "unrelated": "the quarterly report covers revenue and costs",
+    }))
+
+    results = index.search("INV-2023-0042", top_k=5)
+    assert results[0][0] == "invoice"
+    assert "unrelated" not in dict(results)
+    assert all(score > 0 for _, score in results)
+    assert len(index.search("invoice", top_k=1)) == 1
+    assert index.search("nothing matches", top_k=5) == []
+
+
+def test_rare_terms_weigh_more():
+    index = LexicalIndex(index_of({
+        "common": "report report",
+        "rare": "report revenue",
+        "filler-1": "report costs",
+        "filler-2": "report margins",
+    }))
+    assert index.search("report revenue", top_k=1)[0][0] == "rare"
+
+
+def test_empty_index_finds_nothing():
+    assert LexicalIndex({}).search("anything", top_k=5) == []
+
+
+def test_index_round_trip(tmp_path):
+    path = str(tmp_path / "doc.pdf")
+    write_lexical_index(path, [("a", Counter(tokenize("alpha beta"))), ("b", Counter(tokenize("gamma")))])
+
+    index = load_lexical_index(path)
+    assert len(index) == 2
+    assert index.search("gamma", top_k=5)[0][0] == "b"
+
+    remove_lexical_index(path)
+    assert len(load_lexical_index(path)) == 0
+    remove_lexical_index(path)
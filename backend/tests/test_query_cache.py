@@ -0,0 +1,56 @@
+import pytest
+from llama_index.core.schema import NodeWithScore, TextNode
+
+from services.query_cache import QueryCache
+
+
+@pytest.fixture
+def cache(redis_client):
+    return QueryCache(redis_client, embedding_ttl=60, retrieval_ttl=60, namespace="test")
+
+
+def test_query_embedding_round_trip(cache):
+    assert cache.get_query_embedding("model", "What was the revenue?") is None
+    cache.put_query_embedding("model", "What was the revenue?", [0.5, -1.0, 0.25])
+
+    assert cache.get_query_embedding("model", "What  was the\nrevenue? ") == [0.5, -1.0, 0.25]
+    assert cache.get_query_embedding("other-model", "What was the revenue?") is None
+    assert cache.stats()["embedding"] == {"hits": 1, "misses": 2, "hit_ratio": 0.3333, "ttl": 60}
+
+
+def test_retrieval_round_trip(cache):
+    key = cache.retrieval_key([0.1, 0.2], ["a", "b"], top_k=4)
+    nodes = [NodeWithScore(node=TextNode(id_="a-1", text="chunk", metadata={"file_id": "a"}), score=0.9)]
+    assert cache.get_retrieval(key) is None
+    cache.put_retrieval(key, nodes)
+
+    cached = cache.get_retrieval(key)
+    assert [(node.node.node_id, node.node.get_content(), node.node.metadata, node.score) for node in cached] == \
+        [("a-1", "chunk", {"file_id": "a"}, 0.9)]
+
+
+def test_retrieval_key_depends_on_files_top_k_and_variant(cache):
+    key = cache.retrieval_key([0.1, 0.2], ["a", "b"], top_k=4)
+    assert key == cache.retrieval_key([0.1, 0.2], ["b", "a"], top_k=4)
+    assert key != cache.retrieval_key([0.1, 0.3], ["a", "b"], top_k=4)
+    assert key != cache.retrieval_key([0.1, 0.2], ["a"], top_k=4)
+    assert key != cache.retrieval_key([0.1, 0.2], ["a", "b"], top_k=5)
+    assert key != cache.retrieval_key([0.1, 0.2], ["a", "b"], top_k=4, variant="hybrid")
+
+
+def test_bumping_a_file_version_invalidates_its_retrievals(cache):
+    both = cache.retrieval_key([0.1], ["a", "b"], top_k=4)
+    only_b = cache.retrieval_key([0.1], ["b"], top_k=4)
+    cache.bump_file_versions(["a"])
+
+    assert cache.retrieval_key([0.1], ["a", "b"], top_k=4) != both
+    assert cache.retrieval_key([0.1], ["b"], top_k=4) == only_b
+
+
+def test_redis_failures_leave_queries_uncached(cache, redis_client):
+    redis_client.fail = True
+
+    assert cache.get_query_embedding("model", "query") is None
+    cache.put_query_embedding("model", "query", [1.0])
+    assert cache.retrieval_key([0.1], ["a"], top_k=4) is None
+    cache.bump_file_versions(["a"])
@@ -0,0 +1,44 @@
+import pytest
+from llama_index.core.schema import NodeWithScore, TextNode
+
+from services.retrievers import apply_file_quota, reciprocal_rank_fusion
+
+
+def scored(node_id, file_id, score):
+    return NodeWithScore(node=TextNode(id_=node_id, text=node_id, metadata={"file_id": file_id}), score=score)
+
+
+def test_fusion_scores_ids_by_reciprocal_rank():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a"]], k=60)
+
+    assert [node_id for node_id, _ in fused] == ["a", "c", "b"]
+    assert dict(fused)["a"] == pytest.approx(1 / 61 + 1 / 62)
+    assert dict(fused)["b"] == pytest.approx(1 / 62)
+
+
+def test_fusion_prefers_ids_found_by_both_rankings():
+    fused = reciprocal_rank_fusion([["vector-only", "both"], ["lexical-only", "both"]], k=1)
+    assert fused[0][0] == "both"
+
+
+def test_fusion_of_no_rankings_is_empty():
+    assert reciprocal_rank_fusion([]) == []
+    assert reciprocal_rank_fusion([[], []]) == []
+
+
+def test_quota_limits_nodes_per_file():
+    nodes = [scored("a1", "a", 0.9), scored("a2", "a", 0.8), scored("a3", "a", 0.7), scored("b1", "b", 0.6),
+             scored("c1", "c", 0.5)]
+    selected = apply_file_quota(nodes, top_k=3, max_per_file=1)
+    assert [node.node.node_id for node in selected] == ["a1", "b1", "c1"]
+
+
+def test_quota_fills_empty_slots_with_best_skipped_nodes():
+    nodes = [scored("b1", "b", 0.6), scored("a1", "a", 0.9), scored("a2", "a", 0.8), scored("a3", "a", 0.7)]
+    selected = apply_file_quota(nodes, top_k=3, max_per_file=1)
+    assert [node.node.node_id for node in selected] == ["a1", "a2", "b1"]
+
+
+def test_quota_returns_fewer_nodes_only_when_there_are_fewer():
+    nodes = [scored("a1", "a", 0.9), scored("a2", "a", 0.8)]
+    assert len(apply_file_quota(nodes, top_k=5, max_per_file=1)) == 2
@@ -0,0 +1,81 @@
+from utils.sql_result_cache import SQLResultCache, is_cacheable_sql, is_single_statement, normalize_sql
+
+
+def test_normalize_sql_collapses_whitespace_and_case():
+    assert normalize_sql("SELECT  *\n  FROM Users\tWHERE id = 1 ;") == "select * from users where id = 1"
+
+
+def test_normalize_sql_keeps_quoted_text_verbatim():
+    assert normalize_sql("SELECT 'It''s  A' FROM \"My  Table\"") == "select 'It''s  A' from \"My  Table\""
+
+
+def test_normalize_sql_keeps_dollar_quoted_text_verbatim():
+    assert normalize_sql("SELECT $$Hello  World$$, $tag$A$$B$tag$") == "select $$Hello  World$$, $tag$A$$B$tag$"
+    # statements differing only in a dollar-quoted literal do not share a cache key
+    assert normalize_sql("SELECT $$ABC$$") != normalize_sql("SELECT $$abc$$")
+
+
+def test_normalize_sql_does_not_treat_parameters_as_dollar_quotes():
+    assert normalize_sql("SELECT * FROM T WHERE A = $1 AND B = $2") == "select * from t where a = $1 and b = $2"
+
+
+def test_is_single_statement():
+    assert is_single_statement("select 1;")
+    assert is_single_statement("select ';' from t")
+    assert is_single_statement("select \"a;b\" from t")
+    assert is_single_statement("select $$a;b$$, $f$c;d$f$")
+    assert not is_single_statement("select 1; drop table t")
+    assert not is_single_statement("select $$a$$; drop table t")
+
+
+def test_is_cacheable_sql():
+    assert is_cacheable_sql(normalize_sql("SELECT name FROM users"))
+    assert is_cacheable_sql(normalize_sql("WITH t AS (SELECT 1) SELECT * FROM t"))
+    assert not is_cacheable_sql(normalize_sql("DELETE FROM users"))
+    assert not is_cacheable_sql(normalize_sql("SELECT now()"))
+    assert not is_cacheable_sql(normalize_sql("SELECT random() FROM t"))
+    assert not is_cacheable_sql(normalize_sql("SELECT CURRENT_DATE"))
+    # volatile names inside literals do not matter
+    assert is_cacheable_sql(normalize_sql("SELECT * FROM t WHERE note = 'now()'"))
+    assert is_cacheable_sql(normalize_sql("SELECT $$random()$$"))
+
+
+def test_cache_hits_on_equivalent_statements():
+    cache = SQLResultCache(max_entries=4, max_bytes=10_000, max_rows=10)
+    result = ("1 row", {"result": [(1,)]})
+    cache.put("db", "SELECT 1", result)
+
+    assert cache.get("db", "select   1;") == result
+    assert cache.get("other_db", "SELECT 1") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_cache_skips_uncacheable_results():
+    cache = SQLResultCache(max_entries=4, max_bytes=10_000, max_rows=2)
+    cache.put("db", "SELECT now()", ("now", {"result": [("2026",)]}))
+    cache.put("db", "SELECT * FROM t", ("3 rows", {"result": [(1,), (2,), (3,)]}))
+
+    assert cache.stats()["entries"] == 0
+
+
+def test_cache_evicts_least_recently_used():
+    cache = SQLResultCache(max_entries=2, max_bytes=10_000, max_rows=10)
+    cache.put("db", "SELECT 1", ("1", {"result": []}))
+    cache.put("db", "SELECT 2", ("2", {"result": []}))
+    cache.get("db", "SELECT 1")
+    cache.put("db", "SELECT 3", ("3", {"result": []}))
+
+    assert cache.get("db", "SELECT 2") is None
+    assert cache.get("db", "SELECT 1") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_invalidate_drops_results_of_database():
+    cache = SQLResultCache(max_entries=4, max_bytes=10_000, max_rows=10)
+    cache.put("db", "SELECT 1", ("1", {"result": []}))
+    cache.put("other_db", "SELECT 1", ("1", {"result": []}))
+    cache.invalidate("db")
+
+    assert cache.get("db", "SELECT 1") is None
+    assert cache.get("other_db", "SELECT 1") is not None
+    assert cache.stats()["entries"] == 1
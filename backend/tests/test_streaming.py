@@ -0,0 +1,102 @@
+import asyncio
+import json
+
+import pytest
+
+from services.streaming import CoalescingSSEWriter, sse_event
+
+
+async def deltas_of(items, delay=0.0):
+    for item in items:
+        if delay:
+            await asyncio.sleep(delay)
+        yield item
+
+
+async def collect(writer, deltas):
+    return [frame async for frame in writer.stream(deltas)]
+
+
+def values(frames):
+    return [json.loads(frame[len("data: "):])["value"] for frame in frames if frame.startswith("data: ")]
+
+
+def test_sse_event_format():
+    assert sse_event({"value": "hi"}) == 'data: {"value": "hi"}\n\n'
+
+
+async def test_deltas_are_coalesced_into_frames():
+    writer = CoalescingSSEWriter(flush_interval=0.05, max_frame_bytes=4096, heartbeat_seconds=5)
+    frames = await collect(writer, deltas_of(["Hel", "lo", ", ", "world"]))
+
+    assert values(frames) == ["Hello, world"]
+    assert writer.frames == 1 and writer.deltas == 4
+
+
+async def test_frame_is_flushed_when_full():
+    writer = CoalescingSSEWriter(flush_interval=1, max_frame_bytes=4, heartbeat_seconds=5)
+    frames = await collect(writer, deltas_of(["ab", "cd", "ef", "g"]))
+
+    assert values(frames) == ["abcd", "efg"]
+
+
+async def test_frame_is_flushed_after_interval():
+    writer = CoalescingSSEWriter(flush_interval=0.01, max_frame_bytes=4096, heartbeat_seconds=5)
+    frames = await collect(writer, deltas_of(["a", "b", "c"], delay=0.05))
+
+    assert values(frames) == ["a", "b", "c"]
+
+
+async def test_empty_deltas_are_skipped():
+    writer = CoalescingSSEWriter(flush_interval=0, heartbeat_seconds=5)
+    frames = await collect(writer, deltas_of(["", "text", ""]))
+
+    assert "".join(values(frames)) == "text"
+    assert writer.deltas == 1
+
+
+async def test_heartbeat_is_sent_while_no_delta_arrives():
+    writer = CoalescingSSEWriter(flush_interval=0, heartbeat_seconds=0.02)
+    frames = await collect(writer, deltas_of(["late"], delay=0.07))
+
+    assert frames[0] == ": ping\n\n"
+    assert values(frames) == ["late"]
+
+
+async def test_error_is_raised_after_preceding_deltas():
+    async def failing():
+        yield "partial"
+        raise RuntimeError("model failed")
+
+    writer = CoalescingSSEWriter(flush_interval=0.01, heartbeat_seconds=5)
+    frames = []
+    with pytest.raises(RuntimeError, match="model failed"):
+        async for frame in writer.stream(failing()):
+            frames.append(frame)
+    assert values(frames) == ["partial"]
+
+
+async def test_closing_the_stream_stops_the_producer():
+    consumed = []
+
+    async def endless():
+        while True:
+            consumed.append(1)
+            yield "x"
+            await asyncio.sleep(0)
+
+    writer = CoalescingSSEWriter(flush_interval=0, heartbeat_seconds=5, max_pending=4)
+    stream = writer.stream(endless())
+    await stream.__anext__()
+    await stream.aclose()
+    count = len(consumed)
+    await asyncio.sleep(0.02)
+
+    assert len(consumed) == count
+
+
+def test_invalid_arguments_are_rejected():
+    with pytest.raises(ValueError):
+        CoalescingSSEWriter(max_frame_bytes=0)
+    with pytest.raises(ValueError):
+        CoalescingSSEWriter(flush_interval=-1)
@@ -0,0 +1,79 @@
+import pytest
+
+from models import FileParams
+from services.tool_cache import ToolCache, get_chat_tools_version, invalidate_chat_tools, tool_cache_key
+
+FILES = {
+    "b": FileParams(queried=True, query_type="vector"),
+    "a": FileParams(queried=False, query_type="sql"),
+}
+
+
+def test_key_does_not_depend_on_order_of_files_and_options():
+    reordered = dict(reversed(list(FILES.items())))
+    assert tool_cache_key("chat", 1, FILES, model="m", temperature=0.1) == \
+        tool_cache_key("chat", 1, reordered, temperature=0.1, model="m")
+
+
+def test_key_changes_with_version_file_params_and_options():
+    key = tool_cache_key("chat", 1, FILES, model="m")
+    assert key != tool_cache_key("chat", 2, FILES, model="m")
+    assert key != tool_cache_key("chat", 1, {**FILES, "a": FileParams(queried=True, query_type="sql")}, model="m")
+    assert key != tool_cache_key("chat", 1, FILES, model="other")
+
+
+def test_chat_tools_version_is_bumped_by_invalidation(redis_client):
+    assert get_chat_tools_version(redis_client, "chat") == 0
+    invalidate_chat_tools(redis_client, "chat")
+    invalidate_chat_tools(redis_client, "chat")
+
+    assert get_chat_tools_version(redis_client, "chat") == 2
+    assert get_chat_tools_version(redis_client, "other") == 0
+
+
+def test_invalidation_failure_is_not_raised(redis_client):
+    redis_client.fail = True
+    invalidate_chat_tools(redis_client, "chat")
+
+
+def test_cache_returns_stored_tools():
+    cache = ToolCache(max_entries=4)
+    key = tool_cache_key("chat", 0, FILES)
+    assert cache.get(key) is None
+    cache.put(key, ["tool"])
+
+    assert cache.get(key) == ["tool"]
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_cache_evicts_least_recently_used():
+    cache = ToolCache(max_entries=2)
+    keys = [tool_cache_key(f"chat-{i}", 0, FILES) for i in range(3)]
+    cache.put(keys[0], "tools-0")
+    cache.put(keys[1], "tools-1")
+    cache.get(keys[0])
+    cache.put(keys[2], "tools-2")
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == "tools-0"
+    assert cache.get(keys[2]) == "tools-2"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_new_version_drops_outdated_entries_of_chat():
+    cache = ToolCache(max_entries=8)
+    cache.put(tool_cache_key("chat", 0, FILES, model="a"), "old-a")
+    cache.put(tool_cache_key("chat", 0, FILES, model="b"), "old-b")
+    cache.put(tool_cache_key("other", 0, FILES), "other")
+    cache.put(tool_cache_key("chat", 1, FILES, model="a"), "new-a")
+
+    assert cache.get(tool_cache_key("chat", 0, FILES, model="b")) is None
+    assert cache.get(tool_cache_key("other", 0, FILES)) == "other"
+    assert cache.stats()["entries"] == 2
+    # dropping outdated entries is not counted as eviction
+    assert cache.stats()["evictions"] == 0
+
+
+def test_cache_requires_positive_size():
+    with pytest.raises(ValueError):
+        ToolCache(max_entries=0)
@@ -13,4 +13,14 @@ from utils.upload_sql_dump import (
     pg_port,
     pg_password,
     pg_user
+)
+from utils.sql_engines import (
+    SQLEngineRegistry,
+    get_sql_engine_registry,
+    SQL_STATEMENT_TIMEOUT_MS,
+)
+from utils.sql_result_cache import (
+    SQLResultCache,
+    get_sql_result_cache,
+    is_single_statement,
 )
\ No newline at end of file
@@ -0,0 +1,157 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+
+from dependencies import logger
+from utils.upload_sql_dump import initialize_pg_url
+
+SQL_ENGINE_POOL_SIZE = int(os.getenv("SQL_ENGINE_POOL_SIZE", 2))
+SQL_ENGINE_MAX_OVERFLOW = int(os.getenv("SQL_ENGINE_MAX_OVERFLOW", 3))
+SQL_ENGINE_POOL_TIMEOUT = float(os.getenv("SQL_ENGINE_POOL_TIMEOUT", 30))
+SQL_ENGINE_POOL_RECYCLE = int(os.getenv("SQL_ENGINE_POOL_RECYCLE", 1800))
+SQL_ENGINE_IDLE_SECONDS = float(os.getenv("SQL_ENGINE_IDLE_SECONDS", 600))
+SQL_ENGINE_MAX_DATABASES = int(os.getenv("SQL_ENGINE_MAX_DATABASES", 32))
+SQL_STATEMENT_TIMEOUT_MS = int(os.getenv("SQL_STATEMENT_TIMEOUT_MS", 30000))
+
+
+class SQLEngineRegistry:
+    """
+    Process-wide registry of SQLAlchemy engines for the databases of uploaded SQL dumps.
+
+    Every database gets exactly one engine with a small, bounded connection pool instead of a new
+    pool per request. Engines unused for ``idle_seconds`` are disposed, and beyond ``max_databases``
+    the least recently used engine is disposed, so the number of connections this process holds
+    is bounded by ``max_databases * (pool_size + max_overflow)``.
+
+    Uploaded databases are only read by the chats, so every connection is opened read-only and
+    with a ``statement_timeout``, which also protects Postgres from runaway LLM-generated queries.
+
+    Disposing an engine closes its idle connections; connections still checked out by a running
+    query are closed when they are returned.
+
+    Args:
+        pool_size (int): Connections kept open per database.
+        max_overflow (int): Additional connections per database under load.
+        pool_timeout (float): Seconds to wait for a free connection before failing.
+        pool_recycle (int): Seconds after which a connection is replaced.
+        idle_seconds (float): Seconds after the last use after which an engine is disposed.
+        max_databases (int): Maximum number of databases with an engine.
+    """
+    def __init__(self, pool_size: int = SQL_ENGINE_POOL_SIZE, max_overflow: int = SQL_ENGINE_MAX_OVERFLOW,
+                 pool_timeout: float = SQL_ENGINE_POOL_TIMEOUT, pool_recycle: int = SQL_ENGINE_POOL_RECYCLE,
+                 idle_seconds: float = SQL_ENGINE_IDLE_SECONDS, max_databases: int = SQL_ENGINE_MAX_DATABASES):
+        if max_databases <= 0:
+            raise ValueError("max_databases must be positive")
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_timeout = pool_timeout
+        self.pool_recycle = pool_recycle
+        self.idle_seconds = idle_seconds
+        self.max_databases = max_databases
+        # database name -> (engine, last use as monotonic time)
+        self._engines: "OrderedDict[str, tuple[Engine, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.idle_disposals = 0
+        self.evictions = 0
+
+    def _create_engine(self, database_name: str) -> Engine:
+        return create_engine(initialize_pg_url(database_name), pool_size=self.pool_size,
+                             max_overflow=self.max_overflow, pool_timeout=self.pool_timeout,
+                             pool_recycle=self.pool_recycle, pool_pre_ping=True,
+                             connect_args={"options": f"-c default_transaction_read_only=on "
+                                                      f"-c statement_timeout={SQL_STATEMENT_TIMEOUT_MS}"})
+
+    def get_engine(self, database_name: str) -> Engine:
+        """
+        Returns the engine of ``database_name``, creating it on first use.
+
+        Args:
+            database_name (str): The name of the uploaded database, e.g. ``sd_<id>``.
+
+        Returns:
+            Engine: The shared engine of the database.
+        """
+        now = time.monotonic()
+        disposable = []
+        with self._lock:
+            for name, (engine, last_used) in list(self._engines.items()):
+                if name != database_name and now - last_used > self.idle_seconds:
+                    disposable.append(self._engines.pop(name)[0])
+                    self.idle_disposals += 1
+
+            entry = self._engines.get(database_name)
+            if entry is None:
+                engine = self._create_engine(database_name)
+                self.created += 1
+            else:
+                engine = entry[0]
+            self._engines[database_name] = (engine, now)
+            self._engines.move_to_end(database_name)
+
+            while len(self._engines) > self.max_databases:
+                _, (evicted, _) = self._engines.popitem(last=False)
+                disposable.append(evicted)
+                self.evictions += 1
+
+        for engine in disposable:
+            engine.dispose()
+        return engine
+
+    def dispose(self, database_name: str):
+        """
+        Disposes the engine of ``database_name`` if there is one, e.g. before the database is dropped.
+        """
+        with self._lock:
+            entry = self._engines.pop(database_name, None)
+        if entry:
+            entry[0].dispose()
+            logger.debug(f"Disposed SQL engine of database '{database_name}'")
+
+    def dispose_all(self):
+        """Disposes all engines, e.g. on shutdown."""
+        with self._lock:
+            engines = [engine for engine, _ in self._engines.values()]
+            self._engines.clear()
+        for engine in engines:
+            engine.dispose()
+
+    def stats(self) -> dict:
+        with self._lock:
+            engines = {name: engine for name, (engine, _) in self._engines.items()}
+            counters = {
+                "created": self.created,
+                "idle_disposals": self.idle_disposals,
+                "evictions": self.evictions,
+            }
+        databases = {}
+        for name, engine in engines.items():
+            pool = engine.pool
+            databases[name] = {
+                "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else 0,
+                "checked_in": pool.checkedin() if hasattr(pool, "checkedin") else 0,
+            }
+        return {
+            **counters,
+            "databases": len(databases),
+            "max_databases": self.max_databases,
+            "open_connections": sum(d["checked_out"] + d["checked_in"] for d in databases.values()),
+            "checked_out": sum(d["checked_out"] for d in databases.values()),
+            "per_database": databases,
+        }
+
+
+_sql_engine_registry: Optional[SQLEngineRegistry] = None
+
+
+def get_sql_engine_registry() -> SQLEngineRegistry:
+    """Provides the process-wide SQL engine registry."""
+    global _sql_engine_registry
+    if _sql_engine_registry is None:
+        _sql_engine_registry = SQLEngineRegistry()
+    return _sql_engine_registry
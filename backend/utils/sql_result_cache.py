@@ -0,0 +1,142 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+SQL_RESULT_CACHE_MAX_ENTRIES = int(os.getenv("SQL_RESULT_CACHE_MAX_ENTRIES", 512))
+SQL_RESULT_CACHE_MAX_BYTES = int(os.getenv("SQL_RESULT_CACHE_MAX_MB", 64)) * 1024 * 1024
+SQL_RESULT_CACHE_MAX_ROWS = int(os.getenv("SQL_RESULT_CACHE_MAX_ROWS", 1000))
+
+# string literals, dollar-quoted literals ($$...$$, $tag$...$tag$) and quoted identifiers are kept
+# verbatim when normalizing; ``$1`` style parameters are not dollar quotes
+_QUOTED = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|\$(?P<tag>(?:[A-Za-z_]\w*)?)\$.*?\$(?P=tag)\$", re.DOTALL)
+_CACHEABLE = re.compile(r"^(select|with)\b")
+_VOLATILE = re.compile(r"\b(random|now|clock_timestamp|statement_timestamp|timeofday|gen_random_uuid|nextval|setseed)\s*\(|"
+                       r"\bcurrent_(date|time|timestamp)\b|\blocaltime(stamp)?\b")
+
+
+def _split_quoted(sql: str) -> List[str]:
+    # alternates unquoted and quoted parts like ``re.split`` with one group: odd indexes are quoted
+    parts, position = [], 0
+    for match in _QUOTED.finditer(sql):
+        parts += [sql[position:match.start()], match.group()]
+        position = match.end()
+    return parts + [sql[position:]]
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    Normalizes a SQL statement for use as a cache key.
+
+    Outside of string literals (including dollar-quoted ones) and quoted identifiers, whitespace is collapsed and the text is
+    lowercased (Postgres folds unquoted identifiers to lower case anyway); a trailing semicolon is
+    removed.
+    """
+    parts = _split_quoted(sql.strip().rstrip(";").strip())
+    return "".join(part if i % 2 else re.sub(r"\s+", " ", part).lower() for i, part in enumerate(parts)).strip()
+
+
+def is_single_statement(sql: str) -> bool:
+    """Checks that ``sql`` holds one statement, i.e. no semicolon outside of quotes except a trailing one."""
+    parts = _split_quoted(sql.strip().rstrip(";"))
+    return not any(";" in part for i, part in enumerate(parts) if not i % 2)
+
+
+def is_cacheable_sql(normalized_sql: str) -> bool:
+    """Only read statements without volatile functions (``now()``, ``random()``, ...) are cached."""
+    unquoted = " ".join(part for i, part in enumerate(_split_quoted(normalized_sql)) if not i % 2)
+    return bool(_CACHEABLE.match(normalized_sql)) and not _VOLATILE.search(unquoted)
+
+
+class SQLResultCache:
+    """
+    In-process LRU cache of SQL query results on the databases of uploaded dumps.
+
+    Uploaded dumps never change once loaded, so a result stays valid until its database is dropped;
+    ``invalidate`` is called from ``delete_database_from_postgres``. Entries are keyed by the database
+    name and the normalized statement. Results with more than ``max_rows`` rows are not cached, and
+    the cache is bounded by both its number of entries and the size of the cached result texts.
+
+    Args:
+        max_entries (int): Maximum number of cached results.
+        max_bytes (int): Budget for the summed size of the cached result texts.
+        max_rows (int): Results with more rows are not cached.
+    """
+    def __init__(self, max_entries: int = SQL_RESULT_CACHE_MAX_ENTRIES, max_bytes: int = SQL_RESULT_CACHE_MAX_BYTES,
+                 max_rows: int = SQL_RESULT_CACHE_MAX_ROWS):
+        if max_entries <= 0 or max_bytes <= 0:
+            raise ValueError("max_entries and max_bytes must be positive")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_rows = max_rows
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Tuple[str, Dict], int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, database_name: str, sql: str) -> Optional[Tuple[str, Dict]]:
+        key = (database_name, normalize_sql(sql))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, database_name: str, sql: str, result: Tuple[str, Dict[str, Any]]):
+        normalized = normalize_sql(sql)
+        if not is_cacheable_sql(normalized):
+            return
+        response, metadata = result
+        if len(metadata.get("result", [])) > self.max_rows:
+            return
+        size = len(response) + sum(len(str(row)) for row in metadata.get("result", [])) + len(normalized)
+        if size > self.max_bytes:
+            return
+        key = (database_name, normalized)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous:
+                self._bytes -= previous[1]
+            self._entries[key] = (result, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def invalidate(self, database_name: str):
+        """Drops all results of ``database_name``."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == database_name]:
+                self._bytes -= self._entries.pop(key)[1]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+            }
+
+
+_sql_result_cache: Optional[SQLResultCache] = None
+
+
+def get_sql_result_cache() -> SQLResultCache:
+    """Provides the process-wide SQL result cache."""
+    global _sql_result_cache
+    if _sql_result_cache is None:
+        _sql_result_cache = SQLResultCache()
+    return _sql_result_cache
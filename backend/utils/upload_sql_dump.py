@@ -101,7 +101,7 @@ class PostgresMigration():
         except Exception as e:
             logger.error(f"General Error: {e}")
 
-    def delete_old_db_from_mysql(self, **kwargs):
+    def delete_old_db_from_mysql(self, if_exists: bool = False, **kwargs):
         """
         Deletes an existing database from a MySQL server.
 
@@ -109,6 +109,7 @@ class PostgresMigration():
         parameters and attempts to drop the specified database.
 
         Args:
+            if_exists (bool): Do nothing if the database does not exist.
             **kwargs: Additional keyword arguments to pass to the MySQL connection.
 
         Raises:
@@ -128,7 +129,7 @@ class PostgresMigration():
                 **kwargs
             )
             cursor = conn.cursor()
-            cursor.execute(f"DROP DATABASE {self.mysql_db}")
+            cursor.execute(f"DROP DATABASE {'IF EXISTS ' if if_exists else ''}{self.mysql_db}")
             logger.debug(f"Database '{self.mysql_db}' dropped successfully.")
             conn.commit()
             conn.close()
@@ -295,7 +296,7 @@ def detect_sql_dump_type(file_path: str) -> str:
         logger.error(f"Error reading sql dump file: {e}")
         return f"Error reading file: {e}"
 
-def load_dump_to_database(sql_dump_path: str, db_name="TWICE"):
+def load_dump_to_database(sql_dump_path: str, db_name="TWICE", replace: bool = False):
     """
     Loads a SQL dump file into a database and optionally migrates it to PostgreSQL.
 
@@ -306,6 +307,8 @@ def load_dump_to_database(sql_dump_path: str, db_name="TWICE"):
     Args:
         sql_dump_path (str): The file path to the SQL dump file.
         db_name (str, optional): The name of the database to load the dump into. Defaults to "TWICE".
+        replace (bool): Drops the databases an earlier, interrupted load of the dump left behind
+            before loading, so a retry does not load the dump a second time into them.
 
     Raises:
         ValueError: If the SQL dump type cannot be detected or is unsupported.
@@ -317,8 +320,13 @@ def load_dump_to_database(sql_dump_path: str, db_name="TWICE"):
           PostgreSQL database.
     """
     db = detect_sql_dump_type(sql_dump_path)
+    if replace:
+        delete_database_from_postgres(db_name, if_exists=True)
     if db == "MySQL":
         logger.debug(f"MySQL dump detected for file: {sql_dump_path}")
+        if replace:
+            PostgresMigration(mysql_host, mysql_port, mysql_user, mysql_password, db_name).delete_old_db_from_mysql(
+                if_exists=True)
         load_mysql_dump(mysql_host, mysql_port, mysql_user, mysql_password, db_name, sql_dump_path)
         migration = PostgresMigration(mysql_host, mysql_port, mysql_user, mysql_password, db_name,)
         migration.migrate_mysql_to_pg(pg_host, pg_port, pg_user, pg_password, db_name)
@@ -381,17 +389,21 @@ def list_all_tables_from_db(host: str, port: int, user: str, password: str, db:
         logger.error(f"PostgreSQL Error: {e}")
         return []
 
-def delete_database_from_postgres(database_name: str):
+def delete_database_from_postgres(database_name: str, if_exists: bool = False):
     """
     Deletes a PostgreSQL database with the specified name.
 
     This function connects to the PostgreSQL server using the provided
     connection parameters and executes a SQL statement to drop the database.
     The connection is made to the 'postgres' database, which is required
-    because a database cannot drop itself.
+    because a database cannot drop itself. The pooled engine of the database
+    is disposed first, and connections that other processes still hold are
+    terminated by ``WITH (FORCE)``. Cached query results of the database are
+    invalidated.
 
     Args:
         database_name (str): The name of the database to be deleted.
+        if_exists (bool): Do nothing if the database does not exist.
 
     Raises:
         psycopg2.Error: If an error occurs while connecting to the database
@@ -400,6 +412,11 @@ def delete_database_from_postgres(database_name: str):
     Example:
         delete_database_from_postgres("example_db")
     """
+    from utils.sql_engines import get_sql_engine_registry
+    from utils.sql_result_cache import get_sql_result_cache
+
+    get_sql_engine_registry().dispose(database_name)
+    get_sql_result_cache().invalidate(database_name)
     try:
         conn = psycopg2.connect(
             host=pg_host,
@@ -410,7 +427,7 @@ def delete_database_from_postgres(database_name: str):
         )
         conn.autocommit = True
         cursor = conn.cursor()
-        statement = f"DROP DATABASE {database_name};"
+        statement = f"DROP DATABASE {'IF EXISTS ' if if_exists else ''}{database_name} WITH (FORCE);"
         cursor.execute(statement)
 
         logger.debug(f"Database '{database_name}' dropped successfully.")
@@ -0,0 +1,110 @@
+import multiprocessing
+import os
+import signal
+import socket
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+INDEXING_WORKERS = int(os.getenv("INDEXING_WORKERS", 2))
+INDEXING_POLL_INTERVAL = float(os.getenv("INDEXING_POLL_INTERVAL", 2))
+
+
+def run_worker(worker_id: str, stop_event):
+    """
+    Polls the queue and runs jobs until ``stop_event`` is set.
+
+    A job that is running when the stop signal arrives is finished before the process exits.
+
+    Args:
+        worker_id (str): Identifier stored on claimed jobs.
+        stop_event (multiprocessing.Event): Shared shutdown flag.
+    """
+    # Imported in the child so every process opens its own DB, Redis and Chroma connections.
+    from sqlmodel import Session
+    from redis import Redis
+    from dependencies import engine, resolve_chroma_collection, configure_llama_settings, logger, REDIS_HOST, REDIS_PORT
+    from services.job_queue import claim_next_job, complete_job, fail_job, JobLease
+    from services.tasks import run_indexing_job
+    from services.parsing_pool import get_parsing_pool
+    from services.tool_cache import invalidate_chat_tools
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    configure_llama_settings()
+    redis_client = Redis(host=REDIS_HOST, port=REDIS_PORT, decode_responses=True)
+    logger.info(f"Indexing worker {worker_id} started")
+
+    while not stop_event.is_set():
+        with Session(engine) as db_client:
+            try:
+                job = claim_next_job(db_client, worker_id)
+            except Exception as e:
+                logger.error(f"Worker {worker_id} could not claim a job: {e}", exc_info=True)
+                job = None
+            if job is None:
+                stop_event.wait(INDEXING_POLL_INTERVAL)
+                continue
+
+            try:
+                chroma_collection = resolve_chroma_collection(job.chat_id, db_client)
+                with JobLease(job, worker_id):
+                    run_indexing_job(job, db_client=db_client, chroma_collection=chroma_collection)
+                complete_job(db_client, job)
+                # the chat's SQL and pandas tools depend on the indexed file
+                invalidate_chat_tools(redis_client, job.chat_id)
+                logger.info(f"Worker {worker_id} finished job {job.id}")
+            except Exception as e:
+                logger.error(f"Worker {worker_id} failed job {job.id}: {e}", exc_info=True)
+                fail_job(db_client, job, e)
+
+    get_parsing_pool().close()
+    logger.info(f"Indexing worker {worker_id} stopped")
+
+
+def main():
+    """
+    Starts ``INDEXING_WORKERS`` processes that execute indexing jobs from the durable Postgres queue
+    outside the API process, and restarts any that die until SIGTERM/SIGINT.
+
+    Usage:
+        python worker.py
+
+    Environment:
+        INDEXING_WORKERS: Number of worker processes (default: 2).
+        INDEXING_POLL_INTERVAL: Seconds to sleep while the queue is empty (default: 2).
+        PARSING_POOL_PROCESSES: Parser processes per worker (default: number of CPUs).
+    """
+    from dependencies import create_db_and_tables, logger
+    import models  # noqa: F401 registers all tables before create_all
+
+    create_db_and_tables()
+    context = multiprocessing.get_context("spawn")
+    stop_event = context.Event()
+
+    def shutdown(signum, frame):
+        logger.info(f"Received signal {signum}, stopping indexing workers")
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    hostname = socket.gethostname()
+    processes = {}
+    while not stop_event.is_set():
+        for i in range(INDEXING_WORKERS):
+            process = processes.get(i)
+            if process is None or not process.is_alive():
+                if process is not None:
+                    logger.error(f"Indexing worker {i} exited with code {process.exitcode}, restarting")
+                process = context.Process(target=run_worker, args=(f"{hostname}-{os.getpid()}-{i}", stop_event))
+                process.start()
+                processes[i] = process
+        stop_event.wait(5)
+
+    for process in processes.values():
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
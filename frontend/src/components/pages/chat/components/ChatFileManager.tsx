@@ -337,6 +337,11 @@ export default function ChatFileManager({
                           <SelectItem value="basic">
                             Klassiche Abfrage
                           </SelectItem>
+                          {file.mime_type !== 'application/sql' && (
+                            <SelectItem value="hybrid">
+                              Hybride Abfrage (Stichwort + Semantik)
+                            </SelectItem>
+                          )}
                           {(file.mime_type === 'application/pdf' ||
                             file.mime_type === 'text/plain' ||
                             file.mime_type === 'text/markdown' ||
@@ -355,6 +360,13 @@ export default function ChatFileManager({
                                 Spreadsheet-Abfrage
                               </SelectItem>
                             )}
+                          {(file.mime_type ===
+                            'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet' ||
+                            file.mime_type === 'text/csv') && (
+                              <SelectItem value="duckdb">
+                                SQL-Abfrage (große Tabellen)
+                              </SelectItem>
+                            )}
                         </SelectContent>
                       </Select>
                     </TableCell>
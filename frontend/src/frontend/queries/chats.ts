@@ -274,7 +274,7 @@ export const useChatStream = (chatId: string) => {
           const { done, value } = await reader.read();
           if (done) break;
 
-          buffer += decoder.decode(value);
+          buffer += decoder.decode(value, { stream: true });
 
           // Process SSE format (data: {...}\n\n)
           const lines = buffer.split('\n');